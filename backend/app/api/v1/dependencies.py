@@ -2,21 +2,183 @@
 Dependency injection for API endpoints.
 Follows Dependency Inversion Principle - provides dependencies to endpoints.
 """
+import asyncio
+from typing import List, Optional
+
 from app.core.config import settings
-from app.repositories.zammad_repository import ZammadRepository
+from app.repositories.cached_repository import CachedZammadRepository
+from app.repositories.snapshot_repository import SQLiteSnapshotRepository
+from app.repositories.zammad_repository import (
+    IZammadRepository,
+    ZammadRepository,
+    create_http_client,
+)
+from app.services.entity_directory import EntityDirectory
+from app.services.metrics_materializer import MetricsMaterializer
+from app.services.rollups import DAY, HOUR, MINUTE
+from app.services.ticket_store import TicketStore
 from app.services.zammad_service import ZammadService
 
+# Shared for the application lifetime so all requests reuse one connection pool
+# and concurrent requests can coalesce identical upstream calls
+_zammad_client: Optional[ZammadRepository] = None
+_zammad_repository: Optional[IZammadRepository] = None
+_snapshot_repository: Optional[SQLiteSnapshotRepository] = None
+_ticket_store: Optional[TicketStore] = None
+_entity_directory: Optional[EntityDirectory] = None
+_zammad_service: Optional[ZammadService] = None
+_metrics_materializer: Optional[MetricsMaterializer] = None
+_background_tasks: List[asyncio.Task] = []
+
+
+def _get_zammad_client() -> ZammadRepository:
+    """Return the shared uncached repository that talks to Zammad directly."""
+    global _zammad_client
+    if _zammad_client is None:
+        _zammad_client = ZammadRepository(
+            base_url=settings.ZAMMAD_API_URL,
+            api_token=settings.ZAMMAD_API_TOKEN,
+            client=create_http_client(
+                timeout=settings.ZAMMAD_HTTP_TIMEOUT,
+                connect_timeout=settings.ZAMMAD_HTTP_CONNECT_TIMEOUT,
+                max_connections=settings.ZAMMAD_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ZAMMAD_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.ZAMMAD_HTTP_KEEPALIVE_EXPIRY,
+                http2=settings.ZAMMAD_HTTP2,
+            ),
+            crawl_concurrency=settings.ZAMMAD_CRAWL_CONCURRENCY,
+            bulk_decode=settings.ZAMMAD_BULK_DECODE,
+        )
+    return _zammad_client
 
-def get_zammad_repository() -> ZammadRepository:
-    """Create and return Zammad repository instance."""
-    return ZammadRepository(
-        base_url=settings.ZAMMAD_API_URL,
-        api_token=settings.ZAMMAD_API_TOKEN,
+
+def _create_zammad_repository() -> IZammadRepository:
+    """Create the repository used by endpoints, wrapped in a response cache if enabled."""
+    repository = _get_zammad_client()
+    if not settings.ZAMMAD_CACHE_ENABLED:
+        return repository
+    return CachedZammadRepository(
+        repository,
+        ttls={
+            "get_tickets": settings.ZAMMAD_CACHE_TICKETS_TTL,
+            "get_ticket": settings.ZAMMAD_CACHE_TICKET_TTL,
+            "get_users": settings.ZAMMAD_CACHE_USERS_TTL,
+            "get_organizations": settings.ZAMMAD_CACHE_ORGANIZATIONS_TTL,
+        },
+        stale_ttl=settings.ZAMMAD_CACHE_STALE_TTL,
+        max_entries=settings.ZAMMAD_CACHE_MAX_ENTRIES,
     )
 
 
+def get_zammad_repository() -> IZammadRepository:
+    """Return the shared Zammad repository instance, creating it on first use."""
+    global _zammad_repository
+    if _zammad_repository is None:
+        _zammad_repository = _create_zammad_repository()
+    return _zammad_repository
+
+
+def _get_snapshot_repository() -> Optional[SQLiteSnapshotRepository]:
+    """Return the shared on-disk snapshot repository, or None when snapshots are disabled."""
+    global _snapshot_repository
+    if _snapshot_repository is None and settings.ZAMMAD_SNAPSHOT_PATH:
+        _snapshot_repository = SQLiteSnapshotRepository(settings.ZAMMAD_SNAPSHOT_PATH)
+    return _snapshot_repository
+
+
+def get_ticket_store() -> Optional[TicketStore]:
+    """Return the shared local ticket store, or None when syncing is disabled."""
+    global _ticket_store
+    if _ticket_store is None and settings.ZAMMAD_SYNC_ENABLED:
+        # Syncs bypass the response cache so incremental pages are never stale
+        _ticket_store = TicketStore(
+            _get_zammad_client(),
+            sync_interval=settings.ZAMMAD_SYNC_INTERVAL,
+            full_resync_interval=settings.ZAMMAD_FULL_RESYNC_INTERVAL,
+            snapshot=_get_snapshot_repository(),
+        )
+    return _ticket_store
+
+
+def get_entity_directory() -> Optional[EntityDirectory]:
+    """Return the shared user/organization directory, or None when it is disabled."""
+    global _entity_directory
+    if _entity_directory is None and settings.ZAMMAD_DIRECTORY_ENABLED:
+        # Incremental refreshes bypass the response cache, like ticket syncs
+        _entity_directory = EntityDirectory(
+            _get_zammad_client(),
+            refresh_interval=settings.ZAMMAD_DIRECTORY_REFRESH_INTERVAL,
+            full_refresh_interval=settings.ZAMMAD_DIRECTORY_FULL_REFRESH_INTERVAL,
+            snapshot=_get_snapshot_repository(),
+        )
+    return _entity_directory
+
+
+async def startup_dependencies() -> None:
+    """
+    Create shared dependencies, warm the ticket store and the directory from their
+    snapshots and start refreshing the directory, and metrics when there is a store,
+    in the background.
+    """
+    get_zammad_service()
+    store = get_ticket_store()
+    if store is not None and await store.load_snapshot():
+        # Serve the snapshot right away and catch up with Zammad in the background
+        _background_tasks.append(asyncio.create_task(store.catch_up()))
+    if store is not None:
+        # Without a store each refresh is a full crawl, so scrapes render on demand instead
+        _background_tasks.append(asyncio.create_task(get_metrics_materializer().run()))
+    directory = get_entity_directory()
+    if directory is not None:
+        # A loaded snapshot makes the first refresh incremental
+        await directory.load_snapshot()
+        _background_tasks.append(asyncio.create_task(directory.run()))
+
+
+async def shutdown_dependencies() -> None:
+    """Stop background work and close the shared repositories and HTTP connection pool."""
+    global _zammad_client, _zammad_repository, _ticket_store, _zammad_service
+    global _metrics_materializer, _entity_directory, _snapshot_repository
+    for task in _background_tasks:
+        task.cancel()
+    # Let cancelled tasks unwind before the HTTP client closes under them
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+    _metrics_materializer = None
+    _zammad_service = None
+    _ticket_store = None
+    _entity_directory = None
+    _snapshot_repository = None
+    if _zammad_repository is not None:
+        await _zammad_repository.aclose()
+        _zammad_repository = None
+    if _zammad_client is not None:
+        await _zammad_client.aclose()
+        _zammad_client = None
+
+
 def get_zammad_service() -> ZammadService:
-    """Create and return Zammad service instance."""
-    repository = get_zammad_repository()
-    return ZammadService(repository=repository)
+    """Return the shared Zammad service instance, creating it on first use."""
+    global _zammad_service
+    if _zammad_service is None:
+        _zammad_service = ZammadService(
+            repository=get_zammad_repository(),
+            store=get_ticket_store(),
+            rollup_retention={
+                MINUTE: settings.ZAMMAD_ROLLUP_MINUTE_RETENTION,
+                HOUR: settings.ZAMMAD_ROLLUP_HOUR_RETENTION,
+                DAY: settings.ZAMMAD_ROLLUP_DAY_RETENTION,
+            },
+            directory=get_entity_directory(),
+        )
+    return _zammad_service
+
 
+def get_metrics_materializer() -> MetricsMaterializer:
+    """Return the shared metrics materializer, creating it on first use."""
+    global _metrics_materializer
+    if _metrics_materializer is None:
+        _metrics_materializer = MetricsMaterializer(
+            get_zammad_service(), interval=settings.ZAMMAD_METRICS_REFRESH_INTERVAL
+        )
+    return _metrics_materializer
@@ -2,63 +2,174 @@
 Grafana-compatible API endpoints.
 Follows Single Responsibility Principle - handles only Grafana-specific endpoints.
 """
-from datetime import datetime, timedelta
-from typing import List, Optional
+import math
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from app.api.v1.dependencies import get_zammad_service
+from app.core.config import settings
+from app.core.exceptions import QueryError
+from app.services.bucketing import (
+    bucket_edges,
+    choose_interval,
+    get_zone,
+    grafana_datapoints,
+    parse_grafana_time,
+    parse_interval,
+)
+from app.services.promql import parse_duration, range_timestamps
+from app.services.rollups import DIMENSIONS, MINUTE
 from app.services.zammad_service import ZammadService
 
 router = APIRouter()
 
 
+async def _get_created_series(
+    service: ZammadService,
+    from_time: Optional[str],
+    to_time: Optional[str],
+    step: str,
+    by: Optional[str],
+    group_id: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Count tickets created per step between from and to, read from the rollups.
+    The step is rounded up to whole minutes and buckets are aligned to it.
+    """
+    if by is not None and by not in DIMENSIONS:
+        raise QueryError(f"by must be one of {', '.join(DIMENSIONS)}")
+    step_seconds = max(MINUTE, math.ceil(parse_duration(step) / MINUTE) * MINUTE)
+    now = time.time()
+    end = parse_grafana_time(to_time, now)
+    start = parse_grafana_time(from_time, end - 86_400)
+    # Each point counts [t - step, t) and is stamped with its bucket start
+    ends = range_timestamps(
+        start + step_seconds,
+        math.ceil(end / step_seconds) * step_seconds,
+        step_seconds,
+        max_points=settings.ZAMMAD_PROMETHEUS_MAX_POINTS,
+    )
+    # The range only narrows the crawl when there is no local store
+    counts = await service.get_created_counts(
+        ends,
+        step_seconds,
+        by=by or "group_id",
+        group_id=group_id,
+        created_from=datetime.fromtimestamp(float(ends[0]) - step_seconds, tz=timezone.utc),
+        created_to=datetime.fromtimestamp(float(ends[-1]), tz=timezone.utc),
+    )
+    if counts is None:
+        raise QueryError(f"no rollup resolution fits a step of {step_seconds}s")
+
+    if by is None:
+        total = np.zeros(len(ends))
+        for values in counts.values():
+            total = total + values
+        series = {"Tickets Created": total}
+    else:
+        series = {f"Tickets Created ({label})": values for label, values in counts.items()}
+
+    bucket_starts_ms = ((ends - step_seconds) * 1000).astype(np.int64).tolist()
+    return [
+        {
+            "target": target,
+            "datapoints": [
+                [int(value), timestamp]
+                for value, timestamp in zip(values.tolist(), bucket_starts_ms)
+                if not math.isnan(value)
+            ],
+        }
+        for target, values in series.items()
+    ]
+
+
+async def _get_bucketed_datapoints(
+    service: ZammadService,
+    from_time: Optional[str],
+    to_time: Optional[str],
+    interval: Optional[str],
+    interval_ms: Optional[float],
+    max_data_points: Optional[int],
+    tz: Optional[str],
+    group_id: Optional[int] = None,
+) -> List[List[int]]:
+    """
+    Count tickets created per bucket as [value, bucket start ms], with buckets laid
+    out in the tz time zone. An explicit interval wins; otherwise one is picked from
+    intervalMs/maxDataPoints, defaulting to days. Without from/to the buckets span
+    every ticket; an empty store then has no buckets.
+    """
+    zone = get_zone(tz)
+
+    def layout(start: float, end: float) -> np.ndarray:
+        if interval:
+            bucket_interval = parse_interval(interval)
+        else:
+            bucket_interval = choose_interval(start, end, interval_ms, max_data_points)
+        return bucket_edges(
+            start,
+            end,
+            bucket_interval,
+            max_points=settings.ZAMMAD_PROMETHEUS_MAX_POINTS,
+            zone=zone,
+        )
+
+    if from_time or to_time:
+        end = parse_grafana_time(to_time, time.time())
+        edges = layout(parse_grafana_time(from_time, end - 86_400), end)
+        counts = await service.get_created_in_buckets(edges, group_id=group_id)
+        return grafana_datapoints(edges, counts)
+
+    history = (await service.get_ticket_aggregates(group_id=group_id)).history
+    span = history.created_span()
+    if span is None:
+        return []
+    edges = layout(*span)
+    return grafana_datapoints(edges, history.created_in_buckets(edges))
+
+
 @router.get("/tickets/timeseries")
 async def get_tickets_timeseries(
     from_time: Optional[str] = Query(None, alias="from"),
     to_time: Optional[str] = Query(None, alias="to"),
     service: ZammadService = Depends(get_zammad_service),
+    step: Optional[str] = Query(None, description="Bucket width, e.g. 5m or 1h; daily buckets if omitted"),
+    by: Optional[str] = Query(None, description="Split series by state, priority or group_id"),
+    interval: Optional[str] = Query(None, description="Bucket interval, e.g. 5m, 1h, 1d, 1w or 1M"),
+    interval_ms: Optional[float] = Query(None, alias="intervalMs", gt=0),
+    max_data_points: Optional[int] = Query(None, alias="maxDataPoints", ge=1),
+    tz: Optional[str] = Query(None, description="IANA time zone for bucket boundaries; UTC if omitted"),
 ):
     """
     Get tickets as time-series data for Grafana.
     Returns data in Grafana's expected format.
+    With a step, counts are read from the UTC minute/hour/day rollups between from and to.
+    Otherwise every bucket (daily unless interval, intervalMs or maxDataPoints say
+    otherwise) is counted from the sorted creation-time index and stamped with its
+    start in the tz time zone.
     """
     try:
-        tickets = await service.get_all_tickets(fetch_all=True)
-        
-        # Group tickets by creation date
-        timeseries_data = {}
-        
-        for ticket in tickets:
-            if ticket.created_at:
-                # Parse date and group by day
-                if isinstance(ticket.created_at, str):
-                    date_obj = datetime.fromisoformat(ticket.created_at.replace("Z", "+00:00"))
-                else:
-                    date_obj = ticket.created_at
-                
-                date_key = date_obj.strftime("%Y-%m-%d")
-                
-                if date_key not in timeseries_data:
-                    timeseries_data[date_key] = {
-                        "time": int(date_obj.timestamp() * 1000),  # Grafana expects milliseconds
-                        "value": 0,
-                    }
-                timeseries_data[date_key]["value"] += 1
-        
+        if step:
+            return await _get_created_series(service, from_time, to_time, step, by)
+
         # Convert to Grafana format: [{"target": "series_name", "datapoints": [[value, timestamp], ...]}]
+        datapoints = await _get_bucketed_datapoints(
+            service, from_time, to_time, interval, interval_ms, max_data_points, tz
+        )
         result = []
-        if timeseries_data:
-            datapoints = sorted(
-                [[data["value"], data["time"]] for data in timeseries_data.values()],
-                key=lambda x: x[1]
-            )
+        if datapoints:
             result.append({
                 "target": "Tickets Created",
                 "datapoints": datapoints
             })
         
         return result
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error generating time-series data: {str(e)}"
@@ -71,44 +182,37 @@ async def get_tickets_timeseries_table_2(
     to_time: Optional[str] = Query(None, alias="to"),
     groupid: Optional[int] = Query(None, description="Filter tickets by group ID"),
     service: ZammadService = Depends(get_zammad_service),
+    step: Optional[str] = Query(None, description="Bucket width, e.g. 5m or 1h; daily buckets if omitted"),
+    interval: Optional[str] = Query(None, description="Bucket interval, e.g. 5m, 1h, 1d, 1w or 1M"),
+    interval_ms: Optional[float] = Query(None, alias="intervalMs", gt=0),
+    max_data_points: Optional[int] = Query(None, alias="maxDataPoints", ge=1),
+    tz: Optional[str] = Query(None, description="IANA time zone for bucket boundaries; UTC if omitted"),
 ):
     """
     Get tickets as time-series data in table format for easier extraction.
     Returns data with separate columns for value and timestamp.
-    Fetches all latest tickets using pagination.
+    Counts the tickets created between from and to, bucketed like /tickets/timeseries.
     Optionally filters by group_id if provided.
     """
     try:
-        tickets = await service.get_all_tickets(fetch_all=True, group_id=groupid)
-        
-        # Group tickets by creation date
-        timeseries_data = {}
-        
-        for ticket in tickets:
-            if ticket.created_at:
-                if isinstance(ticket.created_at, str):
-                    date_obj = datetime.fromisoformat(ticket.created_at.replace("Z", "+00:00"))
-                else:
-                    date_obj = ticket.created_at
-                
-                date_key = date_obj.strftime("%Y-%m-%d")
-                
-                if date_key not in timeseries_data:
-                    timeseries_data[date_key] = {
-                        "time": int(date_obj.timestamp() * 1000),
-                        "value": 0,
-                    }
-                timeseries_data[date_key]["value"] += 1
+        if step:
+            series = await _get_created_series(
+                service, from_time, to_time, step, by=None, group_id=groupid
+            )
+            return [
+                {"time": timestamp, "value": value}
+                for value, timestamp in series[0]["datapoints"]
+            ]
+
+        datapoints = await _get_bucketed_datapoints(
+            service, from_time, to_time, interval, interval_ms, max_data_points, tz,
+            group_id=groupid,
+        )
         
         # Convert to table format with separate columns
-        result = []
-        for data in sorted(timeseries_data.values(), key=lambda x: x["time"]):
-            result.append({
-                "time": data["time"],
-                "value": data["value"]
-            })
-        
-        return result
+        return [{"time": timestamp, "value": value} for value, timestamp in datapoints]
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error generating time-series data: {str(e)}"
@@ -167,40 +271,99 @@ async def get_tickets_by_priority_grafana(
         )
 
 
+def _time_window(
+    from_time: Optional[str], to_time: Optional[str]
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Parse optional Grafana from/to times into UTC datetimes; a missing bound stays open."""
+    return tuple(
+        datetime.fromtimestamp(parse_grafana_time(value, 0.0), tz=timezone.utc) if value else None
+        for value in (from_time, to_time)
+    )
+
+
 @router.get("/tickets/top-customers")
 async def get_top_customers_grafana(
     limit: int = Query(10, ge=1, le=100, description="Number of top customers to return"),
+    from_time: Optional[str] = Query(None, alias="from"),
+    to_time: Optional[str] = Query(None, alias="to"),
+    groupid: Optional[int] = Query(None, description="Filter tickets by group ID"),
     service: ZammadService = Depends(get_zammad_service),
 ):
     """
     Get top customers by ticket count in Grafana-compatible format.
     Returns data suitable for pie charts or bar charts.
-    Format: [{"label": "Customer 123", "value": 45}, ...]
+    Format: [{"label": "Jane Doe", "value": 45}, ...]; customers not yet in the
+    directory are labelled "Customer 123".
+    With from/to only tickets created within that window count.
     """
     try:
-        top_customers = await service.get_top_customers_by_tickets(limit=limit)
+        created_from, created_to = _time_window(from_time, to_time)
+        top_customers = await service.get_top_customers_by_tickets(
+            limit=limit, group_id=groupid, created_from=created_from, created_to=created_to
+        )
         
         # Convert to Grafana pie chart format with explicit label/value fields
         result = []
         for customer in top_customers.customers:
             result.append({
-                "label": f"Customer {customer.customer_id}",
+                "label": customer.customer_name or f"Customer {customer.customer_id}",
                 "value": customer.ticket_count
             })
         
         return result
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error getting top customers: {str(e)}"
         )
 
 
+@router.get("/tickets/top-organizations")
+async def get_top_organizations_grafana(
+    limit: int = Query(10, ge=1, le=100, description="Number of top organizations to return"),
+    from_time: Optional[str] = Query(None, alias="from"),
+    to_time: Optional[str] = Query(None, alias="to"),
+    groupid: Optional[int] = Query(None, description="Filter tickets by group ID"),
+    service: ZammadService = Depends(get_zammad_service),
+):
+    """
+    Get top organizations by ticket count in Grafana-compatible format,
+    filtered like /tickets/top-customers.
+    Format: [{"label": "Acme", "value": 45}, ...]
+    """
+    try:
+        created_from, created_to = _time_window(from_time, to_time)
+        top_organizations = await service.get_top_organizations_by_tickets(
+            limit=limit, group_id=groupid, created_from=created_from, created_to=created_to
+        )
+        return [
+            {
+                "label": (
+                    organization.organization_name
+                    or f"Organization {organization.organization_id}"
+                ),
+                "value": organization.ticket_count,
+            }
+            for organization in top_organizations.organizations
+        ]
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error getting top organizations: {str(e)}"
+        )
+
+
 @router.get("/query")
 async def grafana_query_endpoint(
     target: Optional[str] = Query(None),
     from_time: Optional[str] = Query(None, alias="from"),
     to_time: Optional[str] = Query(None, alias="to"),
     service: ZammadService = Depends(get_zammad_service),
+    interval_ms: Optional[float] = Query(None, alias="intervalMs", gt=0),
+    max_data_points: Optional[int] = Query(None, alias="maxDataPoints", ge=1),
+    tz: Optional[str] = Query(None, description="IANA time zone for bucket boundaries; UTC if omitted"),
 ):
     """
     Generic Grafana query endpoint that supports multiple targets.
@@ -208,13 +371,27 @@ async def grafana_query_endpoint(
     """
     try:
         if target == "tickets_timeseries" or not target:
-            return await get_tickets_timeseries(from_time, to_time, service)
+            return await get_tickets_timeseries(
+                from_time,
+                to_time,
+                service,
+                step=None,
+                by=None,
+                interval=None,
+                interval_ms=interval_ms,
+                max_data_points=max_data_points,
+                tz=tz,
+            )
         elif target == "tickets_by_state":
             return await get_tickets_by_state_grafana(service)
         elif target == "tickets_by_priority":
             return await get_tickets_by_priority_grafana(service)
         else:
             return []
+    except HTTPException:
+        raise
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error processing Grafana query: {str(e)}"
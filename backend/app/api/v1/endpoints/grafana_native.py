@@ -2,17 +2,123 @@
 Native Grafana API endpoints (POST-based query API).
 Works with Grafana's built-in JSON API datasource.
 """
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
 from fastapi import APIRouter, Depends, HTTPException, Request
 
 from app.api.v1.dependencies import get_zammad_service
+from app.core.config import settings
+from app.core.exceptions import QueryError
+from app.services.aggregations import TicketAggregates
+from app.services.bucketing import (
+    bucket_edges,
+    choose_interval,
+    get_zone,
+    grafana_datapoints,
+    parse_grafana_time,
+)
 from app.services.zammad_service import ZammadService
 
 router = APIRouter()
 
 
+TIMESERIES = "timeseries"
+BY_STATE = "by_state"
+BY_PRIORITY = "by_priority"
+
+
+def _classify_target(target_ref: str) -> Optional[str]:
+    """Decide which result a target asks for, or None if it is not supported."""
+    if target_ref == "tickets_timeseries" or "timeseries" in target_ref.lower():
+        return TIMESERIES
+    if target_ref == "tickets_by_state" or "state" in target_ref.lower():
+        return BY_STATE
+    if target_ref == "tickets_by_priority" or "priority" in target_ref.lower():
+        return BY_PRIORITY
+    return None
+
+
+def _target_group_id(target: Dict[str, Any]) -> Optional[int]:
+    """Read an optional group filter from the target's payload."""
+    payload = target.get("payload") or target.get("data") or {}
+    if not isinstance(payload, dict) or payload.get("groupid") is None:
+        return None
+    return int(payload["groupid"])
+
+
+def _request_range(body: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """The panel's time range in Unix seconds, or None if the request has none."""
+    time_range = body.get("range") or {}
+    if not time_range.get("from") or not time_range.get("to"):
+        return None
+    return (
+        parse_grafana_time(str(time_range["from"]), 0.0),
+        parse_grafana_time(str(time_range["to"]), 0.0),
+    )
+
+
+def _bucket_layout(body: Dict[str, Any]) -> Callable[[float, float], np.ndarray]:
+    """
+    Lay out buckets for a range from the request's intervalMs, maxDataPoints and timezone.
+    The time zone is resolved on first use, so table-only requests never need one.
+    """
+    def layout(start: float, end: float) -> np.ndarray:
+        zone = get_zone(body.get("timezone"))
+        interval = choose_interval(start, end, body.get("intervalMs"), body.get("maxDataPoints"))
+        return bucket_edges(
+            start, end, interval, max_points=settings.ZAMMAD_PROMETHEUS_MAX_POINTS, zone=zone
+        )
+
+    return layout
+
+
+def _count_table(label: str, counts: Dict[str, int]) -> Dict[str, Any]:
+    """Format counts per label as a Grafana table."""
+    return {
+        "columns": [
+            {"text": label, "type": "string"},
+            {"text": "Count", "type": "number"}
+        ],
+        "rows": [[value, count] for value, count in counts.items()],
+        "type": "table"
+    }
+
+
+def _evaluate_target(
+    kind: str,
+    aggregates: TicketAggregates,
+    layout: Callable[[float, float], np.ndarray],
+    time_range: Optional[Tuple[float, float]],
+) -> Dict[str, Any]:
+    """
+    Build one target's result from the shared aggregates.
+    Time series are bucketed over the panel's range, or over every ticket without one.
+    """
+    if kind == TIMESERIES:
+        history = aggregates.history
+        span = time_range or history.created_span()
+        datapoints = []
+        if span is not None:
+            edges = layout(*span)
+            datapoints = grafana_datapoints(edges, history.created_in_buckets(edges))
+        return {"target": "Tickets Created", "datapoints": datapoints}
+
+    statistics = aggregates.statistics
+    if kind == BY_STATE:
+        return {
+            "target": "Tickets by State",
+            "datapoints": [],
+            "table": _count_table("State", statistics.tickets_by_state)
+        }
+    return {
+        "target": "Tickets by Priority",
+        "datapoints": [],
+        "table": _count_table("Priority", statistics.tickets_by_priority)
+    }
+
+
 @router.post("/query")
 async def grafana_native_query(
     request: Request,
@@ -21,84 +127,39 @@ async def grafana_native_query(
     """
     Native Grafana query endpoint (POST).
     Accepts Grafana's query format and returns data in expected format.
+    Targets are planned first: each distinct data snapshot they need is fetched once,
+    concurrently, and every target is then evaluated against its shared snapshot.
     """
     try:
         body = await request.json()
         targets = body.get("targets", [])
+        # Buckets follow the panel's range, intervalMs/maxDataPoints and timezone
+        time_range = _request_range(body)
+        layout = _bucket_layout(body)
         
-        results = []
-        
+        # Plan: classify targets and collect the distinct snapshots they need
+        plan: List[Tuple[str, Optional[int]]] = []
         for target in targets:
             target_ref = target.get("target", target.get("refId", "A"))
-            target_type = target.get("type", "timeseries")
-            
-            if target_ref == "tickets_timeseries" or "timeseries" in target_ref.lower():
-                # Get time series data
-                tickets = await service.get_all_tickets(fetch_all=True)
-                
-                # Group by time
-                timeseries_data: Dict[str, int] = {}
-                for ticket in tickets:
-                    if ticket.created_at:
-                        if isinstance(ticket.created_at, str):
-                            date_obj = datetime.fromisoformat(ticket.created_at.replace("Z", "+00:00"))
-                        else:
-                            date_obj = ticket.created_at
-                        
-                        date_key = date_obj.strftime("%Y-%m-%d")
-                        timeseries_data[date_key] = timeseries_data.get(date_key, 0) + 1
-                
-                # Convert to Grafana format
-                datapoints = []
-                for date_key, count in sorted(timeseries_data.items()):
-                    date_obj = datetime.strptime(date_key, "%Y-%m-%d")
-                    timestamp_ms = int(date_obj.timestamp() * 1000)
-                    datapoints.append([count, timestamp_ms])
-                
-                results.append({
-                    "target": "Tickets Created",
-                    "datapoints": datapoints
-                })
-            
-            elif target_ref == "tickets_by_state" or "state" in target_ref.lower():
-                stats = await service.get_ticket_statistics()
-                
-                # Convert to table format
-                table_data = {
-                    "columns": [
-                        {"text": "State", "type": "string"},
-                        {"text": "Count", "type": "number"}
-                    ],
-                    "rows": [[state, count] for state, count in stats.tickets_by_state.items()],
-                    "type": "table"
-                }
-                
-                results.append({
-                    "target": "Tickets by State",
-                    "datapoints": [],
-                    "table": table_data
-                })
-            
-            elif target_ref == "tickets_by_priority" or "priority" in target_ref.lower():
-                stats = await service.get_ticket_statistics()
-                
-                table_data = {
-                    "columns": [
-                        {"text": "Priority", "type": "string"},
-                        {"text": "Count", "type": "number"}
-                    ],
-                    "rows": [[priority, count] for priority, count in stats.tickets_by_priority.items()],
-                    "type": "table"
-                }
-                
-                results.append({
-                    "target": "Tickets by Priority",
-                    "datapoints": [],
-                    "table": table_data
-                })
+            kind = _classify_target(target_ref)
+            if kind is not None:
+                plan.append((kind, _target_group_id(target)))
+        group_ids = list(dict.fromkeys(group_id for _, group_id in plan))
+        
+        # Fetch: one aggregation snapshot per distinct group filter
+        snapshots = await asyncio.gather(
+            *(service.get_ticket_aggregates(group_id=group_id) for group_id in group_ids)
+        )
+        aggregates_by_group = dict(zip(group_ids, snapshots))
         
-        return results
+        # Evaluate: targets in request order against their shared snapshot
+        return [
+            _evaluate_target(kind, aggregates_by_group[group_id], layout, time_range)
+            for kind, group_id in plan
+        ]
         
+    except QueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error processing query: {str(e)}"
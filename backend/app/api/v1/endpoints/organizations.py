@@ -17,11 +17,20 @@ router = APIRouter()
 async def get_organizations(
     limit: Optional[int] = Query(None, ge=1, le=100),
     offset: Optional[int] = Query(None, ge=0),
+    page: Optional[int] = Query(None, ge=1),
+    per_page: Optional[int] = Query(None, ge=1, le=500),
+    fetch_all: bool = Query(False),
     service: ZammadService = Depends(get_zammad_service),
 ) -> List[Organization]:
-    """Get all organizations."""
+    """Get organizations page by page (page/per_page). Set fetch_all=True to get all organizations."""
     try:
-        return await service.get_all_organizations(limit=limit, offset=offset)
+        return await service.get_all_organizations(
+            limit=limit,
+            offset=offset,
+            page=page,
+            per_page=per_page,
+            fetch_all=fetch_all,
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error fetching organizations: {str(e)}"
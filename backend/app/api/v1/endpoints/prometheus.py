@@ -2,14 +2,33 @@
 Prometheus-compatible endpoints for Grafana.
 Prometheus is a built-in Grafana datasource - no plugins needed!
 """
+import json
 from datetime import datetime
-from typing import List
+from typing import Any, Dict, List
 
+import numpy as np
 from fastapi import APIRouter, Depends, Query, Request
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 
-from app.api.v1.dependencies import get_zammad_service
+from app.api.v1.dependencies import get_metrics_materializer, get_zammad_service
+from app.core.config import settings
+from app.core.exceptions import QueryError
+from app.services.metrics_materializer import (
+    EXPOSITION_CONTENT_TYPE,
+    MetricsMaterializer,
+)
+from app.services.promql import (
+    Series,
+    Value,
+    format_sample_value,
+    format_timestamp,
+    parse_duration,
+    parse_timestamp,
+    range_timestamps,
+    render_sample_pairs,
+)
+from app.services.ticket_metrics import METRIC_NAMES
 from app.services.zammad_service import ZammadService
 
 router = APIRouter()
@@ -43,40 +62,69 @@ async def prometheus_root():
 
 @router.get("/metrics")
 async def prometheus_metrics(
-    service: ZammadService = Depends(get_zammad_service),
+    materializer: MetricsMaterializer = Depends(get_metrics_materializer),
 ):
     """
     Prometheus metrics endpoint.
-    Returns data in Prometheus exposition format (plain text).
+    Returns data in Prometheus exposition format (plain text), pre-rendered in the background.
     """
     try:
-        statistics = await service.get_ticket_statistics()
-        
-        # Format as Prometheus metrics
-        metrics = []
-        
-        # Counter metrics
-        metrics.append(f"zammad_tickets_total {statistics.total_tickets}")
-        metrics.append(f"zammad_tickets_open {statistics.open_tickets}")
-        metrics.append(f"zammad_tickets_closed {statistics.closed_tickets}")
-        
-        # Tickets by state
-        for state, count in statistics.tickets_by_state.items():
-            state_label = state.replace(" ", "_").lower()
-            metrics.append(f'zammad_tickets_by_state{{state="{state}"}} {count}')
-        
-        # Tickets by priority
-        for priority, count in statistics.tickets_by_priority.items():
-            priority_label = priority.replace(" ", "_").lower()
-            metrics.append(f'zammad_tickets_by_priority{{priority="{priority}"}} {count}')
-        
-        # Return as plain text (Prometheus format)
-        return Response(content="\n".join(metrics), media_type="text/plain")
+        body = await materializer.get_exposition()
+        return Response(content=body, media_type=EXPOSITION_CONTENT_TYPE)
     
     except Exception as e:
         return Response(content=f"# Error: {str(e)}\n", media_type="text/plain")
 
 
+def _query_error(error: QueryError) -> JSONResponse:
+    """Build the Prometheus error response for an invalid query."""
+    return JSONResponse(
+        status_code=400,
+        content={"status": "error", "errorType": "bad_data", "error": str(error)},
+    )
+
+
+def _vector_result(value: Value, timestamp: float) -> Dict[str, Any]:
+    """Format an instant query result as a Prometheus vector or scalar."""
+    if isinstance(value, np.ndarray):
+        return {
+            "resultType": "scalar",
+            "result": [format_timestamp(timestamp), format_sample_value(float(value[0]))],
+        }
+    return {
+        "resultType": "vector",
+        "result": [
+            {
+                "metric": series.labels,
+                "value": [format_timestamp(timestamp), format_sample_value(float(series.values[0]))],
+            }
+            for series in value
+            if not np.isnan(series.values[0])
+        ],
+    }
+
+
+def _matrix_response(value: Value, timestamps: np.ndarray) -> Response:
+    """
+    Build a Prometheus matrix response, dropping absent points.
+    The JSON is assembled from pre-rendered sample arrays rather than per-point lists.
+    """
+    if isinstance(value, np.ndarray):
+        value = [Series(labels={}, values=value)]
+    results = []
+    for series in value:
+        samples = render_sample_pairs(timestamps, series.values)
+        if samples:
+            metric = json.dumps(series.labels, separators=(",", ":")).encode()
+            results.append(b'{"metric":' + metric + b',"values":[' + samples + b"]}")
+    body = (
+        b'{"status":"success","data":{"resultType":"matrix","result":['
+        + b",".join(results)
+        + b"]}}"
+    )
+    return Response(content=body, media_type="application/json")
+
+
 @router.get("/api/v1/query")
 @router.post("/api/v1/query")
 async def prometheus_query_api(
@@ -89,7 +137,7 @@ async def prometheus_query_api(
     """
     Prometheus query API endpoint.
     Supports both GET and POST requests (Grafana uses POST).
-    Supports basic PromQL queries.
+    Evaluates the supported PromQL subset over the ticket aggregates.
     """
     try:
         # Handle POST request body
@@ -113,67 +161,17 @@ async def prometheus_query_api(
                 }
             }
         
-        statistics = await service.get_ticket_statistics()
-        
-        # Parse query and build results
-        results = []
-        
-        if "zammad_tickets_total" in query:
-            results.append({
-                "metric": {"__name__": "zammad_tickets_total"},
-                "value": [int(datetime.now().timestamp()), str(statistics.total_tickets)]
-            })
-        
-        if "zammad_tickets_open" in query:
-            results.append({
-                "metric": {"__name__": "zammad_tickets_open"},
-                "value": [int(datetime.now().timestamp()), str(statistics.open_tickets)]
-            })
-        
-        if "zammad_tickets_closed" in query:
-            results.append({
-                "metric": {"__name__": "zammad_tickets_closed"},
-                "value": [int(datetime.now().timestamp()), str(statistics.closed_tickets)]
-            })
-        
-        # Handle tickets_by_state queries
-        if "zammad_tickets_by_state" in query:
-            for state, count in statistics.tickets_by_state.items():
-                results.append({
-                    "metric": {
-                        "__name__": "zammad_tickets_by_state",
-                        "state": state
-                    },
-                    "value": [int(datetime.now().timestamp()), str(count)]
-                })
-        
-        # Handle tickets_by_priority queries
-        if "zammad_tickets_by_priority" in query:
-            for priority, count in statistics.tickets_by_priority.items():
-                results.append({
-                    "metric": {
-                        "__name__": "zammad_tickets_by_priority",
-                        "priority": priority
-                    },
-                    "value": [int(datetime.now().timestamp()), str(count)]
-                })
-        
-        # If no specific match, try to return total
-        if not results:
-            results.append({
-                "metric": {"__name__": query.split("{")[0] if "{" in query else query},
-                "value": [int(datetime.now().timestamp()), "0"]
-            })
+        timestamp = parse_timestamp(str(time)) if time else datetime.now().timestamp()
+        value = await service.query_metrics(query, np.array([timestamp]))
         
         # Return Prometheus query result format
         return {
             "status": "success",
-            "data": {
-                "resultType": "vector",
-                "result": results
-            }
+            "data": _vector_result(value, timestamp)
         }
     
+    except QueryError as e:
+        return _query_error(e)
     except Exception as e:
         import traceback
         error_detail = traceback.format_exc()
@@ -220,86 +218,24 @@ async def prometheus_query_range(
                 }
             }
         
-        statistics = await service.get_ticket_statistics()
-        
         # Parse time range
-        start_time = int(start) if start else int(datetime.now().timestamp()) - 3600
-        end_time = int(end) if end else int(datetime.now().timestamp())
+        now = datetime.now().timestamp()
+        end_time = parse_timestamp(str(end)) if end else now
+        start_time = parse_timestamp(str(start)) if start else end_time - 3600
         
         # Parse step (e.g., "15s", "1m", "1h")
-        step_seconds = 15  # default
-        if step:
-            if step.endswith("s"):
-                step_seconds = int(step[:-1])
-            elif step.endswith("m"):
-                step_seconds = int(step[:-1]) * 60
-            elif step.endswith("h"):
-                step_seconds = int(step[:-1]) * 3600
-        
-        # Generate time series data points across the range
-        # Since we don't have historical data, return the same value for all points
-        def generate_time_series(value):
-            values = []
-            current = start_time
-            while current <= end_time:
-                values.append([current, str(value)])
-                current += step_seconds
-            return values
-        
-        results = []
+        step_seconds = parse_duration(str(step)) if step else 15
         
-        if "zammad_tickets_total" in query:
-            results.append({
-                "metric": {"__name__": "zammad_tickets_total"},
-                "values": generate_time_series(statistics.total_tickets)
-            })
+        # Align to the step grid and enforce the point limit before evaluating
+        timestamps = range_timestamps(
+            start_time, end_time, step_seconds, max_points=settings.ZAMMAD_PROMETHEUS_MAX_POINTS
+        )
+        value = await service.query_metrics(query, timestamps)
         
-        if "zammad_tickets_open" in query:
-            results.append({
-                "metric": {"__name__": "zammad_tickets_open"},
-                "values": generate_time_series(statistics.open_tickets)
-            })
-        
-        if "zammad_tickets_closed" in query:
-            results.append({
-                "metric": {"__name__": "zammad_tickets_closed"},
-                "values": generate_time_series(statistics.closed_tickets)
-            })
-        
-        if "zammad_tickets_by_state" in query:
-            for state, count in statistics.tickets_by_state.items():
-                results.append({
-                    "metric": {
-                        "__name__": "zammad_tickets_by_state",
-                        "state": state
-                    },
-                    "values": generate_time_series(count)
-                })
-        
-        if "zammad_tickets_by_priority" in query:
-            for priority, count in statistics.tickets_by_priority.items():
-                results.append({
-                    "metric": {
-                        "__name__": "zammad_tickets_by_priority",
-                        "priority": priority
-                    },
-                    "values": generate_time_series(count)
-                })
-        
-        if not results:
-            results.append({
-                "metric": {"__name__": query.split("{")[0] if "{" in query else query},
-                "values": generate_time_series(0)
-            })
-        
-        return {
-            "status": "success",
-            "data": {
-                "resultType": "matrix",
-                "result": results
-            }
-        }
+        return _matrix_response(value, timestamps)
     
+    except QueryError as e:
+        return _query_error(e)
     except Exception as e:
         import traceback
         return {
@@ -317,13 +253,7 @@ async def prometheus_label_values():
     """
     return {
         "status": "success",
-        "data": [
-            "zammad_tickets_total",
-            "zammad_tickets_open",
-            "zammad_tickets_closed",
-            "zammad_tickets_by_state",
-            "zammad_tickets_by_priority"
-        ]
+        "data": METRIC_NAMES
     }
 
 
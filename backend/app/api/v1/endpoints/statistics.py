@@ -2,10 +2,17 @@
 Statistics API endpoints.
 Follows Single Responsibility Principle - handles only statistics endpoints.
 """
+from datetime import datetime
+from typing import Any, Dict, Optional
+
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from app.api.v1.dependencies import get_zammad_service
-from app.domain.models import TicketStatistics, TopCustomersResponse
+from app.domain.models import (
+    TicketStatistics,
+    TopCustomersResponse,
+    TopOrganizationsResponse,
+)
 from app.services.zammad_service import ZammadService
 
 router = APIRouter()
@@ -27,13 +34,60 @@ async def get_ticket_statistics(
 @router.get("/top-customers", response_model=TopCustomersResponse)
 async def get_top_customers(
     limit: int = Query(10, ge=1, le=100, description="Number of top customers to return"),
+    created_from: Optional[datetime] = Query(
+        None, alias="from", description="Only count tickets created from this time on"
+    ),
+    created_to: Optional[datetime] = Query(
+        None, alias="to", description="Only count tickets created up to this time"
+    ),
+    groupid: Optional[int] = Query(None, description="Filter tickets by group ID"),
     service: ZammadService = Depends(get_zammad_service),
 ) -> TopCustomersResponse:
-    """Get top customers by ticket count from latest tickets."""
+    """Get top customers by ticket count, optionally within a time window and group."""
     try:
-        return await service.get_top_customers_by_tickets(limit=limit)
+        return await service.get_top_customers_by_tickets(
+            limit=limit, group_id=groupid, created_from=created_from, created_to=created_to
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Error getting top customers: {str(e)}"
         )
 
+
+@router.get("/top-organizations", response_model=TopOrganizationsResponse)
+async def get_top_organizations(
+    limit: int = Query(10, ge=1, le=100, description="Number of top organizations to return"),
+    created_from: Optional[datetime] = Query(
+        None, alias="from", description="Only count tickets created from this time on"
+    ),
+    created_to: Optional[datetime] = Query(
+        None, alias="to", description="Only count tickets created up to this time"
+    ),
+    groupid: Optional[int] = Query(None, description="Filter tickets by group ID"),
+    service: ZammadService = Depends(get_zammad_service),
+) -> TopOrganizationsResponse:
+    """Get top organizations by ticket count, optionally within a time window and group."""
+    try:
+        return await service.get_top_organizations_by_tickets(
+            limit=limit, group_id=groupid, created_from=created_from, created_to=created_to
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error getting top organizations: {str(e)}"
+        )
+
+
+@router.get("/coalescing")
+async def get_coalescing_statistics(
+    service: ZammadService = Depends(get_zammad_service),
+) -> Dict[str, Dict[str, int]]:
+    """Get how many upstream calls ran and how many callers were coalesced onto them."""
+    return service.get_coalescing_stats()
+
+
+@router.get("/sync")
+async def get_sync_status(
+    service: ZammadService = Depends(get_zammad_service),
+) -> Optional[Dict[str, Any]]:
+    """Get the local ticket store size and sync watermark."""
+    return service.get_sync_status()
@@ -17,11 +17,20 @@ router = APIRouter()
 async def get_users(
     limit: Optional[int] = Query(None, ge=1, le=100),
     offset: Optional[int] = Query(None, ge=0),
+    page: Optional[int] = Query(None, ge=1),
+    per_page: Optional[int] = Query(None, ge=1, le=500),
+    fetch_all: bool = Query(False),
     service: ZammadService = Depends(get_zammad_service),
 ) -> List[User]:
-    """Get all users."""
+    """Get users page by page (page/per_page). Set fetch_all=True to get all users."""
     try:
-        return await service.get_all_users(limit=limit, offset=offset)
+        return await service.get_all_users(
+            limit=limit,
+            offset=offset,
+            page=page,
+            per_page=per_page,
+            fetch_all=fetch_all,
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching users: {str(e)}")
 
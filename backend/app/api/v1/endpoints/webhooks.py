@@ -0,0 +1,49 @@
+"""
+Webhook API endpoints.
+Follows Single Responsibility Principle - handles only receiving pushed updates.
+"""
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from pydantic import ValidationError
+
+from app.api.v1.dependencies import get_zammad_service
+from app.core.config import settings
+from app.core.exceptions import ConfigurationError
+from app.services.webhooks import SIGNATURE_HEADER, ticket_from_payload, verify_signature
+from app.services.zammad_service import ZammadService
+
+router = APIRouter()
+
+
+@router.post("/zammad")
+async def receive_zammad_webhook(
+    request: Request,
+    signature: Optional[str] = Header(None, alias=SIGNATURE_HEADER),
+    service: ZammadService = Depends(get_zammad_service),
+) -> Dict[str, Any]:
+    """
+    Receive a Zammad trigger webhook for a ticket create or update and apply the
+    ticket to the local store, so dashboards reflect it without waiting for a sync.
+    The X-Hub-Signature header must match ZAMMAD_WEBHOOK_SECRET.
+    Deliveries older than the stored ticket are acknowledged but not applied.
+    """
+    if not settings.ZAMMAD_WEBHOOK_SECRET:
+        raise HTTPException(status_code=503, detail="Webhook secret is not configured")
+    body = await request.body()
+    if not verify_signature(body, signature, settings.ZAMMAD_WEBHOOK_SECRET):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+
+    try:
+        ticket = ticket_from_payload(json.loads(body))
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid webhook payload: {str(e)}")
+
+    try:
+        applied = await service.apply_ticket_updates([ticket])
+    except ConfigurationError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error applying webhook: {str(e)}")
+    return {"ticket_id": ticket.id, "applied": bool(applied)}
@@ -4,7 +4,7 @@ Follows Single Responsibility Principle - handles only routing.
 """
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import tickets, statistics, organizations, users, grafana, grafana_native, prometheus
+from app.api.v1.endpoints import tickets, statistics, organizations, users, grafana, grafana_native, prometheus, webhooks
 
 api_router = APIRouter()
 
@@ -15,4 +15,5 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(grafana.router, prefix="/grafana", tags=["grafana"])
 api_router.include_router(grafana_native.router, prefix="/grafana-native", tags=["grafana-native"])
 api_router.include_router(prometheus.router, prefix="/prometheus", tags=["prometheus"])
+api_router.include_router(webhooks.router, prefix="/webhooks", tags=["webhooks"])
 
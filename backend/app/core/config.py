@@ -15,6 +15,51 @@ class Settings(BaseSettings):
     ZAMMAD_API_URL: str
     ZAMMAD_API_TOKEN: str
 
+    # Zammad HTTP client pool - one keep-alive client is shared for the app lifetime
+    ZAMMAD_HTTP_TIMEOUT: float = 30.0
+    ZAMMAD_HTTP_CONNECT_TIMEOUT: float = 10.0
+    ZAMMAD_HTTP_MAX_CONNECTIONS: int = 20
+    ZAMMAD_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    ZAMMAD_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    # HTTP/2 needs the optional "h2" package (pip install "httpx[http2]")
+    ZAMMAD_HTTP2: bool = False
+    # Number of search pages fetched in parallel during fetch_all crawls (1 = sequential)
+    ZAMMAD_CRAWL_CONCURRENCY: int = 4
+    # Validate whole result pages from raw JSON instead of row-by-row model construction
+    ZAMMAD_BULK_DECODE: bool = True
+
+    # Repository response cache (TTLs in seconds)
+    ZAMMAD_CACHE_ENABLED: bool = True
+    ZAMMAD_CACHE_MAX_ENTRIES: int = 256
+    ZAMMAD_CACHE_TICKETS_TTL: float = 60.0
+    ZAMMAD_CACHE_TICKET_TTL: float = 30.0
+    ZAMMAD_CACHE_USERS_TTL: float = 300.0
+    ZAMMAD_CACHE_ORGANIZATIONS_TTL: float = 300.0
+    # How long expired entries are still served while a background refresh runs
+    ZAMMAD_CACHE_STALE_TTL: float = 600.0
+
+    # Local ticket store with incremental updated_at sync (intervals in seconds)
+    ZAMMAD_SYNC_ENABLED: bool = True
+    ZAMMAD_SYNC_INTERVAL: float = 30.0
+    ZAMMAD_FULL_RESYNC_INTERVAL: float = 3600.0
+    # SQLite snapshot of synced data for warm restarts (empty string disables it)
+    ZAMMAD_SNAPSHOT_PATH: str = "data/zammad_snapshot.db"
+    # Buckets kept in the per-minute, per-hour and per-day creation rollups (0 disables one)
+    ZAMMAD_ROLLUP_MINUTE_RETENTION: int = 7 * 24 * 60
+    ZAMMAD_ROLLUP_HOUR_RETENTION: int = 90 * 24
+    ZAMMAD_ROLLUP_DAY_RETENTION: int = 2 * 365
+    # Maximum points per series in Prometheus range queries (Prometheus uses 11,000)
+    ZAMMAD_PROMETHEUS_MAX_POINTS: int = 11_000
+    # How often the /metrics exposition is re-rendered in the background (seconds)
+    ZAMMAD_METRICS_REFRESH_INTERVAL: float = 15.0
+    # Zammad webhook ingestion; requests must carry an HMAC-SHA1 signature made with this
+    # token (the webhook's "HMAC SHA1 Signature Token"). Empty rejects every delivery
+    ZAMMAD_WEBHOOK_SECRET: str = ""
+    # In-memory user/organization directory for name enrichment (intervals in seconds)
+    ZAMMAD_DIRECTORY_ENABLED: bool = True
+    ZAMMAD_DIRECTORY_REFRESH_INTERVAL: float = 300.0
+    ZAMMAD_DIRECTORY_FULL_REFRESH_INTERVAL: float = 3600.0
+
     # Backend Configuration
     BACKEND_HOST: str = "0.0.0.0"
     BACKEND_PORT: int = 8000
@@ -17,3 +17,8 @@ class ConfigurationError(Exception):
 
     pass
 
+
+class QueryError(Exception):
+    """Exception raised when a metrics query cannot be parsed or evaluated."""
+
+    pass
@@ -0,0 +1,53 @@
+"""
+Single-flight request coalescing.
+Follows Single Responsibility Principle - handles only deduplication of concurrent calls.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one in-flight execution.
+    Callers arriving while a call is running await the same result instead of
+    starting their own. Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self._executions: Dict[str, int] = {}
+        self._coalesced: Dict[str, int] = {}
+
+    async def do(self, key: Tuple[Any, ...], fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn once per key at a time and share its result with concurrent callers.
+        The first element of key names the operation in the counters.
+        """
+        operation = str(key[0])
+        task = self._in_flight.get(key)
+
+        if task is None:
+            self._executions[operation] = self._executions.get(operation, 0) + 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self._coalesced[operation] = self._coalesced.get(operation, 0) + 1
+
+        # Shield so one caller disconnecting does not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return per-operation counts of upstream executions and coalesced callers."""
+        operations = sorted(set(self._executions) | set(self._coalesced))
+        return {
+            operation: {
+                "executions": self._executions.get(operation, 0),
+                "coalesced": self._coalesced.get(operation, 0),
+                "in_flight": sum(1 for key in self._in_flight if str(key[0]) == operation),
+            }
+            for operation in operations
+        }
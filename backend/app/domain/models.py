@@ -18,6 +18,8 @@ class Ticket(BaseModel):
     priority: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    close_at: Optional[datetime] = None
+    first_response_at: Optional[datetime] = None
     customer_id: Optional[int] = None
     organization_id: Optional[int] = None
     group_id: Optional[int] = None
@@ -51,6 +53,7 @@ class User(BaseModel):
     firstname: Optional[str] = None
     lastname: Optional[str] = None
     email: Optional[str] = None
+    organization_id: Optional[int] = None
     active: Optional[bool] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
@@ -76,6 +79,9 @@ class CustomerTicketCount(BaseModel):
 
     customer_id: int
     ticket_count: int
+    customer_name: Optional[str] = None
+    organization_id: Optional[int] = None
+    organization_name: Optional[str] = None
 
 
 class TopCustomersResponse(BaseModel):
@@ -83,3 +89,16 @@ class TopCustomersResponse(BaseModel):
 
     customers: List[CustomerTicketCount]
 
+
+class OrganizationTicketCount(BaseModel):
+    """Model for organization ticket count."""
+
+    organization_id: int
+    ticket_count: int
+    organization_name: Optional[str] = None
+
+
+class TopOrganizationsResponse(BaseModel):
+    """Response model for top organizations by ticket count."""
+
+    organizations: List[OrganizationTicketCount]
@@ -1,16 +1,29 @@
 """
 Main application entry point.
 """
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.api.v1.dependencies import shutdown_dependencies, startup_dependencies
 from app.api.v1.router import api_router
 from app.core.config import settings
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown."""
+    await startup_dependencies()
+    yield
+    await shutdown_dependencies()
+
+
 app = FastAPI(
     title="Zammad Hacka API",
     description="Backend API for Zammad data visualization",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS Configuration
@@ -0,0 +1,235 @@
+"""
+Caching decorator for the Zammad repository.
+Follows Open/Closed Principle - adds caching without modifying the wrapped repository.
+Follows Liskov Substitution Principle - usable wherever IZammadRepository is expected.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from loguru import logger
+
+from app.core.singleflight import SingleFlight
+from app.domain.models import Organization, Ticket, User
+from app.repositories.zammad_repository import IZammadRepository
+
+
+@dataclass
+class _CacheEntry:
+    """A cached repository result and when it was fetched."""
+
+    value: Any
+    fetched_at: float
+
+
+class CachedZammadRepository(IZammadRepository):
+    """
+    Repository decorator that caches results per method and arguments.
+    Entries are fresh for the method's TTL. After that they are served stale for up to
+    stale_ttl seconds while one background refresh runs, and only expire completely
+    afterwards. The cache is bounded to max_entries with least-recently-used eviction.
+    """
+
+    DEFAULT_TTLS: Dict[str, float] = {
+        "get_tickets": 60.0,
+        "get_ticket": 30.0,
+        "get_users": 300.0,
+        "get_organizations": 300.0,
+    }
+
+    def __init__(
+        self,
+        repository: IZammadRepository,
+        ttls: Optional[Dict[str, float]] = None,
+        stale_ttl: float = 600.0,
+        max_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize cache around the repository that performs the actual fetches."""
+        self.repository = repository
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._single_flight = SingleFlight()
+        self._refreshing: Set[Hashable] = set()
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    async def _cached(
+        self, key: Tuple[Any, ...], fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return a cached value for key, fetching or revalidating it as needed."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = self._clock() - entry.fetched_at
+            ttl = self.ttls[key[0]]
+            if age < ttl:
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self._schedule_refresh(key, fetch)
+                return entry.value
+
+        # Missing or fully expired - concurrent misses share one fetch
+        return await self._single_flight.do(key, lambda: self._fetch_and_store(key, fetch))
+
+    async def _fetch_and_store(
+        self, key: Tuple[Any, ...], fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Fetch a value from the wrapped repository and store it in the cache."""
+        value = await fetch()
+        if value is not None:
+            self._entries[key] = _CacheEntry(value=value, fetched_at=self._clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def _schedule_refresh(
+        self, key: Tuple[Any, ...], fetch: Callable[[], Awaitable[Any]]
+    ) -> None:
+        """Start a background refresh for a stale entry unless one is already running."""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh() -> None:
+            try:
+                await self._fetch_and_store(key, fetch)
+            except Exception as e:
+                # Keep serving the stale value; the next access retries
+                logger.warning(f"Background refresh of {key[0]} failed: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.ensure_future(refresh())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    def invalidate(self) -> None:
+        """Drop all cached entries."""
+        self._entries.clear()
+
+    async def aclose(self) -> None:
+        """Cancel background refreshes and close the wrapped repository."""
+        for task in list(self._background_tasks):
+            task.cancel()
+        self._background_tasks.clear()
+        self._entries.clear()
+        await self.repository.aclose()
+
+    async def get_tickets(
+        self,
+        per_page: Optional[int] = 500,
+        page: Optional[int] = 1,
+        sort_by: Optional[str] = "created_at",
+        order: Optional[str] = "desc",
+        fetch_all: bool = False,
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[Ticket]:
+        """Get tickets, served from cache when possible."""
+        key = (
+            "get_tickets", per_page, page, sort_by, order, fetch_all, group_id,
+            created_from, created_to,
+        )
+        return await self._cached(
+            key,
+            lambda: self.repository.get_tickets(
+                per_page=per_page,
+                page=page,
+                sort_by=sort_by,
+                order=order,
+                fetch_all=fetch_all,
+                group_id=group_id,
+                created_from=created_from,
+                created_to=created_to,
+            ),
+        )
+
+    async def iter_tickets(
+        self,
+        per_page: Optional[int] = 500,
+        sort_by: Optional[str] = "created_at",
+        order: Optional[str] = "desc",
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[List[Ticket]]:
+        """Stream tickets straight from the wrapped repository; streams are not cached."""
+        async for tickets in self.repository.iter_tickets(
+            per_page=per_page,
+            sort_by=sort_by,
+            order=order,
+            group_id=group_id,
+            created_from=created_from,
+            created_to=created_to,
+        ):
+            yield tickets
+
+    async def get_ticket(self, ticket_id: int) -> Optional[Ticket]:
+        """Get a single ticket by ID, served from cache when possible."""
+        return await self._cached(
+            ("get_ticket", ticket_id), lambda: self.repository.get_ticket(ticket_id)
+        )
+
+    async def get_organizations(
+        self,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+        fetch_all: bool = False,
+    ) -> List[Organization]:
+        """Get organizations, served from cache when possible."""
+        return await self._cached(
+            ("get_organizations", limit, offset, updated_since, page, per_page, fetch_all),
+            lambda: self.repository.get_organizations(
+                limit=limit,
+                offset=offset,
+                updated_since=updated_since,
+                page=page,
+                per_page=per_page,
+                fetch_all=fetch_all,
+            ),
+        )
+
+    async def get_users(
+        self,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+        fetch_all: bool = False,
+    ) -> List[User]:
+        """Get users, served from cache when possible."""
+        return await self._cached(
+            ("get_users", limit, offset, updated_since, page, per_page, fetch_all),
+            lambda: self.repository.get_users(
+                limit=limit,
+                offset=offset,
+                updated_since=updated_since,
+                page=page,
+                per_page=per_page,
+                fetch_all=fetch_all,
+            ),
+        )
@@ -0,0 +1,142 @@
+"""
+Repository for the on-disk snapshot of synced Zammad data.
+Follows Interface Segregation and Dependency Inversion Principles.
+"""
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from pydantic import BaseModel
+
+from app.domain.models import Organization, Ticket, User
+
+ENTITY_MODELS: Dict[str, Type[BaseModel]] = {
+    "tickets": Ticket,
+    "users": User,
+    "organizations": Organization,
+}
+
+
+@dataclass
+class Snapshot:
+    """Entities and sync metadata loaded from a snapshot."""
+
+    tickets: List[Ticket] = field(default_factory=list)
+    users: List[User] = field(default_factory=list)
+    organizations: List[Organization] = field(default_factory=list)
+    meta: Dict[str, Any] = field(default_factory=dict)
+
+
+class ISnapshotRepository(ABC):
+    """Interface for snapshot persistence. Follows Interface Segregation Principle."""
+
+    @abstractmethod
+    def load(self, kinds: Optional[Iterable[str]] = None) -> Optional[Snapshot]:
+        """Load the stored snapshot, or None if there is none; kinds limits the entities read."""
+        pass
+
+    @abstractmethod
+    def replace(self, kind: str, entities: Iterable[BaseModel], meta: Dict[str, Any]) -> None:
+        """Replace all stored entities of a kind and update metadata."""
+        pass
+
+    @abstractmethod
+    def upsert(self, kind: str, entities: Iterable[BaseModel], meta: Dict[str, Any]) -> None:
+        """Insert or update entities of a kind and update metadata."""
+        pass
+
+    @abstractmethod
+    def size_bytes(self) -> int:
+        """Size of the stored snapshot in bytes."""
+        pass
+
+
+class SQLiteSnapshotRepository(ISnapshotRepository):
+    """
+    Snapshot repository backed by a local SQLite file.
+    Entities are stored as JSON documents keyed by id, so incremental syncs
+    only rewrite the rows that changed. Methods are blocking; call them from a thread.
+    """
+
+    def __init__(self, path: str):
+        """Initialize repository and create the schema if needed."""
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as connection, connection:
+            for kind in ENTITY_MODELS:
+                connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {kind} (id INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+                )
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the snapshot file."""
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def load(self, kinds: Optional[Iterable[str]] = None) -> Optional[Snapshot]:
+        """
+        Load the stored snapshot, or None if nothing has been saved yet.
+        Only the given entity kinds are read; the others are left empty.
+        """
+        kinds = set(ENTITY_MODELS if kinds is None else kinds)
+        with closing(self._connect()) as connection:
+            meta = {
+                key: json.loads(value)
+                for key, value in connection.execute("SELECT key, value FROM meta")
+            }
+            if not meta:
+                return None
+            entities = {
+                kind: [
+                    model.model_validate_json(data)
+                    for (data,) in connection.execute(f"SELECT data FROM {kind}")
+                ]
+                for kind, model in ENTITY_MODELS.items()
+                if kind in kinds
+            }
+        return Snapshot(meta=meta, **entities)
+
+    def replace(self, kind: str, entities: Iterable[BaseModel], meta: Dict[str, Any]) -> None:
+        """Replace all stored entities of a kind and update metadata in one transaction."""
+        self._write(kind, entities, meta, replace=True)
+
+    def upsert(self, kind: str, entities: Iterable[BaseModel], meta: Dict[str, Any]) -> None:
+        """Insert or update entities of a kind and update metadata in one transaction."""
+        self._write(kind, entities, meta, replace=False)
+
+    def _write(
+        self, kind: str, entities: Iterable[BaseModel], meta: Dict[str, Any], replace: bool
+    ) -> None:
+        """Write entities and metadata atomically."""
+        if kind not in ENTITY_MODELS:
+            raise ValueError(f"Unknown snapshot entity kind: {kind}")
+        rows = ((entity.id, entity.model_dump_json()) for entity in entities)
+        with closing(self._connect()) as connection, connection:
+            if replace:
+                connection.execute(f"DELETE FROM {kind}")
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {kind} (id, data) VALUES (?, ?)", rows
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in meta.items()],
+            )
+
+    def size_bytes(self) -> int:
+        """Size of the snapshot file including its write-ahead log."""
+        return sum(
+            os.path.getsize(path)
+            for path in (self.path, f"{self.path}-wal")
+            if os.path.exists(path)
+        )
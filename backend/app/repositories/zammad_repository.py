@@ -2,11 +2,59 @@
 Repository for Zammad API interactions.
 Follows Interface Segregation and Dependency Inversion Principles.
 """
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import httpx
+from loguru import logger
+from pydantic import TypeAdapter
 
 from app.domain.models import Organization, Ticket, User
 
+# Schemas built once and reused to validate whole pages straight from JSON bytes
+TICKET_PAGE_ADAPTER = TypeAdapter(Optional[List[Ticket]])
+USER_PAGE_ADAPTER = TypeAdapter(Optional[List[User]])
+ORGANIZATION_PAGE_ADAPTER = TypeAdapter(Optional[List[Organization]])
+
+
+def create_http_client(
+    timeout: float = 30.0,
+    connect_timeout: float = 10.0,
+    max_connections: int = 20,
+    max_keepalive_connections: int = 10,
+    keepalive_expiry: float = 30.0,
+    http2: bool = False,
+) -> httpx.AsyncClient:
+    """Create a connection-pooled HTTP client for talking to Zammad."""
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        http2=http2,
+    )
+
+
+def _search_time(value: Optional[datetime]) -> str:
+    """Format a range bound for the search query; None is an open bound (naive means UTC)."""
+    if value is None:
+        return "*"
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return f'"{value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}"'
+
 
 class IZammadRepository(ABC):
     """Interface for Zammad repository. Follows Interface Segregation Principle."""
@@ -20,8 +68,13 @@ class IZammadRepository(ABC):
         order: Optional[str] = "desc",
         fetch_all: bool = False,
         group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
     ) -> List[Ticket]:
-        """Get tickets from Zammad with pagination and sorting, optionally filtered by group_id."""
+        """
+        Get tickets from Zammad with pagination and sorting, optionally filtered by group_id
+        and by a created_at range (either bound may be open).
+        """
         pass
 
     @abstractmethod
@@ -31,16 +84,70 @@ class IZammadRepository(ABC):
 
     @abstractmethod
     async def get_organizations(
-        self, limit: Optional[int] = None, offset: Optional[int] = None
+        self,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+        fetch_all: bool = False,
     ) -> List[Organization]:
-        """Get organizations from Zammad."""
+        """
+        Get organizations from Zammad, optionally only those updated since a time.
+        fetch_all pages through every organization instead of returning one page.
+        """
         pass
 
     @abstractmethod
     async def get_users(
-        self, limit: Optional[int] = None, offset: Optional[int] = None
+        self,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+        fetch_all: bool = False,
     ) -> List[User]:
-        """Get users from Zammad."""
+        """
+        Get users from Zammad, optionally only those updated since a time.
+        fetch_all pages through every user instead of returning one page.
+        """
+        pass
+
+    async def iter_tickets(
+        self,
+        per_page: Optional[int] = 500,
+        sort_by: Optional[str] = "created_at",
+        order: Optional[str] = "desc",
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[List[Ticket]]:
+        """
+        Yield every ticket page by page, so callers can fold over tickets
+        without holding them all in memory.
+        Default implementation pages through get_tickets.
+        """
+        per_page = per_page or 500
+        page = 1
+        while True:
+            tickets = await self.get_tickets(
+                per_page=per_page,
+                page=page,
+                sort_by=sort_by,
+                order=order,
+                group_id=group_id,
+                created_from=created_from,
+                created_to=created_to,
+            )
+            if tickets:
+                yield tickets
+            if len(tickets) < per_page:
+                break
+            page += 1
+
+    async def aclose(self) -> None:
+        """Release resources held by the repository."""
         pass
 
 
@@ -50,82 +157,196 @@ class ZammadRepository(IZammadRepository):
     Follows Single Responsibility Principle - handles only Zammad API communication.
     """
 
-    def __init__(self, base_url: str, api_token: str):
-        """Initialize repository with Zammad API configuration."""
+    def __init__(
+        self,
+        base_url: str,
+        api_token: str,
+        client: Optional[httpx.AsyncClient] = None,
+        crawl_concurrency: int = 1,
+        bulk_decode: bool = True,
+    ):
+        """
+        Initialize repository with Zammad API configuration.
+        The repository owns the HTTP client and reuses its connection pool for every call.
+        crawl_concurrency > 1 fetches pages of fetch_all crawls in parallel.
+        bulk_decode validates each page from raw JSON in one pass instead of
+        building a dict per row and validating it field by field.
+        """
         self.base_url = base_url.rstrip("/")
         self.api_token = api_token
         self.headers = {
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json",
         }
+        self._client = client
+        self.crawl_concurrency = max(1, crawl_concurrency)
+        self.bulk_decode = bulk_decode
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating a default one on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = create_http_client()
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client and release pooled connections."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def _get(self, endpoint: str) -> httpx.Response:
+        """Make HTTP GET request to Zammad API and check the status."""
+        url = f"{self.base_url}{endpoint}"
+        response = await self.client.get(url, headers=self.headers)
+        response.raise_for_status()
+        return response
 
     async def _make_request(self, endpoint: str) -> dict:
         """Make HTTP request to Zammad API."""
-        import httpx
+        response = await self._get(endpoint)
+        return response.json()
 
-        url = f"{self.base_url}{endpoint}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers, timeout=30.0)
-            response.raise_for_status()
-            return response.json()
+    async def _get_page(self, endpoint: str, adapter: TypeAdapter, model: type) -> list:
+        """Fetch one page of entities and decode it with the bulk or per-row path."""
+        response = await self._get(endpoint)
+        if self.bulk_decode:
+            return adapter.validate_json(response.content) or []
+        return [model(**row) for row in response.json() or []]
 
-    async def get_tickets(
+    async def _get_ticket_page(self, endpoint: str) -> List[Ticket]:
+        """Fetch and decode one page of tickets."""
+        return await self._get_page(endpoint, TICKET_PAGE_ADAPTER, Ticket)
+
+    async def _iter_pages(
         self,
-        per_page: Optional[int] = 500,
-        page: Optional[int] = 1,
-        sort_by: Optional[str] = "created_at",
-        order: Optional[str] = "desc",
-        fetch_all: bool = False,
-        group_id: Optional[int] = None,
-    ) -> List[Ticket]:
-        """Get tickets from Zammad with pagination and sorting using search endpoint."""
+        fetch_page: Callable[[int], Awaitable[list]],
+        first_page: int,
+        per_page: int,
+    ) -> AsyncIterator[list]:
+        """
+        Yield consecutive non-empty pages in page order until the first short or empty page.
+        Up to crawl_concurrency pages are requested ahead of the page being yielded,
+        so memory stays bounded by the window while results match a sequential crawl.
+        """
+        pending: Dict[int, asyncio.Task] = {}
+        next_page = first_page
+        current_page = first_page
+
+        try:
+            while True:
+                # Keep the window of requests ahead of the current page full
+                while len(pending) < self.crawl_concurrency:
+                    pending[next_page] = asyncio.create_task(fetch_page(next_page))
+                    next_page += 1
+
+                data = await pending.pop(current_page) or []
+                if data:
+                    yield data
+                if len(data) < per_page:
+                    break  # Last page; requests probed beyond it are dropped
+                current_page += 1
+        finally:
+            for task in pending.values():
+                if task.done() and not task.cancelled():
+                    task.exception()  # Mark failures of dropped probes as retrieved
+                task.cancel()
+
+    def _ticket_search_endpoint(
+        self,
+        per_page: Optional[int],
+        sort_by: Optional[str],
+        order: Optional[str],
+        group_id: Optional[int],
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> Tuple[Callable[[int], str], int]:
+        """Return a page -> search endpoint builder and the effective page size."""
         # Use search endpoint for sorting support
         endpoint = "/api/v1/tickets/search"
-        all_tickets = []
-        current_page = page if page is not None else 1
-        
+
         # Use maximum per_page if not specified
         if per_page is None:
             per_page = 500
-        
+
         # Default sorting to latest first
         if sort_by is None:
             sort_by = "created_at"
         if order is None:
             order = "desc"
-        
-        # Build query string - filter by group_id if provided
+
+        # Build query string - filter by group_id and created_at range if provided
+        clauses = []
         if group_id is not None:
-            query = f"group_id:{group_id}"
-        else:
-            query = "*"  # Get all tickets
-        
-        while True:
+            clauses.append(f"group_id:{group_id}")
+        if created_from is not None or created_to is not None:
+            clauses.append(
+                f"created_at:[{_search_time(created_from)} TO {_search_time(created_to)}]"
+            )
+        query = quote(" AND ".join(clauses) or "*", safe=":*")  # "*" gets all tickets
+
+        def build_endpoint(page_number: int) -> str:
             # Search endpoint uses 'order_by' instead of 'order'
             params = [
                 f"query={query}",
-                f"page={current_page}",
+                f"page={page_number}",
                 f"per_page={per_page}",
                 f"sort_by={sort_by}",
                 f"order_by={order}"  # Note: search endpoint uses 'order_by' not 'order'
             ]
-            endpoint_with_params = f"{endpoint}?{'&'.join(params)}"
-            
-            data = await self._make_request(endpoint_with_params)
-            
-            if not data or len(data) == 0:
-                break  # No more tickets
-            
-            all_tickets.extend([Ticket(**ticket) for ticket in data])
-            
-            # Stop if not fetching all, or got less than requested (last page)
-            if not fetch_all or len(data) < per_page:
-                break
-            
-            current_page += 1
-        
+            return f"{endpoint}?{'&'.join(params)}"
+
+        return build_endpoint, per_page
+
+    async def get_tickets(
+        self,
+        per_page: Optional[int] = 500,
+        page: Optional[int] = 1,
+        sort_by: Optional[str] = "created_at",
+        order: Optional[str] = "desc",
+        fetch_all: bool = False,
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[Ticket]:
+        """Get tickets from Zammad with pagination and sorting using search endpoint."""
+        build_endpoint, per_page = self._ticket_search_endpoint(
+            per_page, sort_by, order, group_id, created_from, created_to
+        )
+        current_page = page if page is not None else 1
+
+        if not fetch_all:
+            return await self._get_ticket_page(build_endpoint(current_page))
+
+        all_tickets = []
+        async for tickets in self._iter_pages(
+            lambda page_number: self._get_ticket_page(build_endpoint(page_number)),
+            current_page,
+            per_page,
+        ):
+            all_tickets.extend(tickets)
         return all_tickets
 
+    async def iter_tickets(
+        self,
+        per_page: Optional[int] = 500,
+        sort_by: Optional[str] = "created_at",
+        order: Optional[str] = "desc",
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> AsyncIterator[List[Ticket]]:
+        """Yield every ticket page by page as pages arrive, prefetching ahead in parallel."""
+        build_endpoint, per_page = self._ticket_search_endpoint(
+            per_page, sort_by, order, group_id, created_from, created_to
+        )
+        async for tickets in self._iter_pages(
+            lambda page_number: self._get_ticket_page(build_endpoint(page_number)),
+            1,
+            per_page,
+        ):
+            yield tickets
+
     async def get_ticket(self, ticket_id: int) -> Optional[Ticket]:
         """Get a single ticket by ID."""
         endpoint = f"/api/v1/tickets/{ticket_id}"
@@ -135,35 +356,97 @@ class ZammadRepository(IZammadRepository):
         except Exception:
             return None
 
-    async def get_organizations(
-        self, limit: Optional[int] = None, offset: Optional[int] = None
-    ) -> List[Organization]:
-        """Get organizations from Zammad."""
-        endpoint = "/api/v1/organizations"
+    @staticmethod
+    def _entity_endpoint(
+        path: str,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+    ) -> str:
+        """
+        Build a users/organizations list endpoint. With updated_since the search
+        endpoint is used instead, newest update first.
+        """
         params = []
+        if updated_since is not None:
+            path += "/search"
+            query = quote(f"updated_at:[{_search_time(updated_since)} TO *]", safe=":*")
+            params += [f"query={query}", "sort_by=updated_at", "order_by=desc"]
         if limit:
             params.append(f"limit={limit}")
         if offset:
             params.append(f"offset={offset}")
+        if page:
+            params.append(f"page={page}")
+        if per_page:
+            params.append(f"per_page={per_page}")
         if params:
-            endpoint += "?" + "&".join(params)
+            path += "?" + "&".join(params)
+        return path
 
-        data = await self._make_request(endpoint)
-        return [Organization(**org) for org in data]
+    async def _get_entities(
+        self,
+        path: str,
+        adapter: TypeAdapter,
+        model: type,
+        limit: Optional[int],
+        offset: Optional[int],
+        updated_since: Optional[datetime],
+        page: Optional[int],
+        per_page: Optional[int],
+        fetch_all: bool,
+    ) -> list:
+        """
+        Fetch one page of users or organizations, or with fetch_all every page,
+        crawled with the same bounded prefetch window as tickets.
+        """
+        if not fetch_all:
+            endpoint = self._entity_endpoint(path, limit, offset, updated_since, page, per_page)
+            return await self._get_page(endpoint, adapter, model)
+
+        per_page = per_page or 500
+        entities: list = []
+        async for items in self._iter_pages(
+            lambda page_number: self._get_page(
+                self._entity_endpoint(path, None, None, updated_since, page_number, per_page),
+                adapter,
+                model,
+            ),
+            first_page=page or 1,
+            per_page=per_page,
+        ):
+            entities.extend(items)
+        return entities
+
+    async def get_organizations(
+        self,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+        fetch_all: bool = False,
+    ) -> List[Organization]:
+        """Get organizations from Zammad."""
+        return await self._get_entities(
+            "/api/v1/organizations", ORGANIZATION_PAGE_ADAPTER, Organization,
+            limit, offset, updated_since, page, per_page, fetch_all,
+        )
 
     async def get_users(
-        self, limit: Optional[int] = None, offset: Optional[int] = None
+        self,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+        fetch_all: bool = False,
     ) -> List[User]:
         """Get users from Zammad."""
-        endpoint = "/api/v1/users"
-        params = []
-        if limit:
-            params.append(f"limit={limit}")
-        if offset:
-            params.append(f"offset={offset}")
-        if params:
-            endpoint += "?" + "&".join(params)
-
-        data = await self._make_request(endpoint)
-        return [User(**user) for user in data]
+        return await self._get_entities(
+            "/api/v1/users", USER_PAGE_ADAPTER, User,
+            limit, offset, updated_since, page, per_page, fetch_all,
+        )
 
@@ -0,0 +1,357 @@
+"""
+Aggregation engine over ticket tables.
+Follows Single Responsibility Principle - handles only computing ticket aggregations.
+Folds see one TicketTable at a time - either the whole local store or one page
+of a crawl - and count with array operations over its columns.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.domain.models import (
+    CustomerTicketCount,
+    OrganizationTicketCount,
+    Ticket,
+    TicketStatistics,
+)
+from app.services.durations import TicketDurations
+from app.services.history import TicketHistory
+from app.services.ranking import MICROSECONDS_PER_DAY, DailyCounts, top_k
+from app.services.rollups import TicketRollups
+from app.services.ticket_table import NULL_CODE, NULL_ID, NULL_TIME, TicketTable
+
+
+def _concatenate(chunks: List[np.ndarray]) -> np.ndarray:
+    """Concatenate int64 arrays, allowing an empty list."""
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+
+def _top_counts(counts: Dict[int, int], limit: int) -> List[Tuple[int, int]]:
+    """Select the limit highest (id, count) pairs of a count dict with a heap."""
+    return top_k(
+        np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)),
+        np.fromiter(counts.values(), dtype=np.int64, count=len(counts)),
+        limit,
+    )
+
+
+def _combine_counts(
+    counts: Dict[Hashable, int], removed: Dict[Hashable, int], added: Dict[Hashable, int]
+) -> Dict[Hashable, int]:
+    """Counts with removed's subtracted and added's added, dropping keys that reach zero."""
+    combined = dict(counts)
+    for key, count in removed.items():
+        combined[key] = combined.get(key, 0) - count
+    for key, count in added.items():
+        combined[key] = combined.get(key, 0) + count
+    return {key: count for key, count in combined.items() if count}
+
+
+def _combine_daily(
+    daily: Dict[str, Dict[str, int]],
+    removed: Dict[str, Dict[str, int]],
+    added: Dict[str, Dict[str, int]],
+) -> Dict[str, Dict[str, int]]:
+    """Daily creation buckets with removed's subtracted and added's added, by date."""
+    combined = dict(daily)
+    for buckets, sign in ((removed, -1), (added, 1)):
+        for date_key, bucket in buckets.items():
+            current = combined.get(date_key, {"time": bucket["time"], "value": 0})
+            combined[date_key] = {**current, "value": current["value"] + sign * bucket["value"]}
+    return {key: bucket for key, bucket in sorted(combined.items()) if bucket["value"]}
+
+
+class TicketFold(ABC):
+    """Accumulates an aggregation one table of tickets at a time."""
+
+    @abstractmethod
+    def add(self, table: TicketTable) -> None:
+        """Fold a table of tickets into the running aggregation."""
+        pass
+
+
+async def fold_pages(pages: AsyncIterator[List[Ticket]], *folds: TicketFold) -> None:
+    """Convert every page from the stream to a table and feed it to each fold."""
+    async for tickets in pages:
+        table = TicketTable.from_tickets(tickets)
+        for fold in folds:
+            fold.add(table)
+
+
+@dataclass
+class TicketAggregates:
+    """Every dashboard aggregation computed from one ticket snapshot."""
+
+    statistics: TicketStatistics
+    customer_counts: Dict[int, int] = field(default_factory=dict)
+    organization_counts: Dict[int, int] = field(default_factory=dict)
+    # Tickets per (creation day, customer/organization) and per ticket, for windowed rankings
+    daily_customers: DailyCounts = field(default_factory=DailyCounts.empty)
+    daily_organizations: DailyCounts = field(default_factory=DailyCounts.empty)
+    daily_created: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # Creation/close timelines for all tickets and per group_id
+    history: TicketHistory = field(default_factory=TicketHistory.empty)
+    history_by_group: Dict[Optional[int], TicketHistory] = field(default_factory=dict)
+    # Creation counts per minute/hour/day bucket by state, priority and group
+    rollups: TicketRollups = field(default_factory=TicketRollups)
+    # Resolution, first-response and open-age histograms per group_id
+    durations: TicketDurations = field(default_factory=TicketDurations)
+
+    def updated(self, removed: TicketTable, added: TicketTable) -> "TicketAggregates":
+        """
+        Aggregates with the removed rows taken out and the added rows folded in, as
+        after a store change that replaced removed with added; this result is left
+        unchanged. Only the changed rows are aggregated and merged in, so a webhook
+        or small sync costs a merge instead of a pass over every ticket.
+        """
+        # The store maintains the duration histograms, so the deltas reuse them unfolded
+        before = _aggregate(removed, self.durations)
+        after = _aggregate(added, self.durations)
+        statistics = self.statistics
+        history_by_group = dict(self.history_by_group)
+        empty = TicketHistory.empty()
+        for group_id in {**before.history_by_group, **after.history_by_group}:
+            history = history_by_group.get(group_id, empty).updated(
+                before.history_by_group.get(group_id, empty),
+                after.history_by_group.get(group_id, empty),
+            )
+            if len(history):
+                history_by_group[group_id] = history
+            else:
+                history_by_group.pop(group_id, None)
+
+        return TicketAggregates(
+            statistics=TicketStatistics(
+                total_tickets=statistics.total_tickets
+                - before.statistics.total_tickets + after.statistics.total_tickets,
+                open_tickets=statistics.open_tickets
+                - before.statistics.open_tickets + after.statistics.open_tickets,
+                closed_tickets=statistics.closed_tickets
+                - before.statistics.closed_tickets + after.statistics.closed_tickets,
+                tickets_by_state=_combine_counts(
+                    statistics.tickets_by_state,
+                    before.statistics.tickets_by_state,
+                    after.statistics.tickets_by_state,
+                ),
+                tickets_by_priority=_combine_counts(
+                    statistics.tickets_by_priority,
+                    before.statistics.tickets_by_priority,
+                    after.statistics.tickets_by_priority,
+                ),
+            ),
+            customer_counts=_combine_counts(
+                self.customer_counts, before.customer_counts, after.customer_counts
+            ),
+            organization_counts=_combine_counts(
+                self.organization_counts, before.organization_counts, after.organization_counts
+            ),
+            daily_customers=self.daily_customers.updated(
+                before.daily_customers, after.daily_customers
+            ),
+            daily_organizations=self.daily_organizations.updated(
+                before.daily_organizations, after.daily_organizations
+            ),
+            daily_created=_combine_daily(
+                self.daily_created, before.daily_created, after.daily_created
+            ),
+            history=self.history.updated(before.history, after.history),
+            history_by_group=history_by_group,
+            rollups=self.rollups.updated(removed, added),
+            durations=self.durations,
+        )
+
+    def top_customers(
+        self,
+        limit: int,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[CustomerTicketCount]:
+        """
+        Get the customers with the most tickets, highest count first.
+        With created_from/created_to only tickets created within that window count.
+        """
+        if created_from is None and created_to is None:
+            top = _top_counts(self.customer_counts, limit)
+        else:
+            top = self.daily_customers.top(limit, created_from, created_to)
+        return [
+            CustomerTicketCount(customer_id=customer_id, ticket_count=count)
+            for customer_id, count in top
+        ]
+
+    def top_organizations(
+        self,
+        limit: int,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[OrganizationTicketCount]:
+        """
+        Get the organizations with the most tickets, highest count first.
+        With created_from/created_to only tickets created within that window count.
+        """
+        if created_from is None and created_to is None:
+            top = _top_counts(self.organization_counts, limit)
+        else:
+            top = self.daily_organizations.top(limit, created_from, created_to)
+        return [
+            OrganizationTicketCount(organization_id=organization_id, ticket_count=count)
+            for organization_id, count in top
+        ]
+
+
+class TicketAggregator(TicketFold):
+    """
+    Computes totals, state/priority breakdowns, per-customer counts, daily
+    creation buckets, creation/close history, rollups and duration histograms in a
+    single pass over each table, so every endpoint can read its slice from one
+    shared result.
+    """
+
+    def __init__(
+        self,
+        rollup_retention: Optional[Dict[int, int]] = None,
+        durations: Optional[TicketDurations] = None,
+    ):
+        """
+        Initialize empty counters; rollup_retention maps resolution seconds to buckets kept.
+        durations are histograms already maintained for the same tickets, which are
+        then reused instead of being folded again.
+        """
+        self.total_tickets = 0
+        self.open_tickets = 0
+        self.closed_tickets = 0
+        self.tickets_by_state: Dict[str, int] = {}
+        self.tickets_by_priority: Dict[str, int] = {}
+        self.customer_counts: Dict[int, int] = {}
+        self.organization_counts: Dict[int, int] = {}
+        # Creation time and id per ticket, per dimension, indexed into DailyCounts at the end
+        self._entity_created: Dict[str, List[np.ndarray]] = {
+            "customer_id": [], "organization_id": []
+        }
+        self._entity_ids: Dict[str, List[np.ndarray]] = {"customer_id": [], "organization_id": []}
+        self.daily_created: Dict[str, Dict[str, int]] = {}
+        self._created_by_group: Dict[Optional[int], List[np.ndarray]] = {}
+        self._closed_by_group: Dict[Optional[int], List[np.ndarray]] = {}
+        self.rollups = TicketRollups(rollup_retention)
+        self._fold_durations = durations is None
+        self.durations = durations if durations is not None else TicketDurations()
+
+    def add(self, table: TicketTable) -> None:
+        """Fold a table of tickets into all aggregations."""
+        self.total_tickets += len(table)
+        self._add_states(table)
+        self._add_entities(table)
+        self._add_daily_created(table)
+        self._add_history(table)
+        self.rollups.add(table)
+        if self._fold_durations:
+            self.durations.add(table)
+
+    def _add_states(self, table: TicketTable) -> None:
+        """Count by state and priority; open/closed is derived once per distinct state."""
+        for state, count in table.value_counts("state").items():
+            if state.lower() == "closed":
+                self.closed_tickets += count
+            else:
+                self.open_tickets += count
+            self.tickets_by_state[state] = self.tickets_by_state.get(state, 0) + count
+        for priority, count in table.value_counts("priority").items():
+            self.tickets_by_priority[priority] = (
+                self.tickets_by_priority.get(priority, 0) + count
+            )
+
+    def _add_entities(self, table: TicketTable) -> None:
+        """Count tickets per customer and organization, overall and per creation day."""
+        created = table.column("created_at")
+        for name, totals in (
+            ("customer_id", self.customer_counts),
+            ("organization_id", self.organization_counts),
+        ):
+            entities = table.column(name)
+            known = entities != NULL_ID
+            entity_ids, counts = np.unique(entities[known], return_counts=True)
+            for entity_id, count in zip(entity_ids.tolist(), counts.tolist()):
+                totals[entity_id] = totals.get(entity_id, 0) + count
+            dated = known & (created != NULL_TIME)
+            self._entity_created[name].append(created[dated])
+            self._entity_ids[name].append(entities[dated])
+
+    def _add_daily_created(self, table: TicketTable) -> None:
+        """Count tickets created per UTC day, keyed by YYYY-MM-DD."""
+        created = table.column("created_at")
+        created = created[created != NULL_TIME]
+        days, counts = np.unique(created // MICROSECONDS_PER_DAY, return_counts=True)
+        date_keys = np.datetime_as_string(days.astype("datetime64[D]"))
+        # Grafana expects milliseconds; stamp each day with its UTC midnight
+        day_starts = days * (MICROSECONDS_PER_DAY // 1000)
+
+        for date_key, day_start, count in zip(
+            date_keys.tolist(), day_starts.tolist(), counts.tolist()
+        ):
+            bucket = self.daily_created.get(date_key)
+            if bucket is None:
+                bucket = self.daily_created[date_key] = {"time": day_start, "value": 0}
+            bucket["value"] += count
+
+    def _add_history(self, table: TicketTable) -> None:
+        """
+        Collect creation and close times per group.
+        Closed tickets count as closed at close_at, else at their last update.
+        """
+        created = table.column("created_at")
+        closed = table.close_times()
+        groups = table.column("group_id")
+        is_closed = table.is_closed()
+        group_values = table.dictionaries["group_id"].values
+        for code in np.unique(groups).tolist():
+            group_id = group_values[code] if code != NULL_CODE else None
+            in_group = groups == code
+            self._created_by_group.setdefault(group_id, []).append(created[in_group])
+            self._closed_by_group.setdefault(group_id, []).append(closed[in_group & is_closed])
+
+    def result(self) -> TicketAggregates:
+        """Build the shared aggregation result."""
+        history_by_group = {
+            group_id: TicketHistory(
+                _concatenate(chunks), _concatenate(self._closed_by_group[group_id])
+            )
+            for group_id, chunks in self._created_by_group.items()
+        }
+        history = TicketHistory(
+            _concatenate([h.created for h in history_by_group.values()]),
+            _concatenate([h.closed for h in history_by_group.values()]),
+        )
+        return TicketAggregates(
+            statistics=TicketStatistics(
+                total_tickets=self.total_tickets,
+                open_tickets=self.open_tickets,
+                closed_tickets=self.closed_tickets,
+                tickets_by_state=self.tickets_by_state,
+                tickets_by_priority=self.tickets_by_priority,
+            ),
+            customer_counts=self.customer_counts,
+            organization_counts=self.organization_counts,
+            daily_customers=DailyCounts(
+                _concatenate(self._entity_created["customer_id"]),
+                _concatenate(self._entity_ids["customer_id"]),
+            ),
+            daily_organizations=DailyCounts(
+                _concatenate(self._entity_created["organization_id"]),
+                _concatenate(self._entity_ids["organization_id"]),
+            ),
+            daily_created=self.daily_created,
+            history=history,
+            history_by_group=history_by_group,
+            rollups=self.rollups,
+            durations=self.durations,
+        )
+
+
+def _aggregate(table: TicketTable, durations: TicketDurations) -> TicketAggregates:
+    """Aggregate one table, reusing maintained duration histograms instead of folding them."""
+    aggregator = TicketAggregator(durations=durations)
+    aggregator.add(table)
+    return aggregator.result()
@@ -0,0 +1,229 @@
+"""
+Time bucketing for Grafana time series.
+Follows Single Responsibility Principle - handles only choosing and laying out buckets.
+Buckets are fixed widths (minutes, hours, days, weeks) or calendar months. Counting
+reads a sorted creation-time index with binary search, so a query touches only the
+buckets of its range, not every ticket.
+Day, week and month buckets follow the wall clock of an explicit time zone; every
+Grafana endpoint lays out its buckets here, so they all stamp the same instants.
+"""
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone, tzinfo
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+from app.core.exceptions import QueryError
+from app.services.promql import MAX_POINTS_PER_SERIES, parse_duration, parse_timestamp
+from app.services.rollups import DAY, HOUR, MINUTE
+
+WEEK = 7 * DAY
+# The Unix epoch is a Thursday; weeks start on the Monday after it
+WEEK_ORIGIN = 4 * DAY
+
+# Widths picked from intervalMs/maxDataPoints, finest first
+_FIXED_LADDER = (
+    MINUTE, 5 * MINUTE, 10 * MINUTE, 15 * MINUTE, 30 * MINUTE,
+    HOUR, 3 * HOUR, 6 * HOUR, 12 * HOUR, DAY, WEEK,
+)
+_MONTH_LADDER = (1, 3, 12)
+_AVERAGE_MONTH = 30 * DAY
+
+# Time zones are probed this often when looking for offset changes
+_OFFSET_SAMPLE = 7 * DAY
+
+
+def parse_grafana_time(value: Optional[str], default: float) -> float:
+    """Parse a Grafana time (epoch milliseconds, epoch seconds or ISO 8601) into seconds."""
+    if not value:
+        return default
+    seconds = parse_timestamp(value)
+    # Grafana sends epoch milliseconds; anything this large is not a plausible second count
+    return seconds / 1000 if seconds > 1e11 else seconds
+
+
+def get_zone(name: Optional[str]) -> tzinfo:
+    """
+    Resolve an IANA time zone name; empty and "utc" mean UTC. Grafana's "browser"
+    zone is only known to the browser, so it is refused rather than guessed.
+    """
+    if not name or name.lower() == "utc":
+        return timezone.utc
+    if name.lower() == "browser":
+        raise QueryError(
+            "time zone 'browser' cannot be resolved by the server; "
+            "send an IANA time zone name such as 'Europe/Stockholm' instead"
+        )
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise QueryError(f"unknown time zone {name!r}")
+
+
+def _offset_at(zone: tzinfo, instant: float) -> int:
+    """UTC offset of the zone in seconds at a Unix timestamp."""
+    return int(datetime.fromtimestamp(instant, tz=zone).utcoffset().total_seconds())
+
+
+def _offset_transitions(zone: tzinfo, start: float, end: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Unix timestamps at which the zone's UTC offset changes within [start, end], and the
+    offset from each on; the first entry is the offset at start.
+    The zone is probed weekly and each change is pinned down by bisection, so a range
+    costs a few dozen conversions however many buckets it has.
+    """
+    start, end = math.floor(start), math.ceil(end)
+    instants, offsets = [start], [_offset_at(zone, start)]
+    probes = list(range(start + _OFFSET_SAMPLE, end, _OFFSET_SAMPLE)) + [end]
+    low = start
+    for high in probes:
+        if _offset_at(zone, high) != offsets[-1]:
+            while high - low > 1:
+                middle = (low + high) // 2
+                if _offset_at(zone, middle) == offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            instants.append(high)
+            offsets.append(_offset_at(zone, high))
+        low = high
+    return np.array(instants, dtype=np.float64), np.array(offsets, dtype=np.float64)
+
+
+def _offsets(transitions: Tuple[np.ndarray, np.ndarray], instants: np.ndarray) -> np.ndarray:
+    """Look up the UTC offset at every Unix timestamp in one vectorized search."""
+    changes, offsets = transitions
+    index = np.searchsorted(changes, instants, side="right") - 1
+    return offsets[np.maximum(index, 0)]
+
+
+def _local_to_utc(
+    transitions: Tuple[np.ndarray, np.ndarray], local: np.ndarray
+) -> np.ndarray:
+    """
+    Convert wall-clock times (seconds since 1970-01-01 local) to Unix timestamps.
+    Wall times skipped by a forward change land just after it.
+    """
+    guess = local - _offsets(transitions, local)
+    return local - _offsets(transitions, guess)
+
+
+@dataclass(frozen=True)
+class BucketInterval:
+    """A bucket width: a whole number of seconds, or of calendar months."""
+
+    seconds: int = 0
+    months: int = 0
+
+    @property
+    def approximate_seconds(self) -> int:
+        """Width in seconds, counting a month as 30 days."""
+        return self.seconds or self.months * _AVERAGE_MONTH
+
+
+def parse_interval(text: str) -> BucketInterval:
+    """
+    Parse an interval such as 5m, 1h, 1d, 1w or 1M (calendar month).
+    Fixed intervals are rounded up to whole minutes.
+    """
+    text = text.strip()
+    if text.endswith("M") and text[:-1].isdigit() and int(text[:-1]) > 0:
+        return BucketInterval(months=int(text[:-1]))
+    seconds = parse_duration(text)
+    if seconds <= 0:
+        raise QueryError(f"invalid interval {text!r}")
+    return BucketInterval(seconds=max(MINUTE, math.ceil(seconds / MINUTE) * MINUTE))
+
+
+def choose_interval(
+    start: float,
+    end: float,
+    interval_ms: Optional[float] = None,
+    max_data_points: Optional[int] = None,
+) -> BucketInterval:
+    """
+    Pick the finest standard interval that is at least Grafana's intervalMs and keeps
+    the range within maxDataPoints buckets. Without either hint, buckets are days.
+    """
+    if not interval_ms and not max_data_points:
+        return BucketInterval(seconds=DAY)
+    minimum = max(
+        (interval_ms or 0) / 1000,
+        (end - start) / max_data_points if max_data_points else 0,
+    )
+    for width in _FIXED_LADDER:
+        if width >= minimum:
+            return BucketInterval(seconds=width)
+    for months in _MONTH_LADDER:
+        if months * _AVERAGE_MONTH >= minimum:
+            return BucketInterval(months=months)
+    return BucketInterval(months=12 * math.ceil(minimum / (12 * _AVERAGE_MONTH)))
+
+
+def _month_edges(start: float, end: float, months: int) -> np.ndarray:
+    """Edges of calendar-month buckets, aligned to multiples of months since 1970-01."""
+    first = np.datetime64(int(start), "s").astype("datetime64[M]").astype(np.int64)
+    last = np.datetime64(int(end), "s").astype("datetime64[M]").astype(np.int64)
+    first = first // months * months
+    count = (last - first) // months + 1
+    edges = (first + np.arange(count + 1) * months).astype("datetime64[M]")
+    return edges.astype("datetime64[s]").astype(np.int64).astype(np.float64)
+
+
+def _fixed_edges(start: float, end: float, width: int, origin: float) -> np.ndarray:
+    """Edges of fixed-width buckets covering [start, end], aligned to origin."""
+    first = math.floor((start - origin) / width) * width + origin
+    count = math.floor((end - first) / width) + 1
+    return first + np.arange(count + 1, dtype=np.float64) * width
+
+
+def bucket_edges(
+    start: float,
+    end: float,
+    interval: BucketInterval,
+    max_points: int = MAX_POINTS_PER_SERIES,
+    zone: tzinfo = timezone.utc,
+) -> np.ndarray:
+    """
+    Return aligned bucket edges (Unix seconds) covering [start, end].
+    Bucket i is [edges[i], edges[i + 1]). Sub-day buckets are even steps aligned to
+    the zone's clock at start; day, week and month buckets start at local midnight,
+    so they stretch or shrink across offset changes. Raises QueryError, before
+    anything is allocated, if the range would need more than max_points buckets.
+    """
+    if end < start:
+        raise QueryError("end timestamp must not be before start time")
+    bucket_count = math.ceil((end - start) / interval.approximate_seconds) + 1
+    if bucket_count > max_points:
+        raise QueryError(
+            f"exceeded maximum resolution of {max_points:,} points per timeseries. "
+            "Try a larger interval"
+        )
+    if zone is timezone.utc:
+        if interval.months:
+            return _month_edges(start, end, interval.months)
+        origin = WEEK_ORIGIN if interval.seconds % WEEK == 0 else 0
+        return _fixed_edges(start, end, interval.seconds, origin)
+
+    if interval.seconds and interval.seconds < DAY:
+        return _fixed_edges(start, end, interval.seconds, -_offset_at(zone, start))
+
+    # The first and last edges may lie up to one bucket outside the range
+    margin = interval.approximate_seconds + 2 * DAY
+    transitions = _offset_transitions(zone, start - margin, end + margin)
+    bounds = np.array([start, end])
+    local_start, local_end = bounds + _offsets(transitions, bounds)
+    if interval.months:
+        local = _month_edges(local_start, local_end, interval.months)
+    else:
+        origin = WEEK_ORIGIN if interval.seconds % WEEK == 0 else 0
+        local = _fixed_edges(local_start, local_end, interval.seconds, origin)
+    return np.unique(_local_to_utc(transitions, local))
+
+
+def grafana_datapoints(edges: np.ndarray, counts: np.ndarray) -> List[List[int]]:
+    """Format bucket counts as Grafana [value, bucket start in ms] pairs."""
+    starts_ms = (edges[:-1] * 1000).astype(np.int64).tolist()
+    return [[count, start] for count, start in zip(counts.tolist(), starts_ms)]
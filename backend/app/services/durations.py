@@ -0,0 +1,199 @@
+"""
+Ticket duration histograms for SLA metrics.
+Follows Single Responsibility Principle - handles only ticket duration histograms.
+Histograms use fixed buckets and are updated by adding and removing tickets, so a
+sync only touches the tickets it changed. Open-ticket ages keep moving, so they are
+kept as a sorted index of creation times and bucketed on demand with one binary
+search per bucket.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.history import insert_sorted, remove_sorted
+from app.services.promql import format_sample_value
+from app.services.rollups import DAY, HOUR, MINUTE
+from app.services.ticket_table import NULL_CODE, NULL_TIME, TicketTable
+
+# Upper bounds in seconds; +Inf is implied
+RESOLUTION_BUCKETS = (
+    HOUR, 4 * HOUR, 8 * HOUR, DAY, 2 * DAY, 3 * DAY, 7 * DAY, 14 * DAY, 30 * DAY, 90 * DAY,
+)
+FIRST_RESPONSE_BUCKETS = (
+    5 * MINUTE, 15 * MINUTE, 30 * MINUTE, HOUR, 2 * HOUR, 4 * HOUR, 8 * HOUR, DAY, 2 * DAY, 7 * DAY,
+)
+OPEN_AGE_BUCKETS = RESOLUTION_BUCKETS
+
+MICROSECONDS = 1_000_000
+
+# Metric name -> help text of every exposed histogram
+HISTOGRAM_METRICS = {
+    "zammad_ticket_resolution_seconds": "Time from creation to close of closed tickets.",
+    "zammad_ticket_first_response_seconds": "Time from creation to the first response.",
+    "zammad_ticket_open_age_seconds": "Time since creation of tickets not in a closed state.",
+}
+
+
+class Histogram:
+    """
+    A fixed-bucket histogram of durations, with its sum and count.
+    Bounds are in seconds; observations and the sum are kept in integer
+    microseconds, so removing an observation restores the exact previous state.
+    """
+
+    def __init__(self, bounds: Iterable[float]):
+        """Initialize empty buckets for the given upper bounds in seconds."""
+        self.bounds = np.asarray(tuple(bounds), dtype=np.float64)
+        self._bounds_us = (self.bounds * MICROSECONDS).astype(np.int64)
+        # One slot per bound plus the +Inf overflow, not cumulative
+        self.counts = np.zeros(len(self.bounds) + 1, dtype=np.int64)
+        self.sum_us = 0
+
+    @property
+    def count(self) -> int:
+        """Number of observations."""
+        return int(self.counts.sum())
+
+    @property
+    def sum(self) -> float:
+        """Sum of the observations in seconds."""
+        return self.sum_us / MICROSECONDS
+
+    def observe(self, durations_us: np.ndarray, weight: int = 1) -> None:
+        """Add durations in microseconds, or remove earlier ones with weight -1."""
+        # Bucket le=b holds values <= b, so the first bound >= value
+        np.add.at(self.counts, np.searchsorted(self._bounds_us, durations_us, side="left"), weight)
+        self.sum_us += weight * int(durations_us.sum())
+
+    def cumulative(self) -> np.ndarray:
+        """Observations at or below each bound, ending with the +Inf total."""
+        return np.cumsum(self.counts)
+
+    def buckets(self) -> List[Tuple[str, int]]:
+        """Prometheus buckets as (le label, cumulative count), ending with +Inf."""
+        bounds = [format_sample_value(float(bound)) for bound in self.bounds] + ["+Inf"]
+        return list(zip(bounds, self.cumulative().tolist()))
+
+
+class SortedTimes:
+    """A sorted multiset of microsecond timestamps with a running sum."""
+
+    def __init__(self):
+        """Initialize an empty set."""
+        self.values = np.empty(0, dtype=np.int64)
+        self.total = 0
+
+    def __len__(self) -> int:
+        """Number of timestamps."""
+        return len(self.values)
+
+    def insert(self, values: np.ndarray) -> None:
+        """Insert timestamps, keeping the order."""
+        self.values = insert_sorted(self.values, values)
+        self.total += int(values.sum())
+
+    def remove(self, values: np.ndarray) -> None:
+        """Remove one occurrence of each timestamp; every timestamp must be present."""
+        self.values = remove_sorted(self.values, values)
+        self.total -= int(values.sum())
+
+    def age_histogram(self, bounds: Iterable[float], now: float) -> Histogram:
+        """Bucket the age of every timestamp at Unix time now."""
+        histogram = Histogram(bounds)
+        now_us = int(now * MICROSECONDS)
+        thresholds = now_us - histogram._bounds_us
+        # Age <= bound exactly when the timestamp is at or after now - bound
+        at_most = len(self.values) - np.searchsorted(self.values, thresholds, side="left")
+        histogram.counts = np.diff(np.concatenate([[0], at_most, [len(self.values)]]))
+        histogram.sum_us = len(self.values) * now_us - self.total
+        return histogram
+
+
+class GroupDurations:
+    """Duration histograms of the tickets in one group."""
+
+    def __init__(self):
+        """Initialize empty histograms."""
+        self.resolution = Histogram(RESOLUTION_BUCKETS)
+        self.first_response = Histogram(FIRST_RESPONSE_BUCKETS)
+        self.open_created = SortedTimes()
+
+    def open_age(self, now: float) -> Histogram:
+        """Histogram of how long the group's open tickets have been open at Unix time now."""
+        return self.open_created.age_histogram(OPEN_AGE_BUCKETS, now)
+
+    def histograms(self, now: float) -> Dict[str, Histogram]:
+        """Every histogram by metric name, with open ages as of Unix time now."""
+        return {
+            "zammad_ticket_resolution_seconds": self.resolution,
+            "zammad_ticket_first_response_seconds": self.first_response,
+            "zammad_ticket_open_age_seconds": self.open_age(now),
+        }
+
+
+def _elapsed(start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Microseconds from start to end, clipped at zero."""
+    return np.maximum(end - start, 0)
+
+
+class TicketDurations:
+    """
+    Resolution time (creation to close), time to first response and open-ticket
+    age per group_id.
+    Tickets are folded in with add() and taken back out with remove(), which must
+    be given the rows exactly as they were added; a changed ticket is removed in its
+    old form and added in its new one.
+    """
+
+    def __init__(self):
+        """Initialize without any tickets."""
+        self.groups: Dict[Optional[int], GroupDurations] = {}
+
+    def add(self, table: TicketTable) -> None:
+        """Fold a table of tickets into the histograms."""
+        self._apply(table, 1)
+
+    def remove(self, table: TicketTable) -> None:
+        """Take a table of previously added tickets back out of the histograms."""
+        self._apply(table, -1)
+
+    def _apply(self, table: TicketTable, weight: int) -> None:
+        """Add (weight 1) or remove (weight -1) every row's observations."""
+        created = table.column("created_at")
+        first_response = table.column("first_response_at")
+        close_times = table.close_times()
+        is_closed = table.is_closed()
+        has_created = created != NULL_TIME
+        resolved = has_created & is_closed & (close_times != NULL_TIME)
+        responded = has_created & (first_response != NULL_TIME)
+        still_open = has_created & ~is_closed
+
+        groups = table.column("group_id")
+        group_values = table.dictionaries["group_id"].values
+        for code in np.unique(groups).tolist():
+            group_id = group_values[code] if code != NULL_CODE else None
+            durations = self.groups.get(group_id)
+            if durations is None:
+                durations = self.groups[group_id] = GroupDurations()
+            in_group = groups == code
+            rows = in_group & resolved
+            durations.resolution.observe(
+                _elapsed(created[rows], close_times[rows]), weight
+            )
+            rows = in_group & responded
+            durations.first_response.observe(
+                _elapsed(created[rows], first_response[rows]), weight
+            )
+            rows = in_group & still_open
+            if weight > 0:
+                durations.open_created.insert(created[rows])
+            else:
+                durations.open_created.remove(created[rows])
+
+    def subset(self, group_ids: List[Optional[int]]) -> "TicketDurations":
+        """A view of some groups' histograms, sharing them with this instance."""
+        view = TicketDurations()
+        view.groups = {
+            group_id: self.groups[group_id] for group_id in group_ids if group_id in self.groups
+        }
+        return view
@@ -0,0 +1,217 @@
+"""
+In-memory directory of Zammad users and organizations.
+Follows Single Responsibility Principle - handles only keeping id -> entity lookups current.
+Follows Dependency Inversion Principle - depends on repository interface.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from loguru import logger
+
+from app.core.singleflight import SingleFlight
+from app.domain.models import Organization, User
+from app.repositories.snapshot_repository import ISnapshotRepository
+from app.repositories.zammad_repository import IZammadRepository
+
+Entity = TypeVar("Entity", User, Organization)
+
+
+def display_name(user: User) -> Optional[str]:
+    """Human-readable name of a user: full name, else login, else email."""
+    full_name = " ".join(part for part in (user.firstname, user.lastname) if part)
+    return full_name or user.login or user.email
+
+
+class EntityDirectory:
+    """
+    Users and organizations indexed by id, for enriching responses without
+    per-row upstream calls.
+    The first refresh crawls both lists. Later refreshes only fetch entities updated
+    since the newest updated_at seen, and a periodic full refresh drops deleted ones.
+    Refreshes run in the background; lookups never call Zammad, so an entity that
+    has not been synced yet simply has no name.
+    With a snapshot repository, both indexes and their watermarks are persisted so a
+    restart can serve names immediately and catch up incrementally.
+    """
+
+    def __init__(
+        self,
+        repository: IZammadRepository,
+        refresh_interval: float = 300.0,
+        full_refresh_interval: float = 3600.0,
+        per_page: int = 500,
+        clock: Callable[[], float] = time.monotonic,
+        snapshot: Optional[ISnapshotRepository] = None,
+    ):
+        """Initialize an empty directory; nothing is fetched until the first refresh."""
+        self.repository = repository
+        self.snapshot = snapshot
+        self.per_page = per_page
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self._clock = clock
+        self.users: Dict[int, User] = {}
+        self.organizations: Dict[int, Organization] = {}
+        self._watermarks: Dict[str, Optional[datetime]] = {"users": None, "organizations": None}
+        self._last_refresh: Optional[float] = None
+        self._last_full_refresh: Optional[float] = None
+        self._single_flight = SingleFlight()
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether a full refresh has completed."""
+        return self._last_full_refresh is not None
+
+    @staticmethod
+    def _newest(entities: Iterable[Entity], current: Optional[datetime]) -> Optional[datetime]:
+        """Newest updated_at among the entities and the current watermark."""
+        times = [e.updated_at for e in entities if e.updated_at is not None]
+        if current is not None:
+            times.append(current)
+        return max(times, default=None)
+
+    @staticmethod
+    def _parse_watermark(value: Optional[str]) -> Optional[datetime]:
+        """Watermark from its snapshot form."""
+        return datetime.fromisoformat(value) if value else None
+
+    async def load_snapshot(self) -> bool:
+        """
+        Load users, organizations and their watermarks from the snapshot repository.
+        Returns True if a snapshot was loaded; the next refresh then only fetches updates.
+        """
+        if self.snapshot is None:
+            return False
+        try:
+            snapshot = await asyncio.to_thread(self.snapshot.load, ("users", "organizations"))
+        except Exception as e:
+            logger.warning(f"Could not load directory snapshot: {e}")
+            return False
+        watermarks = ("users_watermark", "organizations_watermark")
+        if snapshot is None or any(key not in snapshot.meta for key in watermarks):
+            return False
+
+        self.users = {user.id: user for user in snapshot.users}
+        self.organizations = {o.id: o for o in snapshot.organizations}
+        self._watermarks = {
+            "users": self._parse_watermark(snapshot.meta["users_watermark"]),
+            "organizations": self._parse_watermark(snapshot.meta["organizations_watermark"]),
+        }
+        now = self._clock()
+        # Keep the full refresh schedule across restarts
+        full_refresh_age = time.time() - snapshot.meta.get("directory_full_refreshed_at", 0.0)
+        self._last_full_refresh = now - max(full_refresh_age, 0.0)
+        self._last_refresh = now
+        logger.info(
+            f"Loaded directory snapshot with {len(self.users)} users and "
+            f"{len(self.organizations)} organizations"
+        )
+        return True
+
+    async def _persist(self, kind: str, entities: List[Entity], replace: bool) -> None:
+        """Write refreshed entities of a kind and its watermark to the snapshot repository."""
+        if self.snapshot is None:
+            return
+        watermark = self._watermarks[kind]
+        meta: Dict[str, Any] = {
+            f"{kind}_watermark": watermark.isoformat() if watermark else None,
+        }
+        if replace:
+            meta["directory_full_refreshed_at"] = time.time()
+        write = self.snapshot.replace if replace else self.snapshot.upsert
+        try:
+            await asyncio.to_thread(write, kind, entities, meta)
+        except Exception as e:
+            # The in-memory directory stays authoritative; the next refresh writes again
+            logger.warning(f"Could not persist directory snapshot: {e}")
+
+    async def refresh(self, full: bool = False) -> None:
+        """Bring the directory up to date; concurrent callers share one refresh."""
+        await self._single_flight.do(("refresh", full), lambda: self._refresh(full))
+
+    async def _refresh(self, full: bool) -> None:
+        """Run a full or incremental refresh depending on directory state."""
+        now = self._clock()
+        if (
+            full
+            or self._last_full_refresh is None
+            or now - self._last_full_refresh >= self.full_refresh_interval
+        ):
+            await self._full_refresh()
+            self._last_full_refresh = now
+        else:
+            await self._incremental_refresh()
+        self._last_refresh = now
+
+    async def _full_refresh(self) -> None:
+        """Replace both indexes with complete crawls."""
+        started = time.perf_counter()
+        users, organizations = await asyncio.gather(
+            self.repository.get_users(per_page=self.per_page, fetch_all=True),
+            self.repository.get_organizations(per_page=self.per_page, fetch_all=True),
+        )
+        self.users = {user.id: user for user in users}
+        self.organizations = {organization.id: organization for organization in organizations}
+        self._watermarks = {
+            "users": self._newest(users, None),
+            "organizations": self._newest(organizations, None),
+        }
+        await self._persist("users", users, replace=True)
+        await self._persist("organizations", organizations, replace=True)
+        logger.info(
+            f"Directory loaded {len(self.users)} users and {len(self.organizations)} "
+            f"organizations in {time.perf_counter() - started:.2f}s"
+        )
+
+    async def _incremental_refresh(self) -> None:
+        """
+        Upsert users and organizations updated since the watermarks; a kind without a
+        watermark yet is listed again in full.
+        """
+        # Same-second updates may not have been seen yet, so the watermark itself is re-read
+        users, organizations = await asyncio.gather(
+            self.repository.get_users(
+                per_page=self.per_page, fetch_all=True, updated_since=self._watermarks["users"]
+            ),
+            self.repository.get_organizations(
+                per_page=self.per_page,
+                fetch_all=True,
+                updated_since=self._watermarks["organizations"],
+            ),
+        )
+        self.users.update((user.id, user) for user in users)
+        self.organizations.update((o.id, o) for o in organizations)
+        self._watermarks["users"] = self._newest(users, self._watermarks["users"])
+        self._watermarks["organizations"] = self._newest(
+            organizations, self._watermarks["organizations"]
+        )
+        if users:
+            await self._persist("users", users, replace=False)
+        if organizations:
+            await self._persist("organizations", organizations, replace=False)
+        logger.debug(
+            f"Directory applied {len(users)} user and {len(organizations)} organization updates"
+        )
+
+    async def run(self) -> None:
+        """Refresh forever on the interval, logging instead of raising failures."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Directory refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def user_name(self, user_id: Optional[int]) -> Optional[str]:
+        """Display name of a user, or None if unknown."""
+        user = self.users.get(user_id) if user_id is not None else None
+        return display_name(user) if user is not None else None
+
+    def organization_name(self, organization_id: Optional[int]) -> Optional[str]:
+        """Name of an organization, or None if unknown."""
+        if organization_id is None:
+            return None
+        organization = self.organizations.get(organization_id)
+        return organization.name if organization is not None else None
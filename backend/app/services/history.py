@@ -0,0 +1,94 @@
+"""
+Ticket history reconstructed from creation and close events.
+Follows Single Responsibility Principle - handles only point-in-time ticket counts.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.services.ticket_table import NULL_TIME
+
+
+def _to_epoch_us(timestamps: np.ndarray) -> np.ndarray:
+    """Convert Unix timestamps in seconds to integer microseconds."""
+    return np.floor(np.asarray(timestamps, dtype=np.float64) * 1_000_000).astype(np.int64)
+
+
+def insert_sorted(values: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """A sorted array with new values inserted in order."""
+    new = np.sort(new)
+    return np.insert(values, np.searchsorted(values, new), new)
+
+
+def remove_sorted(values: np.ndarray, old: np.ndarray) -> np.ndarray:
+    """A sorted array with one occurrence of each old value removed; every value must be present."""
+    old = np.sort(old)
+    # Equal values removed together take consecutive slots
+    duplicate_rank = np.arange(len(old)) - np.searchsorted(old, old, side="left")
+    return np.delete(values, np.searchsorted(values, old, side="left") + duplicate_rank)
+
+
+class TicketHistory:
+    """
+    Answers how many tickets had been created, closed, or were open at any time.
+    Creation and close times are kept sorted, so each lookup is a binary search:
+    O(log n) per timestamp. The open backlog is created minus closed up to a time.
+    Times are microseconds since the epoch; unknown times sort first, as if the
+    event had always happened.
+    """
+
+    def __init__(self, created: np.ndarray, closed: np.ndarray, presorted: bool = False):
+        """Build the timeline from creation times and close times, sorting them unless presorted."""
+        self.created = created if presorted else np.sort(created)
+        self.closed = closed if presorted else np.sort(closed)
+
+    @classmethod
+    def empty(cls) -> "TicketHistory":
+        """History without any tickets."""
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    def __len__(self) -> int:
+        """Number of tickets."""
+        return len(self.created)
+
+    def updated(self, removed: "TicketHistory", added: "TicketHistory") -> "TicketHistory":
+        """
+        A history with the events of removed taken out and those of added put in;
+        this one is left unchanged. Costs a merge, not a sort, of the timelines.
+        """
+        return TicketHistory(
+            insert_sorted(remove_sorted(self.created, removed.created), added.created),
+            insert_sorted(remove_sorted(self.closed, removed.closed), added.closed),
+            presorted=True,
+        )
+
+    def created_span(self) -> Optional[Tuple[float, float]]:
+        """Unix timestamps of the first and last known creation, or None without any."""
+        known = self.created[self.created != NULL_TIME]
+        if len(known) == 0:
+            return None
+        return known[0] / 1_000_000, known[-1] / 1_000_000
+
+    def created_up_to(self, timestamps: np.ndarray) -> np.ndarray:
+        """Count tickets created at or before each Unix timestamp."""
+        return np.searchsorted(self.created, _to_epoch_us(timestamps), side="right")
+
+    def closed_up_to(self, timestamps: np.ndarray) -> np.ndarray:
+        """Count tickets closed at or before each Unix timestamp."""
+        return np.searchsorted(self.closed, _to_epoch_us(timestamps), side="right")
+
+    def open_at(self, timestamps: np.ndarray) -> np.ndarray:
+        """Count tickets open at each Unix timestamp."""
+        return self.created_up_to(timestamps) - self.closed_up_to(timestamps)
+
+    def created_between(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """Count tickets created in each (start, end] window."""
+        return self.created_up_to(ends) - self.created_up_to(starts)
+
+    def created_in_buckets(self, edges: np.ndarray) -> np.ndarray:
+        """
+        Count tickets created in each [edges[i], edges[i + 1]) bucket.
+        One binary search per edge gives the cumulative count before it, so the cost
+        follows the number of buckets, not the number of tickets.
+        """
+        return np.diff(np.searchsorted(self.created, _to_epoch_us(edges), side="left"))
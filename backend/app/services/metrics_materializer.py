@@ -0,0 +1,179 @@
+"""
+Background materializer for the Prometheus /metrics exposition.
+Follows Single Responsibility Principle - handles only keeping the exposition up to date.
+Scrapes read a body rendered ahead of time instead of computing statistics inline.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.singleflight import SingleFlight
+from app.services.aggregations import TicketAggregates
+from app.services.durations import HISTOGRAM_METRICS, Histogram
+from app.services.zammad_service import ZammadService
+
+EXPOSITION_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def escape_label_value(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(name: str, value: float, labels: Optional[Dict[str, str]] = None) -> str:
+    """Render one sample line."""
+    if labels:
+        rendered = ",".join(f'{key}="{escape_label_value(str(v))}"' for key, v in labels.items())
+        return f"{name}{{{rendered}}} {value}"
+    return f"{name} {value}"
+
+
+def _family(name: str, metric_type: str, help_text: str, samples: List[str]) -> List[str]:
+    """Render a metric family with its HELP and TYPE lines."""
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}", *samples]
+
+
+def _histogram_samples(name: str, histogram: Histogram, labels: Dict[str, str]) -> List[str]:
+    """Render the _bucket, _sum and _count samples of one histogram."""
+    return [
+        *(
+            _sample(f"{name}_bucket", count, {**labels, "le": le})
+            for le, count in histogram.buckets()
+        ),
+        _sample(f"{name}_sum", round(histogram.sum, 6), labels),
+        _sample(f"{name}_count", histogram.count, labels),
+    ]
+
+
+def render_exposition(aggregates: TicketAggregates, refreshed_at: float) -> bytes:
+    """
+    Render the ticket aggregates in the Prometheus text exposition format.
+    Open-ticket ages are as of refreshed_at.
+    """
+    statistics = aggregates.statistics
+    groups = sorted(
+        aggregates.history_by_group.items(), key=lambda item: (item[0] is None, item[0] or 0)
+    )
+    group_labels = [
+        ({"group_id": str(group_id)} if group_id is not None else {}, history)
+        for group_id, history in groups
+    ]
+    duration_groups = sorted(
+        aggregates.durations.groups.items(), key=lambda item: (item[0] is None, item[0] or 0)
+    )
+    histograms = [
+        ({"group_id": str(group_id)} if group_id is not None else {},
+         durations.histograms(refreshed_at))
+        for group_id, durations in duration_groups
+    ]
+
+    lines = [
+        *_family("zammad_tickets_total", "gauge", "Number of tickets.",
+                 [_sample("zammad_tickets_total", statistics.total_tickets)]),
+        *_family("zammad_tickets_open", "gauge", "Number of tickets not in a closed state.",
+                 [_sample("zammad_tickets_open", statistics.open_tickets)]),
+        *_family("zammad_tickets_closed", "gauge", "Number of tickets in a closed state.",
+                 [_sample("zammad_tickets_closed", statistics.closed_tickets)]),
+        *_family("zammad_tickets_by_state", "gauge", "Number of tickets per state.", [
+            _sample("zammad_tickets_by_state", count, {"state": state})
+            for state, count in statistics.tickets_by_state.items()
+        ]),
+        *_family("zammad_tickets_by_priority", "gauge", "Number of tickets per priority.", [
+            _sample("zammad_tickets_by_priority", count, {"priority": priority})
+            for priority, count in statistics.tickets_by_priority.items()
+        ]),
+        *_family("zammad_tickets_created_total", "counter", "Tickets created per group.", [
+            _sample("zammad_tickets_created_total", len(history.created), labels)
+            for labels, history in group_labels
+        ]),
+        *_family("zammad_tickets_closed_total", "counter", "Tickets closed per group.", [
+            _sample("zammad_tickets_closed_total", len(history.closed), labels)
+            for labels, history in group_labels
+        ]),
+        *(
+            line
+            for name, help_text in HISTOGRAM_METRICS.items()
+            for line in _family(name, "histogram", help_text, [
+                sample
+                for labels, by_name in histograms
+                for sample in _histogram_samples(name, by_name[name], labels)
+            ])
+        ),
+        *_family(
+            "zammad_exporter_last_refresh_timestamp", "gauge",
+            "Unix time of the last successful metrics refresh.",
+            [_sample("zammad_exporter_last_refresh_timestamp", round(refreshed_at, 3))],
+        ),
+    ]
+    return ("\n".join(lines) + "\n").encode()
+
+
+class MetricsMaterializer:
+    """
+    Keeps a pre-rendered /metrics body fresh from a background loop.
+    The loop refreshes every interval; a failed refresh keeps serving the last body,
+    whose last-refresh gauge then shows how old it is. Each pass also refreshes the
+    per-group aggregates, so group-filtered dashboards read warm results.
+    Without the loop, scrapes render the body once it is older than the interval.
+    """
+
+    def __init__(
+        self,
+        service: ZammadService,
+        interval: float = 15.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize with the service that computes aggregates and the refresh interval."""
+        self.service = service
+        self.interval = interval
+        self._clock = clock
+        self.body: Optional[bytes] = None
+        self.refreshed_at: Optional[float] = None
+        self._rendered_at: Optional[float] = None
+        self._running = False
+        self._single_flight = SingleFlight()
+
+    async def refresh(self) -> bytes:
+        """Recompute the aggregates and re-render the body; concurrent callers share one run."""
+        return await self._single_flight.do(("refresh",), self._refresh)
+
+    async def _refresh(self) -> bytes:
+        """Render the body from the current aggregates."""
+        started = time.perf_counter()
+        aggregates = await self.service.get_ticket_aggregates()
+        refreshed_at = time.time()
+        self.body = render_exposition(aggregates, refreshed_at)
+        self.refreshed_at = refreshed_at
+        self._rendered_at = self._clock()
+        logger.debug(f"Refreshed metrics exposition in {time.perf_counter() - started:.3f}s")
+        return self.body
+
+    async def get_exposition(self) -> bytes:
+        """
+        Return the pre-rendered body, rendering it first if no refresh has run yet or,
+        without the background loop, if it is older than the interval.
+        """
+        if self.body is None:
+            return await self.refresh()
+        if not self._running and self._clock() - self._rendered_at >= self.interval:
+            try:
+                return await self.refresh()
+            except Exception as e:
+                logger.warning(f"Metrics refresh failed: {e}")
+        return self.body
+
+    async def run(self) -> None:
+        """Refresh forever on the interval, logging instead of raising failures."""
+        self._running = True
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Metrics refresh failed: {e}")
+            try:
+                await self.service.refresh_group_aggregates()
+            except Exception as e:
+                logger.warning(f"Group aggregates refresh failed: {e}")
+            await asyncio.sleep(self.interval)
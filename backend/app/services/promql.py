@@ -0,0 +1,785 @@
+"""
+Parser and evaluator for the PromQL subset served by the Prometheus-compatible API.
+Follows Single Responsibility Principle - handles only query parsing and evaluation.
+Follows Dependency Inversion Principle - evaluates against the ISeriesSource interface.
+
+Supported: selectors with =, !=, =~ and !~ matchers, range selectors inside
+rate() and increase(), histogram_quantile() over _bucket series,
+sum/count/min/max/avg/topk/bottomk with by/without, and arithmetic
+(+ - * / % ^) and comparison (== != > < >= <=, optionally bool) operators
+between scalars and one-to-one matched vectors.
+
+Every expression is evaluated at all requested timestamps at once: a series is
+a label set plus a numpy array with one value per timestamp, NaN where absent.
+"""
+import math
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.core.exceptions import QueryError
+
+Labels = Dict[str, str]
+
+DURATION_UNITS = {
+    "ms": 0.001,
+    "s": 1,
+    "m": 60,
+    "h": 3600,
+    "d": 86_400,
+    "w": 604_800,
+    "y": 31_536_000,
+}
+
+# Prometheus refuses range queries with more points than this per series
+MAX_POINTS_PER_SERIES = 11_000
+
+AGGREGATIONS = ("sum", "count", "min", "max", "avg", "topk", "bottomk")
+RANGE_FUNCTIONS = ("rate", "increase")
+COMPARISON_OPERATORS = ("==", "!=", ">", "<", ">=", "<=")
+
+# Binary operator precedence, lowest first; ^ is right-associative
+PRECEDENCE = {
+    "==": 1, "!=": 1, ">": 1, "<": 1, ">=": 1, "<=": 1,
+    "+": 2, "-": 2,
+    "*": 3, "/": 3, "%": 3,
+    "^": 4,
+}
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<space>\s+)
+    |(?P<duration>(?:\d+(?:ms|s|m|h|d|w|y))+)(?![A-Za-z0-9_:])
+    |(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    |(?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+    |(?P<identifier>[A-Za-z_:][A-Za-z0-9_:]*)
+    |(?P<operator>==|!=|>=|<=|=~|!~|[-+*/%^<>=(){}\[\],])
+    """,
+    re.VERBOSE,
+)
+
+_ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", '"': '"', "'": "'"}
+
+
+def parse_duration(text: str) -> float:
+    """Parse a duration such as 30s, 5m or 1h30m into seconds; bare numbers are seconds."""
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = re.findall(r"(\d+)(ms|s|m|h|d|w|y)", text)
+    if not parts or "".join(n + u for n, u in parts) != text:
+        raise QueryError(f"invalid duration {text!r}")
+    return sum(int(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+
+def parse_timestamp(text: str) -> float:
+    """Parse a Unix timestamp in seconds or an RFC 3339 date into seconds."""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        raise QueryError(f"invalid timestamp {text!r}")
+
+
+# --- Syntax tree -----------------------------------------------------------
+
+
+@dataclass
+class LabelMatcher:
+    """A label matcher inside a selector."""
+
+    name: str
+    op: str
+    value: str
+    _pattern: Optional["re.Pattern"] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        """Compile regex matchers once; PromQL regexes are fully anchored."""
+        if self.op in ("=~", "!~"):
+            try:
+                self._pattern = re.compile(f"(?:{self.value})\\Z")
+            except re.error as e:
+                raise QueryError(f"invalid regex {self.value!r}: {e}")
+
+    def matches(self, labels: Labels) -> bool:
+        """Whether a label set satisfies the matcher; missing labels match as empty."""
+        value = labels.get(self.name, "")
+        if self.op == "=":
+            return value == self.value
+        if self.op == "!=":
+            return value != self.value
+        matched = self._pattern.match(value) is not None
+        return matched if self.op == "=~" else not matched
+
+
+@dataclass
+class NumberLiteral:
+    """A scalar number."""
+
+    value: float
+
+
+@dataclass
+class VectorSelector:
+    """A metric selector, with a lookback window when used as a range selector."""
+
+    matchers: List[LabelMatcher]
+    range_seconds: Optional[float] = None
+
+
+@dataclass
+class Aggregation:
+    """An aggregation over series, grouped by or without labels."""
+
+    op: str
+    expr: "Expression"
+    grouping: List[str] = field(default_factory=list)
+    without: bool = False
+    param: Optional["Expression"] = None
+
+
+@dataclass
+class FunctionCall:
+    """A range function applied to a range selector, or histogram_quantile(param, arg)."""
+
+    name: str
+    arg: "Expression"
+    param: Optional["Expression"] = None
+
+
+@dataclass
+class UnaryMinus:
+    """A negated expression."""
+
+    expr: "Expression"
+
+
+@dataclass
+class BinaryOperation:
+    """An arithmetic or comparison operation."""
+
+    op: str
+    lhs: "Expression"
+    rhs: "Expression"
+    return_bool: bool = False
+
+
+Expression = Union[
+    NumberLiteral, VectorSelector, Aggregation, FunctionCall, UnaryMinus, BinaryOperation
+]
+
+
+# --- Parser ----------------------------------------------------------------
+
+
+def _tokenize(query: str) -> List[Tuple[str, str]]:
+    """Split a query into (kind, text) tokens."""
+    tokens = []
+    position = 0
+    while position < len(query):
+        match = _TOKEN_PATTERN.match(query, position)
+        if match is None:
+            raise QueryError(f"unexpected character {query[position]!r} at position {position}")
+        kind = match.lastgroup
+        if kind != "space":
+            tokens.append((kind, match.group()))
+        position = match.end()
+    return tokens
+
+
+def _unquote(text: str) -> str:
+    """Strip quotes from a string literal and resolve escapes."""
+    return re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), "\\" + m.group(1)), text[1:-1])
+
+
+class _Parser:
+    """Recursive-descent parser over the token list."""
+
+    def __init__(self, query: str):
+        """Tokenize the query."""
+        self.tokens = _tokenize(query)
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> Tuple[str, str]:
+        """Return an upcoming token without consuming it."""
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else ("end", "")
+
+    def next(self) -> Tuple[str, str]:
+        """Consume and return the next token."""
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def expect(self, text: str) -> None:
+        """Consume a token that must have the given text."""
+        kind, value = self.next()
+        if value != text or kind in ("string", "end"):
+            raise QueryError(f"expected {text!r} but found {value or 'end of query'!r}")
+
+    def accept(self, text: str) -> bool:
+        """Consume the next token if it has the given text."""
+        kind, value = self.peek()
+        if value == text and kind not in ("string", "end"):
+            self.position += 1
+            return True
+        return False
+
+    def parse(self) -> Expression:
+        """Parse a complete query."""
+        expr = self.parse_binary(1)
+        if self.peek()[0] != "end":
+            raise QueryError(f"unexpected {self.peek()[1]!r} after expression")
+        return expr
+
+    def parse_binary(self, min_precedence: int) -> Expression:
+        """Parse operators by precedence climbing."""
+        lhs = self.parse_unary()
+        while True:
+            kind, op = self.peek()
+            precedence = PRECEDENCE.get(op) if kind == "operator" else None
+            if precedence is None or precedence < min_precedence:
+                return lhs
+            self.next()
+            return_bool = op in COMPARISON_OPERATORS and self.accept("bool")
+            # ^ is right-associative, everything else left-associative
+            rhs = self.parse_binary(precedence if op == "^" else precedence + 1)
+            lhs = BinaryOperation(op=op, lhs=lhs, rhs=rhs, return_bool=return_bool)
+
+    def parse_unary(self) -> Expression:
+        """Parse a signed operand; unary minus binds looser than ^."""
+        if self.accept("-"):
+            return UnaryMinus(self.parse_binary(PRECEDENCE["^"]))
+        if self.accept("+"):
+            return self.parse_binary(PRECEDENCE["^"])
+        return self.parse_primary()
+
+    def parse_primary(self) -> Expression:
+        """Parse a literal, parenthesized expression, call, aggregation or selector."""
+        kind, value = self.peek()
+        if kind == "number":
+            self.next()
+            return NumberLiteral(float(value))
+        if kind == "duration":
+            raise QueryError(f"unexpected duration {value!r} outside a range selector")
+        if kind == "operator" and value == "(":
+            self.next()
+            expr = self.parse_binary(1)
+            self.expect(")")
+            return expr
+        if kind == "operator" and value == "{":
+            return self.parse_selector(None)
+        if kind == "identifier":
+            self.next()
+            lowered = value.lower()
+            if lowered in ("inf", "nan"):
+                return NumberLiteral(float(lowered))
+            if lowered in AGGREGATIONS and self.peek()[1] in ("(", "by", "without"):
+                return self.parse_aggregation(lowered)
+            if self.peek()[1] == "(":
+                return self.parse_function(value)
+            return self.parse_selector(value)
+        raise QueryError(f"unexpected {value or 'end of query'!r}")
+
+    def parse_grouping(self) -> List[str]:
+        """Parse a parenthesized label list."""
+        self.expect("(")
+        labels = []
+        while not self.accept(")"):
+            kind, label = self.next()
+            if kind != "identifier":
+                raise QueryError(f"expected label name but found {label or 'end of query'!r}")
+            labels.append(label)
+            if not self.accept(","):
+                self.expect(")")
+                break
+        return labels
+
+    def parse_aggregation(self, op: str) -> Aggregation:
+        """Parse an aggregation with its grouping before or after the arguments."""
+        grouping: List[str] = []
+        without = False
+        if self.peek()[1] in ("by", "without"):
+            without = self.next()[1] == "without"
+            grouping = self.parse_grouping()
+
+        self.expect("(")
+        param = None
+        if op in ("topk", "bottomk"):
+            param = self.parse_binary(1)
+            self.expect(",")
+        expr = self.parse_binary(1)
+        self.expect(")")
+
+        if not grouping and self.peek()[1] in ("by", "without"):
+            without = self.next()[1] == "without"
+            grouping = self.parse_grouping()
+        return Aggregation(op=op, expr=expr, grouping=grouping, without=without, param=param)
+
+    def parse_function(self, name: str) -> FunctionCall:
+        """Parse a call of a supported range function or histogram_quantile()."""
+        if name == "histogram_quantile":
+            self.expect("(")
+            param = self.parse_binary(1)
+            self.expect(",")
+            arg = self.parse_binary(1)
+            self.expect(")")
+            return FunctionCall(name=name, arg=arg, param=param)
+        if name not in RANGE_FUNCTIONS:
+            raise QueryError(f"unknown function {name!r}")
+        self.expect("(")
+        arg = self.parse_binary(1)
+        self.expect(")")
+        if not isinstance(arg, VectorSelector) or arg.range_seconds is None:
+            raise QueryError(f"{name}() expects a range selector such as metric[5m]")
+        return FunctionCall(name=name, arg=arg)
+
+    def parse_selector(self, name: Optional[str]) -> VectorSelector:
+        """Parse label matchers and an optional range after a metric name."""
+        matchers = [LabelMatcher("__name__", "=", name)] if name else []
+        if self.accept("{"):
+            while not self.accept("}"):
+                kind, label = self.next()
+                if kind != "identifier":
+                    raise QueryError(f"expected label name but found {label or 'end of query'!r}")
+                kind, op = self.next()
+                if op not in ("=", "!=", "=~", "!~"):
+                    raise QueryError(f"expected label matcher operator but found {op!r}")
+                kind, value = self.next()
+                if kind != "string":
+                    raise QueryError(f"expected quoted label value but found {value!r}")
+                matchers.append(LabelMatcher(label, op, _unquote(value)))
+                if not self.accept(","):
+                    self.expect("}")
+                    break
+        if not any(m.op in ("=", "=~") and m.value for m in matchers) and not name:
+            raise QueryError("vector selector must contain at least one non-empty matcher")
+
+        range_seconds = None
+        if self.accept("["):
+            kind, value = self.next()
+            if kind not in ("duration", "number"):
+                raise QueryError(f"expected duration but found {value!r}")
+            range_seconds = parse_duration(value)
+            self.expect("]")
+        return VectorSelector(matchers=matchers, range_seconds=range_seconds)
+
+
+def parse_query(query: str) -> Expression:
+    """Parse a PromQL query into a syntax tree."""
+    return _Parser(query).parse()
+
+
+# --- Evaluation ------------------------------------------------------------
+
+
+@dataclass
+class SeriesDefinition:
+    """
+    A series a source can provide: its labels and how to compute it at given times.
+    Counters may also compute their increase over a window directly, returning None
+    when they cannot, in which case the values at both ends of the window are used.
+    """
+
+    labels: Labels
+    values: Callable[[np.ndarray], np.ndarray]
+    increase: Optional[Callable[[np.ndarray, float], Optional[np.ndarray]]] = None
+
+
+@dataclass
+class Series:
+    """An evaluated series: one value per evaluation timestamp, NaN where absent."""
+
+    labels: Labels
+    values: np.ndarray
+
+
+class ISeriesSource(ABC):
+    """Interface for the series queries are evaluated against."""
+
+    @abstractmethod
+    def series(self) -> List[SeriesDefinition]:
+        """Get every series the source provides."""
+        pass
+
+
+Value = Union[np.ndarray, List[Series]]
+
+
+def _without_name(labels: Labels) -> Labels:
+    """Return labels without the metric name."""
+    return {k: v for k, v in labels.items() if k != "__name__"}
+
+
+def _signature(labels: Labels) -> Tuple[Tuple[str, str], ...]:
+    """Hashable label identity for vector matching, ignoring the metric name."""
+    return tuple(sorted(_without_name(labels).items()))
+
+
+def _apply(op: str, lhs: np.ndarray, rhs: np.ndarray, return_bool: bool) -> np.ndarray:
+    """Apply an operator elementwise; comparisons filter to lhs unless bool is given."""
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        if op == "+":
+            return lhs + rhs
+        if op == "-":
+            return lhs - rhs
+        if op == "*":
+            return lhs * rhs
+        if op == "/":
+            return lhs / rhs
+        if op == "%":
+            return np.fmod(lhs, rhs)
+        if op == "^":
+            return np.power(lhs, rhs)
+        condition = {
+            "==": np.equal, "!=": np.not_equal, ">": np.greater,
+            "<": np.less, ">=": np.greater_equal, "<=": np.less_equal,
+        }[op](lhs, rhs)
+    missing = np.isnan(lhs) | np.isnan(rhs)
+    if return_bool:
+        return np.where(missing, np.nan, condition.astype(float))
+    return np.where(condition & ~missing, lhs, np.nan)
+
+
+def _bucket_quantile(phi: np.ndarray, bounds: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """
+    Quantile phi of a histogram at every timestamp, given sorted upper bounds and
+    cumulative counts of shape (buckets, timestamps). Follows Prometheus: without a
+    +Inf bucket or observations the result is NaN, and ranks in the +Inf bucket
+    return the highest finite bound.
+    """
+    timestamps = counts.shape[1]
+    if len(bounds) < 2 or not np.isposinf(bounds[-1]):
+        return np.full(timestamps, np.nan)
+    absent = np.isnan(counts).all(axis=0)
+    # Counts can dip between buckets when series are scraped apart; force them monotonic
+    counts = np.maximum.accumulate(np.nan_to_num(counts, nan=0.0), axis=0)
+    total = counts[-1]
+    rank = phi * total
+    bucket = np.minimum((counts < rank).sum(axis=0), len(bounds) - 1)
+    columns = np.arange(timestamps)
+    upper = bounds[bucket]
+    lower = np.where(bucket > 0, bounds[np.maximum(bucket - 1, 0)], 0.0)
+    below = np.where(bucket > 0, counts[np.maximum(bucket - 1, 0), columns], 0.0)
+    in_bucket = counts[bucket, columns] - below
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = lower + (upper - lower) * (rank - below) / in_bucket
+    values = np.where(bucket == len(bounds) - 1, bounds[-2], values)
+    values = np.where((bucket == 0) & (upper <= 0), upper, values)
+    values = np.where(absent | (total == 0), np.nan, values)
+    return np.where(phi < 0, -np.inf, np.where(phi > 1, np.inf, values))
+
+
+class Evaluator:
+    """Evaluates a syntax tree at an array of Unix timestamps."""
+
+    def __init__(self, source: ISeriesSource, timestamps: np.ndarray):
+        """Initialize with the series source and evaluation timestamps in seconds."""
+        self.source = source
+        self.timestamps = np.asarray(timestamps, dtype=np.float64)
+
+    def evaluate(self, expr: Expression) -> Value:
+        """Evaluate an expression to a scalar array or a list of series."""
+        if isinstance(expr, NumberLiteral):
+            return np.full(len(self.timestamps), expr.value)
+        if isinstance(expr, VectorSelector):
+            if expr.range_seconds is not None:
+                raise QueryError("range selectors are only supported inside rate() and increase()")
+            return [
+                Series(labels=definition.labels, values=definition.values(self.timestamps))
+                for definition in self._select(expr)
+            ]
+        if isinstance(expr, FunctionCall):
+            return self._evaluate_function(expr)
+        if isinstance(expr, Aggregation):
+            return self._evaluate_aggregation(expr)
+        if isinstance(expr, UnaryMinus):
+            value = self.evaluate(expr.expr)
+            if isinstance(value, np.ndarray):
+                return -value
+            return [Series(labels=_without_name(s.labels), values=-s.values) for s in value]
+        return self._evaluate_binary(expr)
+
+    def _select(self, selector: VectorSelector) -> List[SeriesDefinition]:
+        """Get the source series whose labels satisfy every matcher."""
+        return [
+            definition
+            for definition in self.source.series()
+            if all(matcher.matches(definition.labels) for matcher in selector.matchers)
+        ]
+
+    def _evaluate_function(self, call: FunctionCall) -> List[Series]:
+        """Evaluate rate() or increase() from the counter at both ends of the window."""
+        if call.name == "histogram_quantile":
+            return self._evaluate_histogram_quantile(call)
+        window = call.arg.range_seconds
+        series = []
+        for definition in self._select(call.arg):
+            increase = None
+            if definition.increase is not None:
+                increase = definition.increase(self.timestamps, window)
+            if increase is None:
+                increase = definition.values(self.timestamps) - definition.values(
+                    self.timestamps - window
+                )
+            if call.name == "rate":
+                increase = increase / window
+            series.append(Series(labels=_without_name(definition.labels), values=increase))
+        return series
+
+    def _evaluate_histogram_quantile(self, call: FunctionCall) -> List[Series]:
+        """
+        Estimate a quantile from cumulative le buckets, grouping series by their labels
+        other than le, with Prometheus' linear interpolation inside the bucket.
+        """
+        phi = self.evaluate(call.param)
+        if not isinstance(phi, np.ndarray):
+            raise QueryError("histogram_quantile() expects a scalar quantile")
+        operand = self.evaluate(call.arg)
+        if isinstance(operand, np.ndarray):
+            raise QueryError("histogram_quantile() expects an instant vector")
+
+        groups: Dict[Tuple[Tuple[str, str], ...], List[Tuple[float, np.ndarray]]] = {}
+        for series in operand:
+            try:
+                bound = float(series.labels["le"])
+            except (KeyError, ValueError):
+                continue
+            key = tuple(sorted(
+                (k, v) for k, v in _without_name(series.labels).items() if k != "le"
+            ))
+            groups.setdefault(key, []).append((bound, series.values))
+
+        result = []
+        for key, buckets in groups.items():
+            buckets.sort(key=lambda bucket: bucket[0])
+            bounds = np.array([bound for bound, _ in buckets])
+            counts = np.vstack([values for _, values in buckets])
+            result.append(Series(labels=dict(key), values=_bucket_quantile(phi, bounds, counts)))
+        return result
+
+    def _evaluate_aggregation(self, aggregation: Aggregation) -> List[Series]:
+        """Group series by label signature and reduce each group per timestamp."""
+        operand = self.evaluate(aggregation.expr)
+        if isinstance(operand, np.ndarray):
+            raise QueryError(f"{aggregation.op}() expects an instant vector")
+
+        groups: Dict[Tuple[Tuple[str, str], ...], List[Series]] = {}
+        for series in operand:
+            if aggregation.without:
+                key_labels = {
+                    k: v
+                    for k, v in _without_name(series.labels).items()
+                    if k not in aggregation.grouping
+                }
+            else:
+                key_labels = {
+                    k: v for k, v in series.labels.items() if k in aggregation.grouping
+                }
+            groups.setdefault(tuple(sorted(key_labels.items())), []).append(series)
+
+        if aggregation.op in ("topk", "bottomk"):
+            return self._select_k(aggregation, groups)
+
+        result = []
+        for key, members in groups.items():
+            stacked = np.vstack([series.values for series in members])
+            present = ~np.isnan(stacked)
+            count = present.sum(axis=0)
+            with np.errstate(invalid="ignore"):
+                if aggregation.op == "count":
+                    values = count.astype(float)
+                elif aggregation.op == "sum":
+                    values = np.nansum(stacked, axis=0)
+                elif aggregation.op == "avg":
+                    values = np.nansum(stacked, axis=0) / np.maximum(count, 1)
+                elif aggregation.op == "min":
+                    values = np.nanmin(np.where(present, stacked, np.inf), axis=0)
+                else:
+                    values = np.nanmax(np.where(present, stacked, -np.inf), axis=0)
+            result.append(Series(labels=dict(key), values=np.where(count > 0, values, np.nan)))
+        return result
+
+    def _select_k(
+        self,
+        aggregation: Aggregation,
+        groups: Dict[Tuple[Tuple[str, str], ...], List[Series]],
+    ) -> List[Series]:
+        """Keep the k largest (or smallest) series of each group at every timestamp."""
+        param = self.evaluate(aggregation.param)
+        if not isinstance(param, np.ndarray):
+            raise QueryError(f"{aggregation.op}() expects a scalar parameter")
+        k = param.astype(np.int64)
+
+        result = []
+        for members in groups.values():
+            stacked = np.vstack([series.values for series in members])
+            missing = np.isnan(stacked)
+            # Rank every series per timestamp; absent values rank last
+            keys = -stacked if aggregation.op == "topk" else stacked
+            order = np.argsort(np.where(missing, np.inf, keys), axis=0, kind="stable")
+            ranks = np.empty_like(order)
+            np.put_along_axis(ranks, order, np.arange(len(members))[:, None], axis=0)
+            selected = (ranks < k) & ~missing
+            for series, keep in zip(members, selected):
+                if keep.any():
+                    result.append(Series(series.labels, np.where(keep, series.values, np.nan)))
+        return result
+
+    def _evaluate_binary(self, operation: BinaryOperation) -> Value:
+        """Evaluate an operator between scalars and/or one-to-one matched vectors."""
+        lhs = self.evaluate(operation.lhs)
+        rhs = self.evaluate(operation.rhs)
+        op = operation.op
+        is_comparison = op in COMPARISON_OPERATORS
+        if is_comparison and isinstance(lhs, np.ndarray) and isinstance(rhs, np.ndarray):
+            if not operation.return_bool:
+                raise QueryError("comparisons between scalars must use the bool modifier")
+            return _apply(op, lhs, rhs, True)
+        if isinstance(lhs, np.ndarray) and isinstance(rhs, np.ndarray):
+            return _apply(op, lhs, rhs, False)
+
+        # The metric name survives only filtering comparisons
+        def result_labels(labels: Labels) -> Labels:
+            if is_comparison and not operation.return_bool:
+                return labels
+            return _without_name(labels)
+
+        if isinstance(rhs, np.ndarray):
+            return [
+                Series(result_labels(s.labels), _apply(op, s.values, rhs, operation.return_bool))
+                for s in lhs
+            ]
+        if isinstance(lhs, np.ndarray):
+            result = []
+            for series in rhs:
+                values = _apply(op, lhs, series.values, operation.return_bool)
+                if is_comparison and not operation.return_bool:
+                    # Comparison filters keep the vector side's values
+                    values = np.where(np.isnan(values), np.nan, series.values)
+                result.append(Series(result_labels(series.labels), values))
+            return result
+
+        right_by_signature: Dict[Tuple[Tuple[str, str], ...], Series] = {}
+        for series in rhs:
+            signature = _signature(series.labels)
+            if signature in right_by_signature:
+                raise QueryError("many-to-many matching not allowed: duplicate series on the right side")
+            right_by_signature[signature] = series
+
+        result = []
+        seen = set()
+        for series in lhs:
+            signature = _signature(series.labels)
+            match = right_by_signature.get(signature)
+            if match is None:
+                continue
+            if signature in seen:
+                raise QueryError("many-to-many matching not allowed: duplicate series on the left side")
+            seen.add(signature)
+            result.append(
+                Series(
+                    result_labels(series.labels),
+                    _apply(op, series.values, match.values, operation.return_bool),
+                )
+            )
+        return result
+
+
+def evaluate_query(query: str, source: ISeriesSource, timestamps: np.ndarray) -> Value:
+    """Parse a query and evaluate it at every timestamp."""
+    return Evaluator(source, timestamps).evaluate(parse_query(query))
+
+
+def format_sample_value(value: float) -> str:
+    """Format a sample value the way Prometheus does."""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def format_timestamp(timestamp: float) -> Union[int, float]:
+    """Return whole-second timestamps as ints, like the previous responses did."""
+    return int(timestamp) if float(timestamp).is_integer() else float(timestamp)
+
+
+def range_timestamps(
+    start: float, end: float, step: float, max_points: int = MAX_POINTS_PER_SERIES
+) -> np.ndarray:
+    """
+    Align a range to multiples of the step and return its evaluation timestamps.
+    Raises QueryError, before anything is allocated, if the range would exceed max_points.
+    """
+    if step <= 0:
+        raise QueryError("zero or negative query resolution step widths are not accepted")
+    if end < start:
+        raise QueryError("end timestamp must not be before start time")
+    start = math.floor(start / step) * step
+    end = math.floor(end / step) * step
+    point_count = int(round((end - start) / step)) + 1
+    if point_count > max_points:
+        raise QueryError(
+            f"exceeded maximum resolution of {max_points:,} points per timeseries. "
+            f"Try decreasing the query resolution (?step={math.ceil((end - start) / max_points)}s)"
+        )
+    return start + np.arange(point_count) * step
+
+
+def _byte_columns(texts: np.ndarray) -> np.ndarray:
+    """View a fixed-width bytes array as a (rows, width) uint8 matrix, trimmed to the longest entry."""
+    width = max(int(np.char.str_len(texts).max()), 1)
+    texts = texts.astype(f"S{width}")
+    return texts.view(np.uint8).reshape(len(texts), width)
+
+
+def render_sample_pairs(timestamps: np.ndarray, values: np.ndarray) -> bytes:
+    """
+    Render the non-NaN points of a series as the body of a JSON [[ts, "value"], ...] array.
+    Timestamps are converted to text in one vectorized cast and values are formatted once
+    per distinct value; rows are laid out in a byte matrix padded with JSON whitespace,
+    so no Python object is created per point.
+    """
+    present = ~np.isnan(values)
+    timestamps = timestamps[present]
+    values = values[present]
+    if len(values) == 0:
+        return b""
+
+    if np.all(np.mod(timestamps, 1) == 0):
+        timestamp_texts = timestamps.astype(np.int64).astype(bytes)
+    else:
+        timestamp_texts = timestamps.astype(bytes)
+    distinct, inverse = np.unique(values, return_inverse=True)
+    distinct_texts = np.array(
+        [f'"{format_sample_value(value)}"' for value in distinct.tolist()], dtype=bytes
+    )
+
+    rows = len(values)
+
+    def punctuation(char: str) -> np.ndarray:
+        return np.full((rows, 1), ord(char), dtype=np.uint8)
+
+    matrix = np.concatenate([
+        punctuation("["),
+        _byte_columns(timestamp_texts),
+        punctuation(","),
+        _byte_columns(distinct_texts[inverse]),
+        punctuation("]"),
+        punctuation(","),
+    ], axis=1)
+    # Padding after the shorter entries becomes whitespace between JSON tokens
+    matrix[matrix == 0] = ord(" ")
+    return matrix.tobytes()[:-1]
@@ -0,0 +1,189 @@
+"""
+Top-K ranking over per-day ticket counts.
+Follows Single Responsibility Principle - handles only windowed counting and top-K selection.
+Counts are kept per (UTC day, entity) cell sorted by day, so the whole days of a
+time window are a binary-searched slice of cells; the partial days at its edges are
+counted exactly from a sorted per-ticket index. Ranking is a heap selection over the
+window's totals instead of a full sort.
+"""
+import heapq
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.services.ticket_table import to_epoch_us
+
+MICROSECONDS_PER_DAY = 86_400 * 1_000_000
+
+
+def top_k(entities: np.ndarray, counts: np.ndarray, k: int) -> List[Tuple[int, int]]:
+    """
+    Select the k entities with the highest counts as (entity, count), highest first.
+    Ties go to the lower entity id. A heap keeps this O(n log k).
+    """
+    best = heapq.nlargest(
+        k, zip(counts.tolist(), entities.tolist()), key=lambda pair: (pair[0], -pair[1])
+    )
+    return [(entity, count) for count, entity in best]
+
+
+def _cells(
+    days: np.ndarray, entities: np.ndarray, weights: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Collapse (day, entity) pairs into distinct cells with counts, sorted by day and
+    entity. Each pair counts once, or its weight if weights are given.
+    """
+    order = np.lexsort((entities, days))
+    days, entities = days[order], entities[order]
+    starts = np.flatnonzero(
+        np.concatenate([[True], (days[1:] != days[:-1]) | (entities[1:] != entities[:-1])])
+    ) if len(days) else np.empty(0, dtype=np.int64)
+    if weights is None:
+        counts = np.diff(np.append(starts, len(days)))
+    elif len(days):
+        counts = np.add.reduceat(weights[order], starts)
+    else:
+        counts = np.empty(0, dtype=np.int64)
+    return days[starts], entities[starts], counts
+
+
+class DailyCounts:
+    """
+    Ticket counts per UTC creation day and entity (customer or organization id),
+    plus every ticket's (creation time, entity) sorted by time for partial days.
+    """
+
+    def __init__(self, created: np.ndarray, entities: np.ndarray):
+        """Build the cells and the index from each ticket's created_at (microseconds) and entity."""
+        created = np.asarray(created, dtype=np.int64)
+        entities = np.asarray(entities, dtype=np.int64)
+        order = np.argsort(created, kind="stable")
+        self.created, self.ticket_entities = created[order], entities[order]
+        self.days, self.entities, self.counts = _cells(
+            self.created // MICROSECONDS_PER_DAY, self.ticket_entities
+        )
+
+    @classmethod
+    def empty(cls) -> "DailyCounts":
+        """Counts without any tickets."""
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+
+    def updated(self, removed: "DailyCounts", added: "DailyCounts") -> "DailyCounts":
+        """
+        Counts with the tickets of removed taken out and those of added put in; these
+        counts are left unchanged. Only the changed tickets and cells are searched for,
+        so the cost follows the change rather than a re-sort of every ticket.
+        """
+        updated = DailyCounts.empty()
+        updated.created, updated.ticket_entities = self._updated_index(removed, added)
+        updated.days, updated.entities, updated.counts = self._updated_cells(removed, added)
+        return updated
+
+    def _updated_index(
+        self, removed: "DailyCounts", added: "DailyCounts"
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """The per-ticket index without removed's tickets and with added's, still sorted."""
+        lows = np.searchsorted(self.created, removed.created, side="left")
+        highs = np.searchsorted(self.created, removed.created, side="right")
+        dropped = set()
+        removed_entities = removed.ticket_entities.tolist()
+        for low, high, entity in zip(lows.tolist(), highs.tolist(), removed_entities):
+            # Equal (time, entity) tickets are removed from distinct rows
+            matches = np.flatnonzero(self.ticket_entities[low:high] == entity) + low
+            dropped.add(next(row for row in matches.tolist() if row not in dropped))
+        dropped_rows = np.fromiter(dropped, dtype=np.int64, count=len(dropped))
+        created = np.delete(self.created, dropped_rows)
+        entities = np.delete(self.ticket_entities, dropped_rows)
+        positions = np.searchsorted(created, added.created, side="right")
+        return (
+            np.insert(created, positions, added.created),
+            np.insert(entities, positions, added.ticket_entities),
+        )
+
+    def _updated_cells(
+        self, removed: "DailyCounts", added: "DailyCounts"
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The day cells with removed's counts subtracted and added's added, still sorted."""
+        days, entities, deltas = _cells(
+            np.concatenate([removed.days, added.days]),
+            np.concatenate([removed.entities, added.entities]),
+            np.concatenate([-removed.counts, added.counts]),
+        )
+        counts = self.counts.copy()
+        insert_at, new_cells = [], []
+        for day, entity, delta in zip(days.tolist(), entities.tolist(), deltas.tolist()):
+            if delta == 0:
+                continue
+            low = np.searchsorted(self.days, day, side="left")
+            high = np.searchsorted(self.days, day, side="right")
+            position = low + int(np.searchsorted(self.entities[low:high], entity))
+            if position < high and self.entities[position] == entity:
+                counts[position] += delta
+            else:
+                insert_at.append(position)
+                new_cells.append((day, entity, delta))
+        new = np.array(new_cells, dtype=np.int64).reshape(-1, 3)
+        days = np.insert(self.days, insert_at, new[:, 0])
+        entities = np.insert(self.entities, insert_at, new[:, 1])
+        counts = np.insert(counts, insert_at, new[:, 2])
+        kept = counts != 0
+        return days[kept], entities[kept], counts[kept]
+
+    def _tickets_between(self, start_us: Optional[int], end_us: Optional[int]) -> np.ndarray:
+        """Entities of the tickets created in [start_us, end_us); None is an open bound."""
+        first = 0 if start_us is None else np.searchsorted(self.created, start_us, side="left")
+        last = (
+            len(self.created) if end_us is None
+            else np.searchsorted(self.created, end_us, side="left")
+        )
+        return self.ticket_entities[first:last]
+
+    def totals(
+        self, created_from: Optional[datetime] = None, created_to: Optional[datetime] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count tickets per entity created within [created_from, created_to]; None is an
+        open bound. Whole days inside the window are summed from the day cells and the
+        partial days at its edges from the per-ticket index. Returns (entities, counts).
+        """
+        start_us = to_epoch_us(created_from) if created_from is not None else None
+        # Inclusive end as an exclusive microsecond bound
+        end_us = to_epoch_us(created_to) + 1 if created_to is not None else None
+        # Whole days are [first_day, end_day); partial edges lie outside them
+        first_day = None if start_us is None else -(-start_us // MICROSECONDS_PER_DAY)
+        end_day = None if end_us is None else end_us // MICROSECONDS_PER_DAY
+        if first_day is not None and end_day is not None and first_day >= end_day:
+            entities = self._tickets_between(start_us, end_us)
+            weights = np.ones(len(entities), dtype=np.int64)
+        else:
+            first = 0 if first_day is None else np.searchsorted(self.days, first_day, side="left")
+            last = (
+                len(self.days) if end_day is None
+                else np.searchsorted(self.days, end_day, side="left")
+            )
+            leading = (
+                self._tickets_between(start_us, first_day * MICROSECONDS_PER_DAY)
+                if first_day is not None else self.ticket_entities[:0]
+            )
+            trailing = (
+                self._tickets_between(end_day * MICROSECONDS_PER_DAY, end_us)
+                if end_day is not None else self.ticket_entities[:0]
+            )
+            entities = np.concatenate([self.entities[first:last], leading, trailing])
+            weights = np.concatenate([
+                self.counts[first:last], np.ones(len(leading) + len(trailing), dtype=np.int64)
+            ])
+        entities, inverse = np.unique(entities, return_inverse=True)
+        counts = np.bincount(inverse, weights=weights, minlength=len(entities))
+        return entities, counts.astype(np.int64)
+
+    def top(
+        self,
+        k: int,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> List[Tuple[int, int]]:
+        """The k entities with the most tickets created in the window, highest first."""
+        return top_k(*self.totals(created_from, created_to), k)
@@ -0,0 +1,188 @@
+"""
+Multi-resolution rollups of ticket creation counts.
+Follows Single Responsibility Principle - handles only bucketed creation counts.
+Per-minute, per-hour and per-day counts by state, priority and group are kept in
+fixed-size ring buffers, so a range query reads one precomputed cell per bucket
+instead of scanning tickets.
+"""
+import copy
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+from app.services.ticket_table import NULL_CODE, NULL_TIME, TicketTable
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86_400
+
+# Buckets kept per resolution: 7 days of minutes, 90 days of hours, 2 years of days
+DEFAULT_RETENTION: Dict[int, int] = {MINUTE: 7 * 24 * 60, HOUR: 90 * 24, DAY: 2 * 365}
+
+DIMENSIONS = ("state", "priority", "group_id")
+
+_NO_BUCKET = np.iinfo(np.int64).min
+
+
+class RollupRing:
+    """
+    Ticket counts per bucket and label for one resolution, in a ring of retention buckets.
+    Slot bucket_id % retention holds bucket_id; a newer bucket overwrites the slot,
+    so only the latest retention buckets survive regardless of insertion order.
+    """
+
+    def __init__(self, resolution: int, retention: int):
+        """Initialize an empty ring; resolution is in seconds."""
+        self.resolution = resolution
+        self.retention = retention
+        self.bucket_ids = np.full(retention, _NO_BUCKET, dtype=np.int64)
+        self.counts = np.zeros((retention, 0), dtype=np.int32)
+        self.head: Optional[int] = None
+
+    def add(
+        self, times_us: np.ndarray, columns: np.ndarray, column_count: int, weight: int = 1
+    ) -> None:
+        """
+        Count events at the given times (microseconds since epoch) into label columns,
+        or take earlier ones back out with weight -1.
+        """
+        if column_count > self.counts.shape[1]:
+            grown = np.zeros((self.retention, column_count), dtype=np.int32)
+            grown[:, : self.counts.shape[1]] = self.counts
+            self.counts = grown
+        if len(times_us) == 0:
+            return
+
+        buckets = times_us // (self.resolution * 1_000_000)
+        if weight > 0:
+            newest = int(buckets.max())
+            self.head = newest if self.head is None else max(self.head, newest)
+            keep = buckets > self.head - self.retention
+            buckets, columns = buckets[keep], columns[keep]
+        slots = buckets % self.retention
+
+        if weight > 0:
+            # Reset slots that are about to hold a newer bucket than they do now
+            incoming = np.full(self.retention, _NO_BUCKET, dtype=np.int64)
+            np.maximum.at(incoming, slots, buckets)
+            stale = incoming > self.bucket_ids
+            self.counts[stale] = 0
+            self.bucket_ids[stale] = incoming[stale]
+
+        # Removed events whose bucket has since been overwritten are already gone
+        current = self.bucket_ids[slots] == buckets
+        np.add.at(self.counts, (slots[current], columns[current]), weight)
+
+    def window_counts(self, timestamps: np.ndarray, window: float) -> np.ndarray:
+        """
+        Count events in [t - window, t) for each Unix timestamp t, per label column.
+        Timestamps and window must be multiples of the resolution. Windows reaching
+        past the retained buckets are NaN. Returns shape (columns, timestamps).
+        """
+        column_count = self.counts.shape[1]
+        if len(timestamps) == 0:
+            return np.zeros((column_count, 0))
+        ends = (np.asarray(timestamps) // self.resolution).astype(np.int64)
+        starts = ends - int(window // self.resolution)
+        if self.head is None:
+            return np.zeros((column_count, len(ends)))
+
+        # Only the retained span can hold counts, so at most retention buckets are read
+        first = self.head - self.retention + 1
+        bucket_ids = np.arange(first, self.head + 1)
+        slots = bucket_ids % self.retention
+        cells = self.counts[slots] * (self.bucket_ids[slots] == bucket_ids)[:, None]
+        cumulative = np.zeros((len(bucket_ids) + 1, column_count), dtype=np.int64)
+        np.cumsum(cells, axis=0, out=cumulative[1:])
+        # Buckets after the head are empty and those before first are NaN below
+        end_offsets = np.clip(ends - first, 0, len(bucket_ids))
+        start_offsets = np.clip(starts - first, 0, len(bucket_ids))
+        counts = (cumulative[end_offsets] - cumulative[start_offsets]).astype(np.float64)
+
+        counts[starts < first] = np.nan
+        return counts.T
+
+
+class TicketRollups:
+    """Rollup rings for every resolution and dimension, filled from ticket creation times."""
+
+    def __init__(self, retention: Optional[Dict[int, int]] = None):
+        """Initialize empty rings; retention maps resolution seconds to bucket count."""
+        # A resolution with no retained buckets is disabled
+        self.retention = {
+            resolution: buckets
+            for resolution, buckets in (retention or DEFAULT_RETENTION).items()
+            if buckets > 0
+        }
+        self.labels: Dict[str, List[Hashable]] = {dimension: [] for dimension in DIMENSIONS}
+        self._columns: Dict[str, Dict[Hashable, int]] = {dimension: {} for dimension in DIMENSIONS}
+        self.rings: Dict[str, Dict[int, RollupRing]] = {
+            dimension: {
+                resolution: RollupRing(resolution, buckets)
+                for resolution, buckets in self.retention.items()
+            }
+            for dimension in DIMENSIONS
+        }
+
+    def _column(self, dimension: str, label: Optional[Hashable]) -> int:
+        """Return the column of a label, adding it if new."""
+        columns = self._columns[dimension]
+        column = columns.get(label)
+        if column is None:
+            column = columns[label] = len(self.labels[dimension])
+            self.labels[dimension].append(label)
+        return column
+
+    def add(self, table: TicketTable, weight: int = 1) -> None:
+        """
+        Count the table's tickets by creation time into every ring, or take previously
+        counted tickets back out with weight -1.
+        """
+        created = table.column("created_at")
+        known = created != NULL_TIME
+        times = created[known]
+        for dimension in DIMENSIONS:
+            codes = table.column(dimension)[known]
+            # Map table codes to rollup columns; the extra last entry catches NULL_CODE (-1)
+            null_column = self._column(dimension, None) if (codes == NULL_CODE).any() else 0
+            lookup = np.array(
+                [self._column(dimension, value) for value in table.dictionaries[dimension].values]
+                + [null_column],
+                dtype=np.int64,
+            )
+            columns = lookup[codes]
+            for ring in self.rings[dimension].values():
+                ring.add(times, columns, len(self.labels[dimension]), weight)
+
+    def updated(self, removed: TicketTable, added: TicketTable) -> "TicketRollups":
+        """Rollups with removed's tickets taken out and added's counted; self is left unchanged."""
+        rollups = copy.deepcopy(self)
+        rollups.add(removed, weight=-1)
+        rollups.add(added)
+        return rollups
+
+    def resolution_for(self, timestamps: np.ndarray, window: float) -> Optional[int]:
+        """
+        Pick the coarsest resolution whose buckets tile every window exactly and
+        retain at least one window, or None if no resolution fits.
+        """
+        for resolution, buckets in sorted(self.retention.items(), reverse=True):
+            if window > resolution * buckets:
+                continue
+            if window % resolution == 0 and np.all(np.mod(timestamps, resolution) == 0):
+                return resolution
+        return None
+
+    def created_in_windows(
+        self, dimension: str, timestamps: np.ndarray, window: float
+    ) -> Optional[Dict[Optional[Hashable], np.ndarray]]:
+        """
+        Count tickets created in [t - window, t) per label of a dimension at each timestamp,
+        reading the coarsest fitting rollup. Returns None if no resolution fits, including
+        windows longer than every rollup retains.
+        """
+        resolution = self.resolution_for(timestamps, window)
+        if resolution is None:
+            return None
+        counts = self.rings[dimension][resolution].window_counts(timestamps, window)
+        return dict(zip(self.labels[dimension], counts))
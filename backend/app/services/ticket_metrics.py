@@ -0,0 +1,118 @@
+"""
+Ticket metrics exposed to PromQL queries.
+Follows Single Responsibility Principle - handles only mapping aggregates to series.
+"""
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.aggregations import TicketAggregates
+from app.services.durations import HISTOGRAM_METRICS
+from app.services.promql import ISeriesSource, SeriesDefinition
+
+METRIC_NAMES = [
+    "zammad_tickets_total",
+    "zammad_tickets_open",
+    "zammad_tickets_closed",
+    "zammad_tickets_by_state",
+    "zammad_tickets_by_priority",
+    "zammad_tickets_created_total",
+    "zammad_tickets_closed_total",
+    *(
+        f"{name}_{suffix}"
+        for name in HISTOGRAM_METRICS
+        for suffix in ("bucket", "sum", "count")
+    ),
+]
+
+
+def _constant(value: float):
+    """Series values for a gauge that only has a current value."""
+    return lambda timestamps: np.full(len(timestamps), float(value))
+
+
+def _history(lookup: Callable[[np.ndarray], np.ndarray]):
+    """Series values looked up in the ticket history at each timestamp."""
+    return lambda timestamps: lookup(timestamps).astype(np.float64)
+
+
+class TicketSeriesSource(ISeriesSource):
+    """
+    Serves the ticket aggregates as series.
+    Totals, open and closed counts are reconstructed from creation/close history at
+    each timestamp, and zammad_tickets_created_total/zammad_tickets_closed_total are
+    counters per group_id, so rate() and increase() over them are exact.
+    State and priority breakdowns only have their current value, since past states
+    are not known. So do the duration histograms, whose _bucket series (one per le)
+    feed histogram_quantile(); open-ticket ages are as of now.
+    """
+
+    def __init__(self, aggregates: TicketAggregates, now: Optional[float] = None):
+        """Initialize with the aggregates to serve and the Unix time open ages are taken at."""
+        self.aggregates = aggregates
+        self.now = now if now is not None else time.time()
+        self._windows: Dict[Tuple[float, bytes], Optional[Dict[Hashable, np.ndarray]]] = {}
+
+    def _created_in_window(self, group_id: Optional[int]):
+        """
+        Increase of a group's created counter, read from the rollups when a resolution
+        tiles the windows and they are within retention.
+        """
+        def increase(timestamps: np.ndarray, window: float) -> Optional[np.ndarray]:
+            key = (window, timestamps.tobytes())
+            if key not in self._windows:
+                # One rollup read serves every group's series
+                self._windows[key] = self.aggregates.rollups.created_in_windows(
+                    "group_id", timestamps, window
+                )
+            counts = self._windows[key]
+            if counts is None or group_id not in counts or np.isnan(counts[group_id]).any():
+                return None
+            return counts[group_id]
+
+        return increase
+
+    def series(self) -> List[SeriesDefinition]:
+        """Get every ticket series."""
+        statistics = self.aggregates.statistics
+        history = self.aggregates.history
+        definitions = [
+            SeriesDefinition({"__name__": "zammad_tickets_total"}, _history(history.created_up_to)),
+            SeriesDefinition({"__name__": "zammad_tickets_open"}, _history(history.open_at)),
+            SeriesDefinition({"__name__": "zammad_tickets_closed"}, _history(history.closed_up_to)),
+        ]
+        for state, count in statistics.tickets_by_state.items():
+            definitions.append(SeriesDefinition(
+                {"__name__": "zammad_tickets_by_state", "state": state}, _constant(count)
+            ))
+        for priority, count in statistics.tickets_by_priority.items():
+            definitions.append(SeriesDefinition(
+                {"__name__": "zammad_tickets_by_priority", "priority": priority}, _constant(count)
+            ))
+        for group_id, group_history in self.aggregates.history_by_group.items():
+            group_labels = {"group_id": str(group_id)} if group_id is not None else {}
+            definitions.append(SeriesDefinition(
+                {"__name__": "zammad_tickets_created_total", **group_labels},
+                _history(group_history.created_up_to),
+                increase=self._created_in_window(group_id),
+            ))
+            definitions.append(SeriesDefinition(
+                {"__name__": "zammad_tickets_closed_total", **group_labels},
+                _history(group_history.closed_up_to),
+            ))
+        for group_id, durations in self.aggregates.durations.groups.items():
+            group_labels = {"group_id": str(group_id)} if group_id is not None else {}
+            for name, histogram in durations.histograms(self.now).items():
+                for le, count in histogram.buckets():
+                    definitions.append(SeriesDefinition(
+                        {"__name__": f"{name}_bucket", **group_labels, "le": le},
+                        _constant(count),
+                    ))
+                definitions.append(SeriesDefinition(
+                    {"__name__": f"{name}_sum", **group_labels}, _constant(histogram.sum)
+                ))
+                definitions.append(SeriesDefinition(
+                    {"__name__": f"{name}_count", **group_labels}, _constant(histogram.count)
+                ))
+        return definitions
@@ -0,0 +1,365 @@
+"""
+Local ticket store kept current with incremental syncs.
+Follows Single Responsibility Principle - handles only keeping a local copy of tickets in sync.
+Follows Dependency Inversion Principle - depends on repository interface.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.singleflight import SingleFlight
+from app.domain.models import Ticket
+from app.repositories.snapshot_repository import ISnapshotRepository
+from app.repositories.zammad_repository import IZammadRepository
+from app.services.durations import TicketDurations
+from app.services.ticket_table import NULL_ID, NULL_TIME, TicketTable, to_epoch_us
+
+# Changes kept for updating derived results; older results are recomputed instead
+CHANGE_LOG_SIZE = 64
+
+
+class TicketStore:
+    """
+    In-memory copy of all Zammad tickets, held as a columnar TicketTable.
+    The first sync crawls every ticket. Later syncs only page through the search
+    endpoint sorted by updated_at desc until they reach the watermark (the newest
+    updated_at seen so far), so steady-state cost follows churn, not ticket count.
+    A periodic full resync picks up deletions, which incremental syncs cannot see.
+    With a snapshot repository, synced tickets and the watermark are persisted so a
+    restart can serve the snapshot immediately and catch up incrementally.
+    Rows are also partitioned by group_id, each partition with its own version, so a
+    sync only rebuilds (and invalidates results derived from) the groups it touched.
+    Duration histograms are kept alongside the table and updated with the changed
+    tickets only. The rows each recent change replaced are logged, so results derived
+    from an earlier version can be brought up to date from the changes alone.
+    """
+
+    def __init__(
+        self,
+        repository: IZammadRepository,
+        per_page: int = 500,
+        sync_interval: float = 30.0,
+        full_resync_interval: float = 3600.0,
+        snapshot: Optional[ISnapshotRepository] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize an empty store; nothing is fetched until the first sync."""
+        self.repository = repository
+        self.snapshot = snapshot
+        self.per_page = per_page
+        self.sync_interval = sync_interval
+        self.full_resync_interval = full_resync_interval
+        self._clock = clock
+        self.table = TicketTable()
+        self.durations = TicketDurations()
+        # Bumped whenever the table changes, so derived results can be reused until then
+        self.version = 0
+        # Version at which each group last changed; groups not listed changed at the
+        # last full replace of the table
+        self._replaced_version = 0
+        self._group_versions: Dict[int, int] = {}
+        # (version, rows before, rows after) of the latest changes since the last replace
+        self._changes: List[Tuple[int, TicketTable, TicketTable]] = []
+        # group_id -> (partition version, rows of that group)
+        self._partitions: Dict[int, Tuple[int, TicketTable]] = {}
+        self.watermark: Optional[datetime] = None
+        self._last_sync: Optional[float] = None
+        self._last_full_sync: Optional[float] = None
+        self._single_flight = SingleFlight()
+
+    @property
+    def is_loaded(self) -> bool:
+        """Whether an initial full crawl has completed."""
+        return self._last_full_sync is not None
+
+    async def load_snapshot(self) -> bool:
+        """
+        Load tickets and the watermark from the snapshot repository.
+        Returns True if a snapshot was loaded; the store then serves it until the next sync.
+        """
+        if self.snapshot is None:
+            return False
+
+        started = time.perf_counter()
+        try:
+            snapshot = await asyncio.to_thread(self.snapshot.load, ("tickets",))
+        except Exception as e:
+            logger.warning(f"Could not load ticket snapshot: {e}")
+            return False
+        if snapshot is None or "ticket_watermark" not in snapshot.meta:
+            return False
+
+        self._replace_table(TicketTable.from_tickets(snapshot.tickets))
+        watermark = snapshot.meta["ticket_watermark"]
+        self.watermark = datetime.fromisoformat(watermark) if watermark else None
+        now = self._clock()
+        # Keep the full resync schedule across restarts
+        full_sync_age = time.time() - snapshot.meta.get("tickets_full_synced_at", 0.0)
+        self._last_full_sync = now - max(full_sync_age, 0.0)
+        self._last_sync = now
+
+        size_mb = await asyncio.to_thread(self.snapshot.size_bytes) / (1024 * 1024)
+        logger.info(
+            f"Loaded ticket snapshot with {len(self.table)} tickets "
+            f"({size_mb:.1f} MiB) in {time.perf_counter() - started:.2f}s, "
+            f"watermark {watermark}"
+        )
+        return True
+
+    async def catch_up(self) -> None:
+        """Sync in the background after startup, logging instead of raising failures."""
+        try:
+            await self.sync()
+        except Exception as e:
+            logger.warning(f"Background ticket sync failed: {e}")
+
+    async def _persist(self, tickets: List[Ticket], replace: bool) -> None:
+        """Write synced tickets and the watermark to the snapshot repository."""
+        if self.snapshot is None:
+            return
+        meta: Dict[str, Any] = {
+            "ticket_watermark": self.watermark.isoformat() if self.watermark else None,
+        }
+        if replace:
+            meta["tickets_full_synced_at"] = time.time()
+        write = self.snapshot.replace if replace else self.snapshot.upsert
+        try:
+            await asyncio.to_thread(write, "tickets", tickets, meta)
+        except Exception as e:
+            # The in-memory store stays authoritative; the next sync writes again
+            logger.warning(f"Could not persist ticket snapshot: {e}")
+
+    async def ensure_fresh(self) -> None:
+        """Sync if the store has never been loaded or the last sync is older than the interval."""
+        if self._last_sync is None or self._clock() - self._last_sync >= self.sync_interval:
+            await self.sync()
+
+    async def sync(self, full: bool = False) -> None:
+        """Bring the store up to date; concurrent callers share one sync."""
+        await self._single_flight.do(("sync", full), lambda: self._sync(full))
+
+    async def _sync(self, full: bool) -> None:
+        """Run a full or incremental sync depending on store state."""
+        now = self._clock()
+        if (
+            full
+            or self._last_full_sync is None
+            or now - self._last_full_sync >= self.full_resync_interval
+        ):
+            await self._full_sync()
+            self._last_full_sync = now
+        else:
+            await self._incremental_sync()
+        self._last_sync = now
+
+    async def _full_sync(self) -> None:
+        """Replace the store contents with a complete crawl."""
+        started = time.perf_counter()
+        tickets = await self.repository.get_tickets(
+            per_page=self.per_page, fetch_all=True, sort_by="updated_at", order="desc"
+        )
+        self._replace_table(TicketTable.from_tickets(tickets))
+        self.watermark = max(
+            (ticket.updated_at for ticket in tickets if ticket.updated_at is not None),
+            default=None,
+        )
+        logger.info(
+            f"Full ticket sync loaded {len(tickets)} tickets "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        await self._persist(tickets, replace=True)
+
+    async def _incremental_sync(self) -> None:
+        """Fetch tickets updated since the watermark, newest first, and upsert them."""
+        if self.watermark is None:
+            await self._full_sync()
+            return
+
+        watermark = self.watermark
+        newest = watermark
+        changed: List[Ticket] = []
+        page = 1
+        while True:
+            tickets = await self.repository.get_tickets(
+                per_page=self.per_page, page=page, sort_by="updated_at", order="desc"
+            )
+            reached_watermark = False
+            for ticket in tickets:
+                if ticket.updated_at is not None:
+                    # Same-second updates may not have been seen yet, so >= is re-applied
+                    if ticket.updated_at < watermark:
+                        reached_watermark = True
+                        break
+                    newest = max(newest, ticket.updated_at)
+                changed.append(ticket)
+
+            if reached_watermark or len(tickets) < self.per_page:
+                break
+            page += 1
+
+        if changed:
+            changed = self._apply_changes(changed)
+        self.watermark = newest
+        logger.debug(
+            f"Incremental ticket sync applied {len(changed)} changes over {page} page(s)"
+        )
+        if changed:
+            await self._persist(changed, replace=False)
+
+    async def apply_updates(self, tickets: List[Ticket]) -> List[Ticket]:
+        """
+        Apply pushed ticket changes (e.g. from webhooks) right away, without a sync.
+        Returns the tickets applied; changes older than the stored row are skipped,
+        since deliveries can arrive out of order. A push may carry only some fields;
+        fields it does not set keep their stored values. The watermark is left alone,
+        so the next incremental sync still picks up anything the pushes missed.
+        """
+        applied = self._apply_changes(self._merge_stored(tickets))
+        if applied:
+            await self._persist(applied, replace=False)
+        return applied
+
+    def _merge_stored(self, tickets: List[Ticket]) -> List[Ticket]:
+        """Overlay the fields each ticket sets on its stored row, if it has one."""
+        stored = {
+            ticket.id: ticket
+            for ticket in self.table.select(ticket.id for ticket in tickets).to_tickets()
+        }
+        return [
+            stored[ticket.id].model_copy(update=ticket.model_dump(exclude_unset=True))
+            if ticket.id in stored else ticket
+            for ticket in tickets
+        ]
+
+    def _apply_changes(self, changed: List[Ticket]) -> List[Ticket]:
+        """
+        Upsert changed tickets not older than their stored rows, updating the histograms
+        and the touched partitions. Returns the tickets applied.
+        """
+        stored = self.table.select(ticket.id for ticket in changed)
+        stored_updated_at = dict(
+            zip(stored.column("id").tolist(), stored.column("updated_at").tolist())
+        )
+        changed = [
+            ticket for ticket in changed
+            if ticket.updated_at is None
+            or to_epoch_us(ticket.updated_at) >= stored_updated_at.get(ticket.id, NULL_TIME)
+        ]
+        if not changed:
+            return changed
+        ticket_ids = [ticket.id for ticket in changed]
+        # Tickets that moved group change both their old and their new partition
+        groups = self.table.category_values("group_id", ticket_ids)
+        before = self.table.select(ticket_ids)
+        self.durations.remove(before)
+        self.table.upsert(changed)
+        after = self.table.select(ticket_ids)
+        self.durations.add(after)
+        self._mark_changed(groups + [ticket.group_id for ticket in changed])
+        self._changes.append((self.version, before, after))
+        del self._changes[:-CHANGE_LOG_SIZE]
+        return changed
+
+    def _replace_table(self, table: TicketTable) -> None:
+        """Swap in a new table; every partition and histogram is stale afterwards."""
+        self.table = table
+        self.durations = TicketDurations()
+        self.durations.add(table)
+        self.version += 1
+        self._replaced_version = self.version
+        self._group_versions.clear()
+        self._partitions.clear()
+        self._changes.clear()
+
+    def _mark_changed(self, group_ids: Iterable[Optional[int]]) -> None:
+        """Bump the store version and the version of each touched group's partition."""
+        self.version += 1
+        for group_id in group_ids:
+            if group_id is not None:
+                self._group_versions[group_id] = self.version
+
+    def changes_since(self, version: int) -> Optional[List[Tuple[TicketTable, TicketTable]]]:
+        """
+        The (rows before, rows after) of every change after a store version, oldest
+        first, or None if they are not all logged, e.g. across a full replace.
+        """
+        changes = [(before, after) for logged, before, after in self._changes if logged > version]
+        return changes if len(changes) == self.version - version else None
+
+    def partition_version(self, group_id: int) -> int:
+        """Version of one group's partition; unchanged while syncs leave the group alone."""
+        return self._group_versions.get(group_id, self._replaced_version)
+
+    def group_ids(self) -> List[int]:
+        """Group ids that have tickets in the store."""
+        return sorted(self.table.value_counts("group_id"))
+
+    def _refresh_partitions(self, group_ids: List[int]) -> None:
+        """Rebuild the stale partitions among the given groups in one pass over the table."""
+        stale = [
+            group_id for group_id in group_ids
+            if self._partitions.get(group_id, (None,))[0] != self.partition_version(group_id)
+        ]
+        if not stale:
+            return
+        for group_id, partition in self.table.partition("group_id", stale).items():
+            self._partitions[group_id] = (self.partition_version(group_id), partition)
+
+    async def get_partitions(self, group_ids: Optional[List[int]] = None) -> Dict[int, TicketTable]:
+        """Get the rows of each group (default: every group), syncing first if stale."""
+        await self.ensure_fresh()
+        group_ids = self.group_ids() if group_ids is None else group_ids
+        self._refresh_partitions(group_ids)
+        return {group_id: self._partitions[group_id][1] for group_id in group_ids}
+
+    async def get_table(self, group_id: Optional[int] = None) -> TicketTable:
+        """Get the ticket table, syncing first if stale, optionally only one group's partition."""
+        if group_id is not None:
+            return (await self.get_partitions([group_id]))[group_id]
+        await self.ensure_fresh()
+        return self.table
+
+    async def get_tickets(
+        self,
+        sort_by: Optional[str] = "created_at",
+        order: Optional[str] = "desc",
+        group_id: Optional[int] = None,
+    ) -> List[Ticket]:
+        """Get all stored tickets, syncing first if stale, optionally filtered by group_id."""
+        table = await self.get_table(group_id=group_id)
+        sort_by = sort_by or "created_at"
+        descending = (order or "desc").lower() == "desc"
+
+        if sort_by not in TicketTable.INT_COLUMNS:
+            tickets = table.to_tickets()
+            # Tickets without a value for the sort field go last in either direction
+            with_value = [t for t in tickets if getattr(t, sort_by, None) is not None]
+            without_value = [t for t in tickets if getattr(t, sort_by, None) is None]
+            with_value.sort(key=lambda t: getattr(t, sort_by), reverse=descending)
+            return with_value + without_value
+
+        values = table.column(sort_by)
+        missing = values == (NULL_TIME if sort_by.endswith("_at") else NULL_ID)
+        present_rows = np.flatnonzero(~missing)
+        # Stable sort; descending sorts on the negated key so ties keep table order
+        keys = -values[present_rows] if descending else values[present_rows]
+        ordered = present_rows[np.argsort(keys, kind="stable")]
+        return table.to_tickets(np.concatenate([ordered, np.flatnonzero(missing)]))
+
+    def status(self) -> Dict[str, Any]:
+        """Get the store size, watermark and age of the last syncs in seconds."""
+        now = self._clock()
+        return {
+            "ticket_count": len(self.table),
+            "watermark": self.watermark.isoformat() if self.watermark else None,
+            "seconds_since_sync": (
+                now - self._last_sync if self._last_sync is not None else None
+            ),
+            "seconds_since_full_sync": (
+                now - self._last_full_sync if self._last_full_sync is not None else None
+            ),
+        }
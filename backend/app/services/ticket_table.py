@@ -0,0 +1,283 @@
+"""
+Columnar in-memory ticket table.
+Follows Single Responsibility Principle - handles only compact storage of ticket fields.
+Numeric fields live in int64 arrays and low-cardinality fields as int32 codes into a
+per-table dictionary, so aggregations are array operations instead of Python loops.
+"""
+from datetime import datetime, timezone
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.domain.models import Ticket
+
+# Sentinels for missing values
+NULL_ID = -1
+NULL_CODE = -1
+NULL_TIME = np.iinfo(np.int64).min
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def to_epoch_us(value: Optional[datetime]) -> int:
+    """Convert a datetime to integer microseconds since the Unix epoch (naive means UTC)."""
+    if value is None:
+        return NULL_TIME
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def from_epoch_us(value: int) -> Optional[datetime]:
+    """Convert integer microseconds since the Unix epoch back to a UTC datetime."""
+    if value == NULL_TIME:
+        return None
+    return datetime.fromtimestamp(value / 1_000_000, tz=timezone.utc)
+
+
+class CategoryDictionary:
+    """Maps category values to dense int codes and back."""
+
+    def __init__(self):
+        """Initialize an empty dictionary."""
+        self.values: List[Hashable] = []
+        self._codes: Dict[Hashable, int] = {}
+
+    def encode(self, value: Optional[Hashable]) -> int:
+        """Return the code for a value, adding it if new; None maps to NULL_CODE."""
+        if value is None:
+            return NULL_CODE
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value: Hashable) -> int:
+        """Return the code for a known value, or NULL_CODE if it was never seen."""
+        return self._codes.get(value, NULL_CODE)
+
+    def __len__(self) -> int:
+        """Number of distinct values."""
+        return len(self.values)
+
+
+class TicketTable:
+    """
+    Array-backed table of tickets, one row per ticket id.
+    ids, customer_id, organization_id and timestamps (microseconds since epoch: created,
+    updated, closed and first response) are int64 columns; state, priority and
+    group_id are int32 codes into dictionaries.
+    Upserts overwrite rows in place and appends grow the arrays geometrically.
+    """
+
+    INT_COLUMNS = (
+        "id", "created_at", "updated_at", "close_at", "first_response_at",
+        "customer_id", "organization_id",
+    )
+    CATEGORY_COLUMNS = ("state", "priority", "group_id")
+
+    def __init__(self, capacity: int = 1024):
+        """Initialize an empty table with room for capacity rows."""
+        self._size = 0
+        self._capacity = max(capacity, 1)
+        self._arrays: Dict[str, np.ndarray] = {
+            name: np.empty(self._capacity, dtype=np.int64) for name in self.INT_COLUMNS
+        }
+        for name in self.CATEGORY_COLUMNS:
+            self._arrays[name] = np.empty(self._capacity, dtype=np.int32)
+        self.dictionaries: Dict[str, CategoryDictionary] = {
+            name: CategoryDictionary() for name in self.CATEGORY_COLUMNS
+        }
+        # Free-text fields are only needed to rebuild Ticket objects
+        self._numbers: List[Optional[str]] = []
+        self._titles: List[Optional[str]] = []
+        self._rows: Dict[int, int] = {}
+
+    @classmethod
+    def from_tickets(cls, tickets: Sequence[Ticket]) -> "TicketTable":
+        """Build a table from ticket models."""
+        table = cls(capacity=len(tickets))
+        table.upsert(tickets)
+        return table
+
+    def __len__(self) -> int:
+        """Number of rows."""
+        return self._size
+
+    def __contains__(self, ticket_id: int) -> bool:
+        """Whether a ticket id has a row."""
+        return ticket_id in self._rows
+
+    def column(self, name: str) -> np.ndarray:
+        """Return a read-only view of a column's filled rows."""
+        view = self._arrays[name][: self._size]
+        view.flags.writeable = False
+        return view
+
+    def _grow(self, needed: int) -> None:
+        """Grow the arrays to hold at least needed rows."""
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, self._capacity * 2)
+        for name, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[: self._size] = array[: self._size]
+            self._arrays[name] = grown
+        self._capacity = capacity
+
+    def upsert(self, tickets: Iterable[Ticket]) -> None:
+        """Insert new tickets and overwrite rows of tickets already in the table."""
+        tickets = list(tickets)
+        self._grow(self._size + len(tickets))
+        arrays = self._arrays
+        states = self.dictionaries["state"]
+        priorities = self.dictionaries["priority"]
+        groups = self.dictionaries["group_id"]
+
+        for ticket in tickets:
+            row = self._rows.get(ticket.id)
+            if row is None:
+                row = self._rows[ticket.id] = self._size
+                self._size += 1
+                self._numbers.append(ticket.number)
+                self._titles.append(ticket.title)
+            else:
+                self._numbers[row] = ticket.number
+                self._titles[row] = ticket.title
+
+            arrays["id"][row] = ticket.id
+            arrays["created_at"][row] = to_epoch_us(ticket.created_at)
+            arrays["updated_at"][row] = to_epoch_us(ticket.updated_at)
+            arrays["close_at"][row] = to_epoch_us(ticket.close_at)
+            arrays["first_response_at"][row] = to_epoch_us(ticket.first_response_at)
+            arrays["customer_id"][row] = (
+                ticket.customer_id if ticket.customer_id is not None else NULL_ID
+            )
+            arrays["organization_id"][row] = (
+                ticket.organization_id if ticket.organization_id is not None else NULL_ID
+            )
+            arrays["state"][row] = states.encode(ticket.state)
+            arrays["priority"][row] = priorities.encode(ticket.priority)
+            arrays["group_id"][row] = groups.encode(ticket.group_id)
+
+    def where(self, mask: np.ndarray) -> "TicketTable":
+        """Return a new table with the rows selected by a boolean mask."""
+        return self.take(np.flatnonzero(mask))
+
+    def take(self, rows: np.ndarray) -> "TicketTable":
+        """Return a new table with the given rows, in that order."""
+        table = TicketTable(capacity=len(rows))
+        table._size = len(rows)
+        for name, array in self._arrays.items():
+            table._arrays[name][: len(rows)] = array[rows]
+        table.dictionaries = self.dictionaries
+        table._numbers = [self._numbers[row] for row in rows]
+        table._titles = [self._titles[row] for row in rows]
+        table._rows = {int(ticket_id): row for row, ticket_id in enumerate(table.column("id"))}
+        return table
+
+    def select(self, ticket_ids: Iterable[int]) -> "TicketTable":
+        """Return the rows of the given ticket ids that are in the table, each once."""
+        rows = sorted({self._rows[ticket_id] for ticket_id in ticket_ids if ticket_id in self._rows})
+        return self.take(np.array(rows, dtype=np.int64))
+
+    def for_group(self, group_id: int) -> "TicketTable":
+        """Return the rows of one group."""
+        code = self.dictionaries["group_id"].code(group_id)
+        return self.where(self.column("group_id") == code)
+
+    def partition(self, name: str, values: Iterable[Hashable]) -> Dict[Hashable, "TicketTable"]:
+        """
+        Split out the rows of each given category value in one pass.
+        Rows are grouped with a stable sort, so each partition keeps table order.
+        """
+        dictionary = self.dictionaries[name]
+        values = list(values)
+        codes = self.column(name)
+        wanted = np.array([dictionary.code(value) for value in values], dtype=np.int32)
+        rows = np.flatnonzero(np.isin(codes, wanted[wanted != NULL_CODE]))
+        rows = rows[np.argsort(codes[rows], kind="stable")]
+        sorted_codes = codes[rows]
+        starts = np.searchsorted(sorted_codes, wanted, side="left")
+        ends = np.searchsorted(sorted_codes, wanted, side="right")
+        return {
+            value: self.take(rows[start:end] if code != NULL_CODE else rows[:0])
+            for value, code, start, end in zip(values, wanted, starts, ends)
+        }
+
+    def category_values(self, name: str, ticket_ids: Iterable[int]) -> List[Hashable]:
+        """Return the category value of each ticket id that has a row, skipping missing values."""
+        codes = self._arrays[name]
+        values = self.dictionaries[name].values
+        rows = [self._rows[ticket_id] for ticket_id in ticket_ids if ticket_id in self._rows]
+        return [values[codes[row]] for row in rows if codes[row] != NULL_CODE]
+
+    def created_between(
+        self, created_from: Optional[datetime] = None, created_to: Optional[datetime] = None
+    ) -> "TicketTable":
+        """Return the rows created within [created_from, created_to]; None is an open bound."""
+        created = self.column("created_at")
+        mask = created != NULL_TIME
+        if created_from is not None:
+            mask &= created >= to_epoch_us(created_from)
+        if created_to is not None:
+            mask &= created <= to_epoch_us(created_to)
+        return self.where(mask)
+
+    def is_closed(self) -> np.ndarray:
+        """Boolean mask of the rows in a closed state."""
+        closed_codes = [
+            code
+            for code, state in enumerate(self.dictionaries["state"].values)
+            if state.lower() == "closed"
+        ]
+        return np.isin(self.column("state"), closed_codes)
+
+    def close_times(self) -> np.ndarray:
+        """
+        Close time of every row: close_at, else the last update, the closest time
+        Zammad reports for tickets closed before close_at was synced.
+        Only meaningful for closed rows.
+        """
+        close_at = self.column("close_at")
+        return np.where(close_at != NULL_TIME, close_at, self.column("updated_at"))
+
+    def value_counts(self, name: str) -> Dict[Hashable, int]:
+        """Count rows per value of a category column, skipping missing values."""
+        codes = self.column(name)
+        counts = np.bincount(codes[codes != NULL_CODE], minlength=len(self.dictionaries[name]))
+        values = self.dictionaries[name].values
+        return {values[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def ticket(self, row: int) -> Ticket:
+        """Rebuild the ticket model stored in a row."""
+        arrays = self._arrays
+        state = int(arrays["state"][row])
+        priority = int(arrays["priority"][row])
+        group = int(arrays["group_id"][row])
+        customer_id = int(arrays["customer_id"][row])
+        organization_id = int(arrays["organization_id"][row])
+        return Ticket.model_construct(
+            id=int(arrays["id"][row]),
+            number=self._numbers[row],
+            title=self._titles[row],
+            state=self.dictionaries["state"].values[state] if state != NULL_CODE else None,
+            priority=(
+                self.dictionaries["priority"].values[priority] if priority != NULL_CODE else None
+            ),
+            created_at=from_epoch_us(int(arrays["created_at"][row])),
+            updated_at=from_epoch_us(int(arrays["updated_at"][row])),
+            close_at=from_epoch_us(int(arrays["close_at"][row])),
+            first_response_at=from_epoch_us(int(arrays["first_response_at"][row])),
+            customer_id=customer_id if customer_id != NULL_ID else None,
+            organization_id=organization_id if organization_id != NULL_ID else None,
+            group_id=self.dictionaries["group_id"].values[group] if group != NULL_CODE else None,
+        )
+
+    def to_tickets(self, rows: Optional[Iterable[int]] = None) -> List[Ticket]:
+        """Rebuild ticket models for the given rows, or for all rows in table order."""
+        if rows is None:
+            rows = range(self._size)
+        return [self.ticket(int(row)) for row in rows]
@@ -0,0 +1,46 @@
+"""
+Zammad webhook payload handling.
+Follows Single Responsibility Principle - handles only verifying and decoding webhook deliveries.
+Zammad signs each delivery with an HMAC-SHA1 of the raw body, keyed with the
+webhook's signature token, and sends it as "X-Hub-Signature: sha1=<hex digest>".
+"""
+import hashlib
+import hmac
+from typing import Any, Dict, Optional
+
+from app.domain.models import Ticket
+
+SIGNATURE_HEADER = "X-Hub-Signature"
+
+# Ticket associations Zammad may send as nested objects instead of names
+_NAMED_FIELDS = ("state", "priority")
+
+
+def sign(body: bytes, secret: str) -> str:
+    """Signature header value for a body, as Zammad computes it."""
+    digest = hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+    return f"sha1={digest}"
+
+
+def verify_signature(body: bytes, signature: Optional[str], secret: str) -> bool:
+    """Whether a signature header matches the body; compared in constant time."""
+    if not signature or not secret:
+        return False
+    return hmac.compare_digest(signature.strip().lower(), sign(body, secret))
+
+
+def ticket_from_payload(payload: Dict[str, Any]) -> Ticket:
+    """
+    Decode the ticket of a trigger webhook payload ({"ticket": {...}, "article": ...}).
+    State and priority are accepted as names or as {"name": ...} objects. Fields the
+    payload leaves out stay unset, so they are not mistaken for cleared values.
+    Raises ValueError if there is no ticket.
+    """
+    data = payload.get("ticket") if isinstance(payload, dict) else None
+    if not isinstance(data, dict):
+        raise ValueError("payload has no ticket object")
+    data = dict(data)
+    for name in _NAMED_FIELDS:
+        if isinstance(data.get(name), dict):
+            data[name] = data[name].get("name")
+    return Ticket.model_validate(data)
@@ -3,17 +3,40 @@ Service layer for Zammad business logic.
 Follows Single Responsibility Principle - handles business logic for Zammad data.
 Follows Dependency Inversion Principle - depends on repository interface.
 """
-from typing import List, Optional
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
+from app.core.exceptions import ConfigurationError
+from app.core.singleflight import SingleFlight
 from app.domain.models import (
     CustomerTicketCount,
     Organization,
     Ticket,
     TicketStatistics,
     TopCustomersResponse,
+    TopOrganizationsResponse,
     User,
 )
 from app.repositories.zammad_repository import IZammadRepository
+from app.services.aggregations import (
+    TicketAggregates,
+    TicketAggregator,
+    TicketFold,
+    fold_pages,
+)
+from app.services.durations import TicketDurations
+from app.services.entity_directory import EntityDirectory
+from app.services.promql import Evaluator, Value, parse_query
+from app.services.ticket_metrics import TicketSeriesSource
+from app.services.ticket_store import TicketStore
+from app.services.ticket_table import TicketTable, from_epoch_us
+
+# Changed rows up to which store changes are merged into the last aggregates; merging
+# a few rows is ~20x cheaper than a full pass, but costs about as much at ~5000 rows
+MERGE_LIMIT = 1000
 
 
 class ZammadService:
@@ -22,9 +45,106 @@ class ZammadService:
     Follows Open/Closed Principle - can be extended without modification.
     """
 
-    def __init__(self, repository: IZammadRepository):
-        """Initialize service with repository dependency."""
+    def __init__(
+        self,
+        repository: IZammadRepository,
+        store: Optional[TicketStore] = None,
+        rollup_retention: Optional[Dict[int, int]] = None,
+        directory: Optional[EntityDirectory] = None,
+    ):
+        """
+        Initialize service with repository dependency.
+        When a ticket store is given, full-ticket reads and aggregations are served from it.
+        rollup_retention maps rollup resolution seconds to the number of buckets kept.
+        When a directory is given, customer rows are enriched with user and organization names.
+        """
         self.repository = repository
+        self.store = store
+        self.directory = directory
+        self.rollup_retention = rollup_retention
+        self._single_flight = SingleFlight()
+        # group_id -> (store version, aggregates computed from that version)
+        self._aggregates: Dict[Optional[int], Tuple[int, TicketAggregates]] = {}
+
+    async def _get_tickets(
+        self,
+        per_page: Optional[int] = 500,
+        page: Optional[int] = 1,
+        sort_by: Optional[str] = "created_at",
+        order: Optional[str] = "desc",
+        fetch_all: bool = False,
+        group_id: Optional[int] = None,
+    ) -> List[Ticket]:
+        """Fetch tickets, sharing one upstream crawl between concurrent identical calls."""
+        key = ("get_tickets", per_page, page, sort_by, order, fetch_all, group_id)
+        return await self._single_flight.do(
+            key,
+            lambda: self.repository.get_tickets(
+                per_page=per_page,
+                page=page,
+                sort_by=sort_by,
+                order=order,
+                fetch_all=fetch_all,
+                group_id=group_id,
+            ),
+        )
+
+    async def _get_ticket_snapshot(
+        self,
+        sort_by: Optional[str] = "created_at",
+        order: Optional[str] = "desc",
+        group_id: Optional[int] = None,
+    ) -> List[Ticket]:
+        """Get every ticket, from the local store when available, otherwise by crawling."""
+        if self.store is not None:
+            return await self.store.get_tickets(sort_by=sort_by, order=order, group_id=group_id)
+        return await self._get_tickets(
+            fetch_all=True, sort_by=sort_by, order=order, group_id=group_id
+        )
+
+    async def _fold_tickets(
+        self,
+        *folds: TicketFold,
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> None:
+        """
+        Run aggregation folds over every ticket, optionally filtered by group_id and
+        created_at range.
+        With a local store the folds see its columnar table in one pass;
+        otherwise they stream the repository page by page, with the filters pushed
+        down into the search query.
+        """
+        if self.store is not None:
+            table = await self.store.get_table(group_id=group_id)
+            if created_from is not None or created_to is not None:
+                table = table.created_between(created_from, created_to)
+            for fold in folds:
+                fold.add(table)
+            return
+        pages = self.repository.iter_tickets(
+            group_id=group_id, created_from=created_from, created_to=created_to
+        )
+        await fold_pages(pages, *folds)
+
+    def get_coalescing_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get per-operation counts of upstream executions and coalesced callers."""
+        return self._single_flight.stats()
+
+    def get_sync_status(self) -> Optional[Dict[str, Any]]:
+        """Get the local ticket store status, or None when no store is used."""
+        return self.store.status() if self.store is not None else None
+
+    async def apply_ticket_updates(self, tickets: List[Ticket]) -> List[Ticket]:
+        """
+        Apply pushed ticket changes to the local store, so aggregates reflect them on
+        their next read. Returns the tickets applied, skipping outdated deliveries.
+        Raises ConfigurationError when there is no store to apply them to.
+        """
+        if self.store is None:
+            raise ConfigurationError("ticket sync is disabled, so pushed updates cannot be applied")
+        return await self.store.apply_updates(tickets)
 
     async def get_all_tickets(
         self,
@@ -36,7 +156,9 @@ class ZammadService:
         group_id: Optional[int] = None,
     ) -> List[Ticket]:
         """Get all tickets with pagination and sorting, optionally filtered by group_id."""
-        return await self.repository.get_tickets(
+        if fetch_all and page in (None, 1) and self.store is not None:
+            return await self._get_ticket_snapshot(sort_by=sort_by, order=order, group_id=group_id)
+        return await self._get_tickets(
             per_page=per_page,
             page=page,
             sort_by=sort_by,
@@ -50,73 +172,249 @@ class ZammadService:
         return await self.repository.get_ticket(ticket_id)
 
     async def get_all_organizations(
-        self, limit: Optional[int] = None, offset: Optional[int] = None
+        self,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+        fetch_all: bool = False,
     ) -> List[Organization]:
-        """Get all organizations."""
-        return await self.repository.get_organizations(limit=limit, offset=offset)
+        """
+        Get one page of organizations, or every organization with fetch_all.
+        A full listing is served from the directory once it has loaded.
+        """
+        if fetch_all and self.directory is not None and self.directory.is_loaded:
+            return sorted(self.directory.organizations.values(), key=lambda o: o.id)
+        return await self.repository.get_organizations(
+            limit=limit, offset=offset, page=page, per_page=per_page, fetch_all=fetch_all
+        )
 
     async def get_all_users(
-        self, limit: Optional[int] = None, offset: Optional[int] = None
+        self,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+        page: Optional[int] = None,
+        per_page: Optional[int] = None,
+        fetch_all: bool = False,
     ) -> List[User]:
-        """Get all users."""
-        return await self.repository.get_users(limit=limit, offset=offset)
+        """
+        Get one page of users, or every user with fetch_all.
+        A full listing is served from the directory once it has loaded.
+        """
+        if fetch_all and self.directory is not None and self.directory.is_loaded:
+            return sorted(self.directory.users.values(), key=lambda u: u.id)
+        return await self.repository.get_users(
+            limit=limit, offset=offset, page=page, per_page=per_page, fetch_all=fetch_all
+        )
+
+    async def get_ticket_aggregates(
+        self,
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> TicketAggregates:
+        """
+        Get every dashboard aggregation from one pass over one ticket snapshot,
+        optionally only over tickets created within [created_from, created_to].
+        Concurrent callers share one computation; with a local store the unbounded
+        result is reused until the store changes.
+        """
+        return await self._single_flight.do(
+            ("get_ticket_aggregates", group_id, created_from, created_to),
+            lambda: self._calculate_ticket_aggregates(group_id, created_from, created_to),
+        )
+
+    async def _calculate_ticket_aggregates(
+        self,
+        group_id: Optional[int],
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> TicketAggregates:
+        """
+        Run the aggregator over all tickets, or reuse the result for an unchanged store.
+        After store changes the previous result is updated with the changed rows only.
+        A group's result is read from its store partition and only recomputed when a
+        sync touched that group.
+        """
+        if self.store is not None and created_from is None and created_to is None:
+            table = await self.store.get_table(group_id=group_id)
+            if group_id is None:
+                version = self.store.version
+            else:
+                version = self.store.partition_version(group_id)
+            cached = self._aggregates.get(group_id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            changes = None
+            if group_id is None and cached is not None:
+                changes = self.store.changes_since(cached[0])
+                # Merging costs per changed row, so a bulk change is re-aggregated instead
+                if changes is not None and sum(len(after) for _, after in changes) > MERGE_LIMIT:
+                    changes = None
+            if changes is not None:
+                # Webhooks and incremental syncs only merge their rows into the last result
+                aggregates = cached[1]
+                for before, after in changes:
+                    aggregates = aggregates.updated(before, after)
+            elif group_id is None:
+                # The store maintains the duration histograms as it syncs
+                aggregates = self._aggregate_table(table, self.store.durations)
+            else:
+                # Partitions are private copies, so groups can be aggregated in parallel
+                aggregates = await asyncio.to_thread(
+                    self._aggregate_table, table, self.store.durations.subset([group_id])
+                )
+            self._aggregates[group_id] = (version, aggregates)
+            return aggregates
+
+        aggregator = TicketAggregator(self.rollup_retention)
+        await self._fold_tickets(
+            aggregator, group_id=group_id, created_from=created_from, created_to=created_to
+        )
+        return aggregator.result()
+
+    def _aggregate_table(
+        self, table: TicketTable, durations: Optional[TicketDurations] = None
+    ) -> TicketAggregates:
+        """Run the aggregator over one table, reusing maintained duration histograms if given."""
+        aggregator = TicketAggregator(self.rollup_retention, durations)
+        aggregator.add(table)
+        return aggregator.result()
+
+    async def refresh_group_aggregates(self) -> Dict[int, TicketAggregates]:
+        """
+        Bring every group's aggregates up to date from the store partitions.
+        Groups are refreshed concurrently; unchanged groups reuse their result.
+        Without a store there are no partitions, so nothing is refreshed.
+        """
+        if self.store is None:
+            return {}
+        group_ids = list((await self.store.get_partitions()).keys())
+        results = await asyncio.gather(
+            *(self.get_ticket_aggregates(group_id=group_id) for group_id in group_ids)
+        )
+        return dict(zip(group_ids, results))
 
     async def get_ticket_statistics(self) -> TicketStatistics:
         """Calculate ticket statistics."""
-        tickets = await self.repository.get_tickets(fetch_all=True)
+        aggregates = await self.get_ticket_aggregates()
+        return aggregates.statistics
 
-        total_tickets = len(tickets)
-        open_tickets = sum(1 for t in tickets if t.state and t.state.lower() != "closed")
-        closed_tickets = sum(1 for t in tickets if t.state and t.state.lower() == "closed")
+    def _enrich_customers(self, customers: List[CustomerTicketCount]) -> List[CustomerTicketCount]:
+        """Add customer and organization names from the directory; no upstream calls."""
+        if self.directory is None:
+            return customers
+        enriched = []
+        for customer in customers:
+            user = self.directory.users.get(customer.customer_id)
+            organization_id = user.organization_id if user is not None else None
+            enriched.append(customer.model_copy(update={
+                "customer_name": self.directory.user_name(customer.customer_id),
+                "organization_id": organization_id,
+                "organization_name": self.directory.organization_name(organization_id),
+            }))
+        return enriched
 
-        tickets_by_state: dict[str, int] = {}
-        tickets_by_priority: dict[str, int] = {}
+    async def get_top_customers_by_tickets(
+        self,
+        limit: int = 10,
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> TopCustomersResponse:
+        """
+        Get top customers by ticket count, with names when known, optionally within a
+        group and counting only tickets created within [created_from, created_to].
+        The window is read from the group's per-day counts, so it reuses cached aggregates.
+        """
+        aggregates = await self.get_ticket_aggregates(group_id=group_id)
+        customers = aggregates.top_customers(limit, created_from, created_to)
+        return TopCustomersResponse(customers=self._enrich_customers(customers))
 
-        for ticket in tickets:
-            if ticket.state:
-                tickets_by_state[ticket.state] = tickets_by_state.get(ticket.state, 0) + 1
-            if ticket.priority:
-                tickets_by_priority[ticket.priority] = (
-                    tickets_by_priority.get(ticket.priority, 0) + 1
-                )
+    async def get_top_organizations_by_tickets(
+        self,
+        limit: int = 10,
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> TopOrganizationsResponse:
+        """Get top organizations by ticket count, filtered like get_top_customers_by_tickets."""
+        aggregates = await self.get_ticket_aggregates(group_id=group_id)
+        organizations = aggregates.top_organizations(limit, created_from, created_to)
+        if self.directory is not None:
+            organizations = [
+                organization.model_copy(update={
+                    "organization_name": self.directory.organization_name(
+                        organization.organization_id
+                    ),
+                })
+                for organization in organizations
+            ]
+        return TopOrganizationsResponse(organizations=organizations)
 
-        return TicketStatistics(
-            total_tickets=total_tickets,
-            open_tickets=open_tickets,
-            closed_tickets=closed_tickets,
-            tickets_by_state=tickets_by_state,
-            tickets_by_priority=tickets_by_priority,
+    async def get_daily_ticket_counts(
+        self,
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Count tickets created per day, optionally filtered by group_id and created_at range.
+        Returns {"YYYY-MM-DD": {"time": epoch_ms, "value": count}}.
+        """
+        aggregates = await self.get_ticket_aggregates(
+            group_id=group_id, created_from=created_from, created_to=created_to
         )
+        return aggregates.daily_created
 
-    async def get_top_customers_by_tickets(self, limit: int = 10) -> TopCustomersResponse:
-        """Get top customers by ticket count from latest tickets."""
-        # Get all latest tickets (sorted by created_at desc)
-        tickets = await self.repository.get_tickets(
-            fetch_all=True,
-            sort_by="created_at",
-            order="desc"
-        )
-        
-        # Count tickets by customer_id
-        customer_ticket_counts: dict[int, int] = {}
-        for ticket in tickets:
-            if ticket.customer_id is not None:
-                customer_ticket_counts[ticket.customer_id] = (
-                    customer_ticket_counts.get(ticket.customer_id, 0) + 1
-                )
-        
-        # Sort by ticket count (descending) and get top N
-        sorted_customers = sorted(
-            customer_ticket_counts.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:limit]
-        
-        # Convert to response model
-        customers = [
-            CustomerTicketCount(customer_id=customer_id, ticket_count=count)
-            for customer_id, count in sorted_customers
-        ]
-        
-        return TopCustomersResponse(customers=customers)
+    async def get_created_counts(
+        self,
+        timestamps: np.ndarray,
+        step: float,
+        by: str = "group_id",
+        group_id: Optional[int] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ) -> Optional[Dict[Any, np.ndarray]]:
+        """
+        Count tickets created in [t - step, t) at each timestamp per label of a dimension
+        (state, priority or group_id), read from the coarsest fitting rollup.
+        Without a local store, created_from/created_to limit the tickets crawled to the
+        queried range; with one, the shared snapshot's cached rollups are read.
+        Returns None if no rollup resolution divides the step and timestamps.
+        """
+        if self.store is not None:
+            aggregates = await self.get_ticket_aggregates(group_id=group_id)
+        else:
+            aggregates = await self.get_ticket_aggregates(
+                group_id=group_id, created_from=created_from, created_to=created_to
+            )
+        return aggregates.rollups.created_in_windows(by, timestamps, step)
+
+    async def get_created_in_buckets(
+        self, edges: np.ndarray, group_id: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Count tickets created in each [edges[i], edges[i + 1]) bucket (Unix seconds),
+        optionally filtered by group_id, from the sorted creation-time index.
+        With a local store the shared snapshot's index is used; otherwise only the
+        tickets created inside the buckets are crawled.
+        """
+        if self.store is not None or len(edges) == 0:
+            aggregates = await self.get_ticket_aggregates(group_id=group_id)
+        else:
+            aggregates = await self.get_ticket_aggregates(
+                group_id=group_id,
+                created_from=from_epoch_us(int(edges[0] * 1_000_000)),
+                created_to=from_epoch_us(int(edges[-1] * 1_000_000)),
+            )
+        return aggregates.history.created_in_buckets(edges)
 
+    async def query_metrics(self, query: str, timestamps: np.ndarray) -> Value:
+        """
+        Evaluate a PromQL query over the ticket aggregates at every timestamp.
+        Raises QueryError for queries outside the supported subset.
+        """
+        expression = parse_query(query)
+        aggregates = await self.get_ticket_aggregates()
+        return Evaluator(TicketSeriesSource(aggregates), timestamps).evaluate(expression)
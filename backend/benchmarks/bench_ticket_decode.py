@@ -0,0 +1,92 @@
+"""
+Benchmark per-ticket decode cost of a Zammad search result page.
+Compares the per-row path (response.json() then Ticket(**row)) with the bulk path
+(one TypeAdapter validation straight from the JSON bytes).
+
+Run from the backend directory:
+    python -m benchmarks.bench_ticket_decode
+"""
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.domain.models import Ticket
+from app.repositories.zammad_repository import TICKET_PAGE_ADAPTER
+
+PAGE_SIZE = 500
+ROUNDS = 40
+
+
+def make_page(size: int = PAGE_SIZE) -> bytes:
+    """Build a search result page shaped like Zammad's, including fields the model ignores."""
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rows = []
+    for i in range(size):
+        timestamp = (created + timedelta(minutes=i)).isoformat().replace("+00:00", "Z")
+        rows.append({
+            "id": i + 1,
+            "number": str(31000 + i),
+            "title": f"Printer on floor {i % 7} is out of toner",
+            "state": ["new", "open", "closed", "pending reminder"][i % 4],
+            "priority": ["1 low", "2 normal", "3 high"][i % 3],
+            "created_at": timestamp,
+            "updated_at": timestamp,
+            "customer_id": 100 + i % 250,
+            "organization_id": 10 + i % 40,
+            "group_id": 1 + i % 5,
+            "owner_id": 3,
+            "state_id": 1 + i % 4,
+            "priority_id": 1 + i % 3,
+            "article_count": i % 9,
+            "close_at": None,
+            "first_response_at": timestamp,
+            "escalation_at": None,
+            "last_contact_at": timestamp,
+            "create_article_type_id": 5,
+            "create_article_sender_id": 2,
+            "preferences": {"channel_id": 3, "escalation_calculation": {}},
+            "note": None,
+            "updated_by_id": 3,
+            "created_by_id": 100 + i % 250,
+            "tags": ["hardware", "printer"],
+        })
+    return json.dumps(rows).encode()
+
+
+def decode_per_row(content: bytes) -> list:
+    """Decode a page the way the repository used to."""
+    return [Ticket(**row) for row in json.loads(content) or []]
+
+
+def decode_bulk(content: bytes) -> list:
+    """Decode a page with the validated-once page schema."""
+    return TICKET_PAGE_ADAPTER.validate_json(content) or []
+
+
+def measure(decode, content: bytes) -> float:
+    """Return the best per-ticket decode time in microseconds over several rounds."""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        tickets = decode(content)
+        best = min(best, time.perf_counter() - started)
+    return best / len(tickets) * 1_000_000
+
+
+def main() -> None:
+    """Run the benchmark and print per-ticket decode cost for both paths."""
+    content = make_page()
+    assert decode_per_row(content) == decode_bulk(content)
+
+    per_row = measure(decode_per_row, content)
+    bulk = measure(decode_bulk, content)
+    parse_only = measure(json.loads, content)
+    print(f"page of {PAGE_SIZE} tickets, {len(content) / 1024:.0f} KiB")
+    print(f"per-row    json + Ticket(**row):      {per_row:6.2f} us/ticket")
+    print(f"bulk       TypeAdapter.validate_json: {bulk:6.2f} us/ticket")
+    print(f"reference  json.loads only:           {parse_only:6.2f} us/ticket")
+    print(f"speedup: {per_row / bulk:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
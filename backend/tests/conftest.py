@@ -52,6 +52,10 @@ def mock_repository() -> IZammadRepository:
     repository.get_ticket = AsyncMock(return_value=None)
     repository.get_organizations = AsyncMock(return_value=[])
     repository.get_users = AsyncMock(return_value=[])
+    # Stream pages through the (mocked) get_tickets like the interface default does
+    repository.iter_tickets = lambda **kwargs: IZammadRepository.iter_tickets(
+        repository, **kwargs
+    )
     return repository
 
 
@@ -1,10 +1,18 @@
 """
 Integration tests for API endpoints.
 """
+import json
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
 from fastapi.testclient import TestClient
 
+from app.api.v1.dependencies import get_zammad_service
+from app.core.config import settings
+from app.domain.models import Ticket
 from app.main import app
+from app.services.ticket_store import TicketStore
+from app.services.webhooks import sign
 from app.services.zammad_service import ZammadService
 from app.repositories.zammad_repository import IZammadRepository
 
@@ -32,3 +40,119 @@ async def test_root_endpoint(client):
     assert "message" in data
     assert "version" in data
 
+
+def test_grafana_native_query_shares_one_snapshot(client):
+    """Test that all targets of a native query are answered from one ticket crawl."""
+    repository = MagicMock(spec=IZammadRepository)
+    repository.get_tickets = AsyncMock(return_value=[
+        Ticket(id=1, state="open", priority="2 normal"),
+        Ticket(id=2, state="closed", priority="2 normal"),
+    ])
+    repository.iter_tickets = lambda **kwargs: IZammadRepository.iter_tickets(repository, **kwargs)
+    app.dependency_overrides[get_zammad_service] = lambda: ZammadService(repository=repository)
+    try:
+        response = client.post("/api/v1/grafana-native/query", json={"targets": [
+            {"target": "tickets_timeseries"},
+            {"target": "tickets_by_state"},
+            {"target": "tickets_by_priority"},
+        ]})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert [result["target"] for result in response.json()] == [
+        "Tickets Created", "Tickets by State", "Tickets by Priority"
+    ]
+    assert response.json()[2]["table"]["rows"] == [["2 normal", 2]]
+    assert repository.get_tickets.call_count == 1
+
+
+def test_grafana_query_rejects_browser_time_zone(client):
+    """Test that the generic Grafana query reports an unresolvable time zone as a bad request."""
+    response = client.get("/api/v1/grafana/query", params={"tz": "browser", "from": 1, "to": 2})
+
+    assert response.status_code == 400
+    assert "IANA" in response.json()["detail"]
+
+
+class ZammadWebhookStub:
+    """Sends trigger webhook deliveries the way Zammad does, signed with the token."""
+
+    def __init__(self, client: TestClient, secret: str):
+        self.client = client
+        self.secret = secret
+
+    def send(self, ticket: dict, signature: str = None):
+        body = json.dumps({"ticket": ticket, "article": None}).encode()
+        return self.client.post(
+            "/api/v1/webhooks/zammad",
+            content=body,
+            headers={
+                "Content-Type": "application/json",
+                "X-Zammad-Trigger": "dashboard",
+                "X-Hub-Signature": signature or sign(body, self.secret),
+            },
+        )
+
+
+def test_zammad_webhook_applies_signed_ticket_updates(client, monkeypatch):
+    """Test that signed deliveries update the store in order and bad signatures are refused."""
+    repository = MagicMock(spec=IZammadRepository)
+    repository.get_tickets = AsyncMock(return_value=[
+        Ticket(id=1, state="open", group_id=1, updated_at="2024-01-01T10:00:00Z"),
+    ])
+    service = ZammadService(repository=repository, store=TicketStore(repository, sync_interval=3600))
+    monkeypatch.setattr(settings, "ZAMMAD_WEBHOOK_SECRET", "s3cret")
+    app.dependency_overrides[get_zammad_service] = lambda: service
+    sender = ZammadWebhookStub(client, "s3cret")
+    try:
+        assert client.get("/api/v1/statistics/tickets").json()["open_tickets"] == 1
+        closed = sender.send({
+            "id": 1, "state": {"name": "closed"}, "group_id": 1,
+            "created_at": "2024-01-01T09:00:00Z", "updated_at": "2024-01-01T11:00:00Z",
+            "close_at": "2024-01-01T11:00:00Z",
+        })
+        created = sender.send({"id": 2, "state": "new", "group_id": 1,
+                               "updated_at": "2024-01-01T11:30:00Z"})
+        outdated = sender.send({"id": 1, "state": "open", "updated_at": "2024-01-01T10:30:00Z"})
+        forged = sender.send({"id": 3, "state": "new"}, signature="sha1=" + "0" * 40)
+        statistics = client.get("/api/v1/statistics/tickets").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert closed.json() == {"ticket_id": 1, "applied": True}
+    assert created.json() == {"ticket_id": 2, "applied": True}
+    assert outdated.json() == {"ticket_id": 1, "applied": False}
+    assert forged.status_code == 401
+    assert statistics["closed_tickets"] == 1 and statistics["tickets_by_state"] == {
+        "closed": 1, "new": 1
+    }
+    assert repository.get_tickets.call_count == 1
+
+
+def test_zammad_webhook_with_partial_ticket_keeps_stored_fields(client, monkeypatch):
+    """Test that fields a delivery leaves out keep their stored values."""
+    repository = MagicMock(spec=IZammadRepository)
+    repository.get_tickets = AsyncMock(return_value=[
+        Ticket(id=1, state="open", group_id=2, customer_id=5, organization_id=3,
+               created_at="2024-01-01T09:00:00Z", updated_at="2024-01-01T10:00:00Z"),
+    ])
+    store = TicketStore(repository, sync_interval=3600)
+    service = ZammadService(repository=repository, store=store)
+    monkeypatch.setattr(settings, "ZAMMAD_WEBHOOK_SECRET", "s3cret")
+    app.dependency_overrides[get_zammad_service] = lambda: service
+    try:
+        client.get("/api/v1/statistics/tickets")
+        response = ZammadWebhookStub(client, "s3cret").send({
+            "id": 1, "state": {"name": "closed"}, "updated_at": "2024-01-01T11:00:00Z",
+        })
+        statistics = client.get("/api/v1/statistics/tickets").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.json() == {"ticket_id": 1, "applied": True}
+    assert statistics["tickets_by_state"] == {"closed": 1}
+    ticket = store.table.to_tickets()[0]
+    assert (ticket.group_id, ticket.customer_id, ticket.organization_id) == (2, 5, 3)
+    assert ticket.created_at.isoformat() == "2024-01-01T09:00:00+00:00"
+    assert store.group_ids() == [2]
@@ -0,0 +1,133 @@
+"""
+Unit tests for the PromQL subset.
+"""
+import json
+from typing import List
+
+import numpy as np
+import pytest
+
+from app.core.exceptions import QueryError
+from app.services.promql import (
+    ISeriesSource,
+    SeriesDefinition,
+    evaluate_query,
+    parse_duration,
+    range_timestamps,
+    render_sample_pairs,
+)
+
+
+class FakeSource(ISeriesSource):
+    """Two gauges by state and a counter that grows by one per second."""
+
+    def series(self) -> List[SeriesDefinition]:
+        return [
+            SeriesDefinition(
+                {"__name__": "tickets", "state": "open"}, lambda t: np.full(len(t), 3.0)
+            ),
+            SeriesDefinition(
+                {"__name__": "tickets", "state": "closed"}, lambda t: np.full(len(t), 5.0)
+            ),
+            SeriesDefinition({"__name__": "created_total"}, lambda t: t.copy()),
+        ]
+
+
+def instant(query: str):
+    """Evaluate a query at t=100 and return {state: value} or the scalar."""
+    value = evaluate_query(query, FakeSource(), np.array([100.0]))
+    if isinstance(value, np.ndarray):
+        return value[0]
+    return {s.labels.get("state"): s.values[0] for s in value if not np.isnan(s.values[0])}
+
+
+def test_selectors_and_matchers():
+    """Test equality, negative and anchored regex matchers."""
+    assert instant('tickets{state="open"}') == {"open": 3.0}
+    assert instant('tickets{state!="open"}') == {"closed": 5.0}
+    assert instant('tickets{state=~"clo.*"}') == {"closed": 5.0}
+    assert instant('tickets{state=~"clo"}') == {}
+
+
+def test_aggregations_and_binary_operators():
+    """Test sum/count/topk, arithmetic precedence and comparison filters."""
+    assert instant("sum(tickets)") == {None: 8.0}
+    assert instant("count by (state) (tickets)") == {"open": 1.0, "closed": 1.0}
+    assert instant("topk(1, tickets)") == {"closed": 5.0}
+    assert instant("1 + 2 * 3 ^ 2") == 19.0
+    assert instant("-2 ^ 2") == -4.0
+    assert instant("tickets > 4") == {"closed": 5.0}
+    assert instant("tickets / on_missing") == {}
+    assert instant("tickets * 2 - tickets") == {"open": 3.0, "closed": 5.0}
+
+
+def test_rate_and_increase_over_counter():
+    """Test that rate() and increase() use the counter at both ends of the window."""
+    timestamps = np.array([100.0, 200.0])
+    increase = evaluate_query("increase(created_total[1m])", FakeSource(), timestamps)
+    rate = evaluate_query("rate(created_total[1m])", FakeSource(), timestamps)
+
+    assert increase[0].values.tolist() == [60.0, 60.0]
+    assert rate[0].values.tolist() == [1.0, 1.0]
+    assert "__name__" not in rate[0].labels
+    assert parse_duration("1h30m") == 5400
+
+
+@pytest.mark.parametrize("query", [
+    "sum(",
+    'tickets{state~"x"}',
+    "rate(tickets)",
+    "tickets[5m]",
+    "unknown_fn(tickets)",
+    "tickets + ",
+])
+def test_invalid_queries_raise(query):
+    """Test that unsupported or malformed queries raise QueryError."""
+    with pytest.raises(QueryError):
+        instant(query)
+
+
+class HistogramSource(ISeriesSource):
+    """Cumulative buckets of ten observations: 2 up to 1s, 8 up to 10s, 10 in all."""
+
+    def series(self) -> List[SeriesDefinition]:
+        return [
+            SeriesDefinition(
+                {"__name__": "latency_bucket", "le": le}, lambda t, c=count: np.full(len(t), c)
+            )
+            for le, count in (("1", 2.0), ("10", 8.0), ("+Inf", 10.0))
+        ]
+
+
+def test_histogram_quantile_interpolates_within_buckets():
+    """Test linear interpolation, the +Inf bucket and out-of-range quantiles."""
+    def quantile(phi: str) -> float:
+        value = evaluate_query(
+            f"histogram_quantile({phi}, latency_bucket)", HistogramSource(), np.array([100.0])
+        )
+        return value[0].values[0]
+
+    assert quantile("0.1") == 0.5
+    assert quantile("0.5") == 5.5
+    assert quantile("0.95") == 10.0
+    assert quantile("2") == float("inf")
+    with pytest.raises(QueryError):
+        evaluate_query("histogram_quantile(latency_bucket)", HistogramSource(), np.array([1.0]))
+
+
+def test_range_timestamps_align_and_limit_points():
+    """Test that ranges are aligned to the step and oversized ranges are refused."""
+    assert range_timestamps(61, 185, 60).tolist() == [60, 120, 180]
+    with pytest.raises(QueryError, match="exceeded maximum resolution"):
+        range_timestamps(0, 30 * 86_400, 15)
+
+
+def test_rendered_samples_are_valid_json():
+    """Test that pre-rendered sample pairs parse to the Prometheus [ts, "value"] form."""
+    timestamps = np.array([0.0, 15.0, 30.0, 45.0])
+    values = np.array([3.0, np.nan, 0.25, 1000.0])
+
+    rendered = render_sample_pairs(timestamps, values)
+
+    assert json.loads(b"[" + rendered + b"]") == [[0, "3"], [30, "0.25"], [45, "1000"]]
+    assert render_sample_pairs(timestamps, np.full(4, np.nan)) == b""
@@ -0,0 +1,191 @@
+"""
+Unit tests for repository layer.
+"""
+import asyncio
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+import httpx
+import pytest
+
+from app.domain.models import Ticket
+from app.repositories.cached_repository import CachedZammadRepository
+from app.repositories.zammad_repository import ZammadRepository
+
+
+def make_repository(handler) -> ZammadRepository:
+    """Create a repository whose HTTP client is backed by a mock transport."""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return ZammadRepository(base_url="http://zammad.test/", api_token="token", client=client)
+
+
+@pytest.mark.asyncio
+async def test_repository_reuses_shared_client():
+    """Test that paginated crawls go through one shared client."""
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        page = int(request.url.params["page"])
+        per_page = int(request.url.params["per_page"])
+        if page > 2:
+            return httpx.Response(200, json=[])
+        return httpx.Response(
+            200, json=[{"id": (page - 1) * per_page + i} for i in range(per_page)]
+        )
+
+    repository = make_repository(handler)
+    client = repository.client
+
+    tickets = await repository.get_tickets(per_page=2, fetch_all=True)
+
+    assert [t.id for t in tickets] == [0, 1, 2, 3]
+    assert len(requests) == 3
+    assert repository.client is client
+    assert requests[0].headers["Authorization"] == "Bearer token"
+
+    await repository.aclose()
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_concurrent_crawl_matches_sequential():
+    """Test that the parallel page fan-out returns the same tickets in the same order."""
+    total = 23
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        per_page = int(request.url.params["per_page"])
+        # Later pages answer first to exercise reassembly
+        await asyncio.sleep(0.001 * (10 - page % 10))
+        start = (page - 1) * per_page
+        ids = range(total - start, max(total - start - per_page, 0), -1)
+        return httpx.Response(200, json=[{"id": ticket_id} for ticket_id in ids])
+
+    sequential = make_repository(handler)
+    concurrent = make_repository(handler)
+    concurrent.crawl_concurrency = 4
+
+    expected = await sequential.get_tickets(per_page=5, fetch_all=True)
+    result = await concurrent.get_tickets(per_page=5, fetch_all=True)
+
+    assert [t.id for t in result] == [t.id for t in expected]
+    assert [t.id for t in result] == list(range(total, 0, -1))
+
+
+@pytest.mark.asyncio
+async def test_cached_repository_serves_stale_while_revalidating(mock_repository):
+    """Test TTL hits, stale-while-revalidate and LRU eviction."""
+    now = [0.0]
+    versions = iter(range(1, 100))
+
+    async def get_tickets(**kwargs):
+        return [Ticket(id=next(versions))]
+
+    mock_repository.get_tickets = AsyncMock(side_effect=get_tickets)
+    cache = CachedZammadRepository(
+        mock_repository,
+        ttls={"get_tickets": 10.0},
+        stale_ttl=20.0,
+        max_entries=2,
+        clock=lambda: now[0],
+    )
+
+    assert (await cache.get_tickets(fetch_all=True))[0].id == 1
+    now[0] = 5.0
+    assert (await cache.get_tickets(fetch_all=True))[0].id == 1
+    assert mock_repository.get_tickets.call_count == 1
+
+    # Stale: old value is returned immediately and refreshed in the background
+    now[0] = 15.0
+    assert (await cache.get_tickets(fetch_all=True))[0].id == 1
+    await asyncio.sleep(0)
+    assert (await cache.get_tickets(fetch_all=True))[0].id == 2
+
+    # Fully expired entries are fetched synchronously
+    now[0] = 100.0
+    assert (await cache.get_tickets(fetch_all=True))[0].id == 3
+
+    # Least recently used entry is evicted beyond max_entries
+    await cache.get_tickets(group_id=1)
+    await cache.get_tickets(group_id=2)
+    calls = mock_repository.get_tickets.call_count
+    await cache.get_tickets(fetch_all=True)
+    assert mock_repository.get_tickets.call_count == calls + 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_decode_matches_per_row_decode():
+    """Test that bulk page decoding builds the same tickets as per-row construction."""
+    rows = [
+        {
+            "id": 1,
+            "state": "open",
+            "created_at": "2024-01-01T10:00:00Z",
+            "customer_id": 5,
+            "preferences": {"channel_id": 3},
+        },
+        {"id": 2, "state": None, "group_id": 4},
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=rows)
+
+    bulk = make_repository(handler)
+    per_row = make_repository(handler)
+    per_row.bulk_decode = False
+
+    assert await bulk.get_tickets() == await per_row.get_tickets()
+    assert (await bulk.get_tickets())[0].created_at.year == 2024
+
+
+@pytest.mark.asyncio
+async def test_created_range_is_pushed_into_search_query():
+    """Test that a created_at range is combined with the group filter in the search query."""
+    queries = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        queries.append(request.url.params["query"])
+        return httpx.Response(200, json=[])
+
+    repository = make_repository(handler)
+
+    await repository.get_tickets(
+        group_id=3,
+        created_from=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        created_to=datetime(2024, 1, 2, 12, 30),
+    )
+    await repository.get_tickets(created_from=datetime(2024, 1, 1, tzinfo=timezone.utc))
+    await repository.get_tickets()
+
+    assert queries == [
+        'group_id:3 AND created_at:["2024-01-01T00:00:00Z" TO "2024-01-02T12:30:00Z"]',
+        'created_at:["2024-01-01T00:00:00Z" TO *]',
+        "*",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_users_and_organizations_crawl_every_page():
+    """Test that fetch_all pages through users/organizations with page and per_page."""
+    paths = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        page = int(request.url.params["page"])
+        per_page = int(request.url.params["per_page"])
+        start = (page - 1) * per_page
+        ids = range(start + 1, min(start + per_page, 7) + 1)
+        return httpx.Response(200, json=[{"id": entity_id} for entity_id in ids])
+
+    repository = make_repository(handler)
+    repository.crawl_concurrency = 3
+
+    users = await repository.get_users(per_page=2, fetch_all=True)
+    organizations = await repository.get_organizations(per_page=3, fetch_all=True)
+    second_page = await repository.get_users(page=2, per_page=2)
+
+    assert [u.id for u in users] == list(range(1, 8))
+    assert [o.id for o in organizations] == list(range(1, 8))
+    assert [u.id for u in second_page] == [3, 4]
+    assert set(paths) == {"/api/v1/users", "/api/v1/organizations"}
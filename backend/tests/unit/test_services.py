@@ -1,9 +1,30 @@
 """
 Unit tests for service layer.
 """
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
 import pytest
 
-from app.domain.models import Ticket, TicketStatistics
+from app.core.exceptions import QueryError
+from app.domain.models import Organization, Ticket, TicketStatistics, User
+from app.repositories.snapshot_repository import SQLiteSnapshotRepository
+from app.services.aggregations import TicketAggregator
+from app.services.bucketing import (
+    BucketInterval,
+    bucket_edges,
+    choose_interval,
+    get_zone,
+    parse_interval,
+)
+from app.services.entity_directory import EntityDirectory
+from app.services.history import TicketHistory
+from app.services.metrics_materializer import MetricsMaterializer, render_exposition
+from app.services.rollups import DAY, HOUR, MINUTE, TicketRollups
+from app.services.ticket_store import TicketStore
+from app.services.ticket_table import TicketTable
 from app.services.zammad_service import ZammadService
 
 
@@ -44,3 +65,515 @@ async def test_get_ticket_statistics(zammad_service: ZammadService):
     assert result.tickets_by_priority["high"] == 2
     assert result.tickets_by_priority["low"] == 1
 
+
+@pytest.mark.asyncio
+async def test_concurrent_statistics_share_one_crawl(zammad_service: ZammadService):
+    """Test that concurrent identical calls are coalesced into one upstream fetch."""
+    release = asyncio.Event()
+
+    async def slow_get_tickets(**kwargs):
+        await release.wait()
+        return [Ticket(id=1, state="open"), Ticket(id=2, state="closed")]
+
+    zammad_service.repository.get_tickets = AsyncMock(side_effect=slow_get_tickets)
+
+    calls = [
+        asyncio.create_task(zammad_service.get_ticket_statistics()),
+        asyncio.create_task(zammad_service.get_ticket_statistics()),
+        asyncio.create_task(zammad_service.get_all_tickets(fetch_all=True)),
+        asyncio.create_task(zammad_service.get_all_tickets(fetch_all=True)),
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    statistics, other_statistics, tickets, other_tickets = await asyncio.gather(*calls)
+
+    assert statistics.total_tickets == 2
+    assert other_statistics is statistics
+    assert other_tickets is tickets
+    assert zammad_service.repository.get_tickets.call_count == 2
+    stats = zammad_service.get_coalescing_stats()
+    assert stats["get_ticket_aggregates"] == {"executions": 1, "coalesced": 1, "in_flight": 0}
+    assert stats["get_tickets"]["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_ticket_store_syncs_incrementally(mock_repository):
+    """Test that after the initial crawl only tickets newer than the watermark are applied."""
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    now = [0.0]
+    initial = [
+        Ticket(id=2, state="open", updated_at=day + timedelta(hours=2)),
+        Ticket(id=1, state="open", updated_at=day + timedelta(hours=1)),
+    ]
+    changed = [
+        Ticket(id=3, state="new", updated_at=day + timedelta(hours=4)),
+        Ticket(id=1, state="closed", updated_at=day + timedelta(hours=3)),
+    ]
+    mock_repository.get_tickets = AsyncMock(return_value=initial)
+    store = TicketStore(mock_repository, per_page=2, sync_interval=10.0, clock=lambda: now[0])
+    service = ZammadService(repository=mock_repository, store=store)
+
+    statistics = await service.get_ticket_statistics()
+    assert statistics.open_tickets == 2
+    assert store.watermark == day + timedelta(hours=2)
+
+    # Page 1 is full of changes, page 2 reaches the watermark
+    mock_repository.get_tickets = AsyncMock(side_effect=[changed, initial])
+    now[0] = 20.0
+    tickets = await service.get_all_tickets(fetch_all=True, sort_by="id", order="asc")
+
+    assert [(t.id, t.state) for t in tickets] == [(1, "closed"), (2, "open"), (3, "new")]
+    assert store.watermark == day + timedelta(hours=4)
+    assert mock_repository.get_tickets.call_count == 2
+    assert mock_repository.get_tickets.call_args.kwargs["sort_by"] == "updated_at"
+
+
+@pytest.mark.asyncio
+async def test_aggregates_are_shared_until_the_store_changes(mock_repository):
+    """Test that every dashboard aggregation reads one result computed per store version."""
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    now = [0.0]
+    mock_repository.get_tickets = AsyncMock(return_value=[
+        Ticket(id=1, state="Closed", customer_id=5, created_at=created, updated_at=created),
+        Ticket(id=2, state="open", customer_id=5, created_at=created, updated_at=created),
+    ])
+    store = TicketStore(mock_repository, sync_interval=10.0, clock=lambda: now[0])
+    service = ZammadService(repository=mock_repository, store=store)
+
+    statistics = await service.get_ticket_statistics()
+    top = await service.get_top_customers_by_tickets(limit=1)
+    daily = await service.get_daily_ticket_counts()
+
+    assert (statistics.open_tickets, statistics.closed_tickets) == (1, 1)
+    assert [(c.customer_id, c.ticket_count) for c in top.customers] == [(5, 2)]
+    assert daily["2024-01-01"]["value"] == 2
+    assert await service.get_ticket_aggregates() is await service.get_ticket_aggregates()
+
+    # Ranged rollup reads use the shared result instead of aggregating again
+    service._fold_tickets = AsyncMock(wraps=service._fold_tickets)
+    ends = np.array([(created + timedelta(days=1)).timestamp()])
+    counts = await service.get_created_counts(
+        ends, 86_400, by="state", created_from=created, created_to=created + timedelta(days=1)
+    )
+    assert counts["open"].tolist() == [1]
+    service._fold_tickets.assert_not_called()
+
+    # A sync that applies changes invalidates the shared result
+    mock_repository.get_tickets = AsyncMock(return_value=[
+        Ticket(id=3, state="new", customer_id=6, created_at=created, updated_at=created),
+    ])
+    now[0] = 20.0
+    statistics = await service.get_ticket_statistics()
+    assert statistics.total_tickets == 3
+
+
+@pytest.mark.asyncio
+async def test_group_partitions_refresh_independently(mock_repository):
+    """Test that a sync only recomputes the aggregates of the groups it touched."""
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    now = [0.0]
+    mock_repository.get_tickets = AsyncMock(return_value=[
+        Ticket(id=3, state="open", group_id=3, updated_at=day),
+        Ticket(id=2, state="open", group_id=2, updated_at=day),
+        Ticket(id=1, state="open", group_id=1, updated_at=day),
+    ])
+    store = TicketStore(mock_repository, sync_interval=10.0, clock=lambda: now[0])
+    service = ZammadService(repository=mock_repository, store=store)
+
+    before = await service.refresh_group_aggregates()
+    assert sorted(before) == [1, 2, 3]
+    assert before[1].statistics.total_tickets == 1
+
+    # Ticket 1 moves from group 1 to group 2; group 3 is untouched
+    mock_repository.get_tickets = AsyncMock(return_value=[
+        Ticket(id=1, state="closed", group_id=2, updated_at=day + timedelta(hours=1)),
+    ])
+    now[0] = 20.0
+    after = await service.refresh_group_aggregates()
+
+    assert sorted(after) == [2, 3]
+    assert after[3] is before[3]
+    assert (await service.get_ticket_aggregates(group_id=1)).statistics.total_tickets == 0
+    assert after[2].statistics.closed_tickets == 1
+    assert (await store.get_table(group_id=2)).column("id").tolist() == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_top_customers_and_organizations_within_window_and_group(mock_repository):
+    """Test windowed top-K from per-day counts, per group, with ties to the lower id."""
+    day = datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+    mock_repository.get_tickets = AsyncMock(return_value=[
+        Ticket(id=1, customer_id=5, organization_id=9, group_id=4, created_at=day),
+        Ticket(id=2, customer_id=5, organization_id=9, group_id=4, created_at=day),
+        Ticket(id=3, customer_id=6, group_id=4, created_at=day + timedelta(days=3)),
+        Ticket(id=4, customer_id=6, group_id=4, created_at=day + timedelta(days=3)),
+        Ticket(id=5, customer_id=7, organization_id=8, group_id=4, created_at=day + timedelta(days=4)),
+        Ticket(id=6, customer_id=6, organization_id=8, group_id=1, created_at=day + timedelta(days=4)),
+        Ticket(id=7, customer_id=7, group_id=4),
+    ])
+    service = ZammadService(repository=mock_repository, store=TicketStore(mock_repository))
+
+    overall = await service.get_top_customers_by_tickets(limit=2)
+    windowed = await service.get_top_customers_by_tickets(
+        limit=2, group_id=4, created_from=day + timedelta(days=2, hours=18)
+    )
+    # Partial first and last days are counted exactly, whole days from the day cells
+    spanning = await service.get_top_customers_by_tickets(
+        limit=3, group_id=4, created_from=day - timedelta(hours=1),
+        created_to=day + timedelta(days=4, seconds=-1),
+    )
+    within_day = await service.get_top_customers_by_tickets(
+        limit=3, created_from=day + timedelta(days=4), created_to=day + timedelta(days=4)
+    )
+    organizations = await service.get_top_organizations_by_tickets(
+        limit=5, created_to=day + timedelta(days=4)
+    )
+
+    assert [(c.customer_id, c.ticket_count) for c in overall.customers] == [(6, 3), (5, 2)]
+    # The undated ticket only counts overall
+    assert [(c.customer_id, c.ticket_count) for c in windowed.customers] == [(6, 2), (7, 1)]
+    assert [(c.customer_id, c.ticket_count) for c in spanning.customers] == [(5, 2), (6, 2)]
+    assert [(c.customer_id, c.ticket_count) for c in within_day.customers] == [(6, 1), (7, 1)]
+    assert [(o.organization_id, o.ticket_count) for o in organizations.organizations] == [
+        (8, 2), (9, 2)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_top_customers_are_enriched_from_the_directory(mock_repository):
+    """Test that names come from the in-memory directory, refreshed incrementally."""
+    updated = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    mock_repository.get_users = AsyncMock(return_value=[
+        User(id=5, firstname="Ada", lastname="Lovelace", organization_id=9, updated_at=updated),
+    ])
+    mock_repository.get_organizations = AsyncMock(return_value=[
+        Organization(id=9, name="Analytical Engines", updated_at=updated),
+    ])
+    mock_repository.get_tickets = AsyncMock(return_value=[
+        Ticket(id=1, customer_id=5), Ticket(id=2, customer_id=5), Ticket(id=3, customer_id=6),
+    ])
+    now = [0.0]
+    directory = EntityDirectory(mock_repository, clock=lambda: now[0])
+    store = TicketStore(mock_repository)
+    service = ZammadService(repository=mock_repository, store=store, directory=directory)
+    await directory.refresh()
+
+    top = await service.get_top_customers_by_tickets(limit=2)
+
+    assert [(c.customer_name, c.organization_name) for c in top.customers] == [
+        ("Ada Lovelace", "Analytical Engines"), (None, None)
+    ]
+    mock_repository.get_users.reset_mock()
+    await service.get_top_customers_by_tickets(limit=2)
+    mock_repository.get_users.assert_not_called()
+
+    # Later refreshes only ask for entities updated since the watermark
+    mock_repository.get_users = AsyncMock(return_value=[
+        User(id=6, login="grace", updated_at=updated + timedelta(hours=1)),
+    ])
+    now[0] = 10.0
+    await directory.refresh()
+
+    assert mock_repository.get_users.call_args.kwargs["updated_since"] == updated
+    assert directory.user_name(6) == "grace"
+    assert directory.user_name(5) == "Ada Lovelace"
+
+
+@pytest.mark.asyncio
+async def test_ticket_store_warm_starts_from_snapshot(mock_repository, tmp_path):
+    """Test that a restarted store serves its snapshot without a full crawl."""
+    updated = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    snapshot = SQLiteSnapshotRepository(str(tmp_path / "snapshot.db"))
+    mock_repository.get_tickets = AsyncMock(
+        return_value=[Ticket(id=1, state="open", updated_at=updated)]
+    )
+    await TicketStore(mock_repository, snapshot=snapshot).sync()
+
+    mock_repository.get_tickets = AsyncMock(return_value=[])
+    restarted = TicketStore(mock_repository, snapshot=snapshot)
+
+    assert await restarted.load_snapshot()
+    tickets = await restarted.get_tickets()
+    assert [t.id for t in tickets] == [1]
+    assert restarted.watermark == updated
+    mock_repository.get_tickets.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_directory_warm_starts_from_snapshot(mock_repository, tmp_path):
+    """Test that a restarted directory serves names from its snapshot and only fetches updates."""
+    updated = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    snapshot = SQLiteSnapshotRepository(str(tmp_path / "snapshot.db"))
+    mock_repository.get_users = AsyncMock(return_value=[
+        User(id=5, firstname="Ada", lastname="Lovelace", updated_at=updated),
+    ])
+    mock_repository.get_organizations = AsyncMock(return_value=[
+        Organization(id=9, name="Analytical Engines", updated_at=updated),
+    ])
+    await EntityDirectory(mock_repository, snapshot=snapshot).refresh()
+
+    mock_repository.get_users = AsyncMock(return_value=[])
+    mock_repository.get_organizations = AsyncMock(return_value=[])
+    restarted = EntityDirectory(mock_repository, snapshot=snapshot)
+
+    assert await restarted.load_snapshot()
+    assert restarted.is_loaded
+    assert restarted.user_name(5) == "Ada Lovelace"
+    assert restarted.organization_name(9) == "Analytical Engines"
+    await restarted.refresh()
+    assert mock_repository.get_users.call_args.kwargs["updated_since"] == updated
+    assert mock_repository.get_organizations.call_args.kwargs["updated_since"] == updated
+
+
+@pytest.mark.asyncio
+async def test_aggregations_stream_pages(zammad_service: ZammadService):
+    """Test that top customers and daily counts are folded page by page."""
+    created = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+    pages = [
+        [Ticket(id=i, customer_id=i % 2, created_at=created) for i in range(500)],
+        [Ticket(id=500, customer_id=7, created_at=created + timedelta(days=1))],
+    ]
+    zammad_service.repository.get_tickets = AsyncMock(side_effect=pages)
+
+    top = await zammad_service.get_top_customers_by_tickets(limit=2)
+
+    assert [(c.customer_id, c.ticket_count) for c in top.customers] == [(0, 250), (1, 250)]
+    assert zammad_service.repository.get_tickets.call_count == 2
+
+    zammad_service.repository.get_tickets = AsyncMock(side_effect=pages)
+    daily = await zammad_service.get_daily_ticket_counts()
+
+    assert {key: bucket["value"] for key, bucket in daily.items()} == {
+        "2024-01-01": 500,
+        "2024-01-02": 1,
+    }
+
+
+def test_ticket_table_columns_and_round_trip():
+    """Test columnar storage, in-place upserts, category counts and Ticket rebuilds."""
+    created = datetime(2024, 3, 1, 8, 30, tzinfo=timezone.utc)
+    table = TicketTable.from_tickets([
+        Ticket(id=10, state="open", priority="high", group_id=1, created_at=created),
+        Ticket(id=11, state="closed", priority="low", group_id=2, customer_id=5),
+        Ticket(id=12, state="open", group_id=1),
+    ])
+    table.upsert([Ticket(id=11, state="open", group_id=2, title="Updated")])
+
+    assert len(table) == 3
+    assert table.column("id").dtype == np.int64
+    assert table.value_counts("state") == {"open": 3}
+    assert table.value_counts("priority") == {"high": 1}
+    assert [t.id for t in table.for_group(1).to_tickets()] == [10, 12]
+    assert table.ticket(0) == Ticket(
+        id=10, state="open", priority="high", group_id=1, created_at=created
+    )
+    assert table.ticket(1).title == "Updated"
+    assert table.ticket(1).customer_id is None
+
+
+def test_ticket_history_answers_backlog_at_any_time():
+    """Test that created, closed and open counts are reconstructed per timestamp."""
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    table = TicketTable.from_tickets([
+        Ticket(id=1, state="closed", created_at=day, updated_at=day + timedelta(days=2)),
+        Ticket(id=2, state="open", created_at=day + timedelta(days=1), updated_at=day + timedelta(days=3)),
+        Ticket(id=3, state="Closed", created_at=day + timedelta(days=1), updated_at=day + timedelta(days=4)),
+    ])
+    aggregator = TicketAggregator()
+    aggregator.add(table)
+    history = aggregator.result().history
+
+    timestamps = np.array([(day + timedelta(days=n)).timestamp() for n in range(-1, 6)])
+    assert history.created_up_to(timestamps).tolist() == [0, 1, 3, 3, 3, 3, 3]
+    assert history.closed_up_to(timestamps).tolist() == [0, 0, 0, 1, 1, 2, 2]
+    assert history.open_at(timestamps).tolist() == [0, 1, 3, 2, 2, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_metrics_materializer_serves_prerendered_exposition(zammad_service: ZammadService):
+    """Test that scrapes reuse the rendered body and label values are escaped."""
+    zammad_service.repository.get_tickets = AsyncMock(
+        return_value=[Ticket(id=1, state='waiting "3rd" party\\x', group_id=2)]
+    )
+    now = [0.0]
+    materializer = MetricsMaterializer(zammad_service, interval=15.0, clock=lambda: now[0])
+
+    body = (await materializer.get_exposition()).decode()
+    again = await materializer.get_exposition()
+
+    assert again is materializer.body
+    assert zammad_service.repository.get_tickets.call_count == 1
+    assert "# TYPE zammad_tickets_by_state gauge" in body
+    assert 'zammad_tickets_by_state{state="waiting \\"3rd\\" party\\\\x"} 1' in body
+    assert 'zammad_tickets_created_total{group_id="2"} 1' in body
+    assert f"zammad_exporter_last_refresh_timestamp {round(materializer.refreshed_at, 3)}" in body
+    # Without the background loop, a scrape past the interval renders again
+    now[0] = 20.0
+    assert await materializer.get_exposition() is not again
+    assert zammad_service.repository.get_tickets.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_duration_histograms_follow_incremental_syncs(mock_repository):
+    """Test that syncs move changed tickets between histograms and the exposition renders them."""
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    now = [0.0]
+    initial = [
+        Ticket(id=1, state="open", group_id=1, created_at=day, updated_at=day,
+               first_response_at=day + timedelta(minutes=10)),
+        Ticket(id=2, state="open", group_id=1, created_at=day, updated_at=day),
+    ]
+    changed = [
+        Ticket(id=1, state="closed", group_id=1, created_at=day,
+               updated_at=day + timedelta(hours=9), close_at=day + timedelta(hours=6),
+               first_response_at=day + timedelta(minutes=10)),
+    ]
+    mock_repository.get_tickets = AsyncMock(return_value=initial)
+    store = TicketStore(mock_repository, per_page=10, sync_interval=10.0, clock=lambda: now[0])
+    service = ZammadService(repository=mock_repository, store=store)
+    await store.sync()
+    durations = store.durations.groups[1]
+    assert len(durations.open_created) == 2
+    assert durations.first_response.buckets()[1] == ("900", 1)
+
+    mock_repository.get_tickets = AsyncMock(return_value=changed)
+    now[0] = 20.0
+    await store.sync()
+
+    assert len(durations.open_created) == 1
+    assert durations.resolution.count == 1
+    assert durations.resolution.sum == 6 * 3600
+    assert dict(durations.resolution.buckets())["14400"] == 0
+    assert dict(durations.resolution.buckets())["28800"] == 1
+    assert durations.first_response.count == 1
+    age = durations.open_age(day.timestamp() + 2 * 86_400)
+    assert dict(age.buckets())["86400"] == 0 and dict(age.buckets())["172800"] == 1
+    assert age.sum == 2 * 86_400
+
+    aggregates = await service.get_ticket_aggregates()
+    assert aggregates.durations is store.durations
+    body = render_exposition(aggregates, day.timestamp() + 3600).decode()
+    assert "# TYPE zammad_ticket_resolution_seconds histogram" in body
+    assert 'zammad_ticket_resolution_seconds_bucket{group_id="1",le="+Inf"} 1' in body
+    assert 'zammad_ticket_resolution_seconds_sum{group_id="1"} 21600.0' in body
+    assert 'zammad_ticket_open_age_seconds_bucket{group_id="1",le="3600"} 1' in body
+
+
+@pytest.mark.asyncio
+async def test_pushed_updates_are_merged_into_the_last_aggregates(mock_repository):
+    """Test that store changes update the cached aggregates as a full pass would, without one."""
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    mock_repository.get_tickets = AsyncMock(return_value=[
+        Ticket(id=i, state="open", priority="2 normal", group_id=1 + i % 2, customer_id=i % 3,
+               organization_id=7, created_at=day + timedelta(hours=i), updated_at=day)
+        for i in range(1, 9)
+    ])
+    store = TicketStore(mock_repository, sync_interval=3600)
+    service = ZammadService(repository=mock_repository, store=store)
+    await service.get_ticket_aggregates()
+    service._aggregate_table = MagicMock(wraps=service._aggregate_table)
+
+    later = day + timedelta(hours=12)
+    await service.apply_ticket_updates([
+        Ticket(id=2, state="closed", priority="2 normal", group_id=1, customer_id=2,
+               created_at=day + timedelta(hours=2), close_at=later, updated_at=later),
+        Ticket(id=9, state="new", priority="3 high", group_id=3, customer_id=1,
+               created_at=later, updated_at=later),
+    ])
+    merged = await service.get_ticket_aggregates()
+    service._aggregate_table.assert_not_called()
+
+    full = service._aggregate_table(store.table, store.durations)
+    assert merged.statistics == full.statistics
+    assert merged.customer_counts == full.customer_counts
+    assert merged.daily_created == full.daily_created
+    assert merged.top_customers(3, day, later) == full.top_customers(3, day, later)
+    assert set(merged.history_by_group) == set(full.history_by_group) == {1, 2, 3}
+    ends = np.array([later.timestamp(), later.timestamp() + 3600])
+    assert merged.history.open_at(ends).tolist() == full.history.open_at(ends).tolist() == [8, 8]
+    by_state = merged.rollups.created_in_windows("state", ends, 86_400)
+    assert by_state["new"].tolist() == [0, 1]
+    assert by_state["closed"].tolist() == [1, 1]
+
+
+def test_bucketing_aligns_calendar_intervals_and_counts_from_sorted_index():
+    """Test week/month alignment, interval choice and binary-search bucket counts."""
+    monday = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+    wednesday = monday + 2 * 86_400
+
+    weeks = bucket_edges(wednesday, wednesday + 8 * 86_400, parse_interval("1w"))
+    months = bucket_edges(datetime(2024, 1, 15, tzinfo=timezone.utc).timestamp(),
+                          datetime(2024, 3, 2, tzinfo=timezone.utc).timestamp(),
+                          parse_interval("1M"))
+
+    assert weeks.tolist() == [monday, monday + 7 * 86_400, monday + 14 * 86_400]
+    assert [datetime.fromtimestamp(edge, tz=timezone.utc).month for edge in months] == [1, 2, 3, 4]
+    assert choose_interval(0, 86_400, interval_ms=90_000) == BucketInterval(seconds=300)
+    assert choose_interval(0, 365 * 86_400, max_data_points=20) == BucketInterval(months=1)
+
+    created = np.array([monday, monday + 1, monday + 7 * 86_400, monday + 20 * 86_400])
+    history = TicketHistory((created * 1_000_000).astype(np.int64), np.empty(0, dtype=np.int64))
+    assert history.created_in_buckets(weeks).tolist() == [2, 1]
+
+
+def test_day_buckets_follow_local_midnight_across_dst():
+    """Test that tz-aware day buckets start at local midnight, including 23-hour days."""
+    zone = get_zone("Europe/Stockholm")
+    start = datetime(2024, 3, 30, 12, tzinfo=timezone.utc).timestamp()
+
+    edges = bucket_edges(start, start + 86_400, parse_interval("1d"), zone=zone)
+    local = [datetime.fromtimestamp(edge, tz=zone) for edge in edges]
+
+    assert [(t.day, t.hour) for t in local] == [(30, 0), (31, 0), (1, 0)]
+    assert np.diff(edges).tolist() == [86_400, 82_800]
+    # Sub-day buckets keep to the local clock of half-hour offsets
+    hours = bucket_edges(start, start, parse_interval("1h"), zone=get_zone("Asia/Kolkata"))
+    assert hours[0] % 3600 == 1800
+    # Grafana's browser zone is unknown to the server, so it is refused, not defaulted
+    with pytest.raises(QueryError, match="IANA"):
+        get_zone("browser")
+
+
+def test_rollups_pick_coarsest_resolution_and_respect_retention():
+    """Test that windows read the coarsest rollup that tiles them and expire past retention."""
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    tickets = [
+        Ticket(id=i, state="open" if i % 2 else "closed", created_at=day + timedelta(hours=i))
+        for i in range(48)
+    ]
+    rollups = TicketRollups({MINUTE: 60, HOUR: 24, DAY: 10})
+    rollups.add(TicketTable.from_tickets(tickets))
+
+    ends = np.array([(day + timedelta(days=n)).timestamp() for n in (1, 2)])
+    assert rollups.resolution_for(ends, 86_400) == DAY
+    assert rollups.resolution_for(ends + 1800, 3600) == MINUTE
+    assert rollups.resolution_for(ends + 30, 3600) is None
+
+    by_state = rollups.created_in_windows("state", ends, 86_400)
+    assert by_state["open"].tolist() == [12, 12]
+    assert by_state["closed"].tolist() == [12, 12]
+
+    # Only the last 24 hourly buckets are retained, so the first day has expired
+    hourly = rollups.rings["state"][HOUR].window_counts(ends, 86_400)
+    assert np.isnan(hourly[:, 0]).all()
+    assert hourly[:, 1].sum() == 24
+
+
+def test_rollups_skip_windows_longer_than_retention():
+    """Test that a window no rollup retains falls back instead of reading the rings."""
+    day = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    rollups = TicketRollups({HOUR: 24, DAY: 10})
+    rollups.add(TicketTable.from_tickets(
+        [Ticket(id=i, state="open", created_at=day + timedelta(hours=i)) for i in range(48)]
+    ))
+
+    ends = np.array([(day + timedelta(days=2)).timestamp()])
+    assert rollups.resolution_for(ends, 730 * 86_400) is None
+    assert rollups.created_in_windows("state", ends, 730 * 86_400) is None
+    assert rollups.resolution_for(ends, 10 * 86_400) == DAY
+
+    # Reads are bounded by the retained span however far the timestamps reach
+    far = np.array([(day + timedelta(days=n)).timestamp() for n in (-400, 2, 400)])
+    daily = rollups.rings["state"][DAY].window_counts(far, 86_400)
+    assert np.isnan(daily[0, 0])
+    assert daily[0, 1:].tolist() == [24, 0]